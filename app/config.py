@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from typing import Literal
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
@@ -14,6 +15,8 @@ class Settings(BaseSettings):
     browser_headless: bool = True
     browser_timeout: int = 30000
     max_concurrent: int = 5
+    admission_max_queue: int = 50  # API requests allowed to wait for a driver before 429s
+    admission_max_wait: float = 30.0  # seconds an API request may wait for a driver
 
     # Screenshot defaults
     default_width: int = 1280
@@ -21,8 +24,77 @@ class Settings(BaseSettings):
     default_format: str = "png"
     default_quality: int = 80
 
+    # Video encoding
+    ffmpeg_path: str = "ffmpeg"
+    ffmpeg_timeout: int = 120  # seconds per FFmpeg invocation
+    video_profile: Literal["realtime", "balanced", "archival"] = "balanced"
+    encoder_pool_size: int = 2  # max concurrent FFmpeg encodes
+    ffmpeg_threads: int | None = None  # per-encode threads (default: cores / pool size)
+
     # Storage
     output_dir: Path = Path("/tmp/snapsht-screenshots")
+    state_dir: Path = Path("/tmp/snapsht-state")  # SQLite databases (job queue, capture index)
+    job_flush_interval: float = 0.5  # seconds between batched job-state writes
+    bulk_chunk_size: int = 1000  # URLs written per transaction during bulk uploads
+
+    # Storage backend: "local" keeps outputs in output_dir, "s3" uploads them to an
+    # S3-compatible bucket (requires boto3) and redirects downloads to presigned URLs
+    storage_backend: Literal["local", "s3"] = "local"
+    storage_upload_concurrency: int = 8  # uploads in flight per process
+    storage_multipart_threshold: int = 8 * 1024 * 1024  # bytes; larger files upload as multipart parts of this size
+    s3_bucket: str | None = None
+    s3_prefix: str = ""  # key prefix inside the bucket
+    s3_node_id: str | None = None  # key namespace of this node's capture index; default: generated once in state_dir
+    s3_endpoint_url: str | None = None  # MinIO, R2, etc.; default AWS
+    s3_region: str | None = None
+    s3_access_key_id: str | None = None  # default: the boto3 credential chain
+    s3_secret_access_key: str | None = None
+    s3_presign_expires: int = 3600  # seconds presigned download URLs stay valid
+
+    # Retention (0 disables a limit)
+    artifact_ttl_hours: float = 0.0  # screenshots, and videos unless video_ttl_hours is set; 0 keeps them
+    video_ttl_hours: float | None = None
+    output_max_bytes: int = 0  # disk quota for output_dir; least recently used files go first
+    batch_retention_hours: float = 24.0  # finished batches are forgotten after this
+    retention_interval: float = 60.0  # seconds between maintenance passes
+
+    # Batch workers: "inline" runs jobs in the API process, "external" leaves
+    # them to `python -m app.worker` processes sharing the job store
+    batch_workers: Literal["inline", "external"] = "inline"
+    job_lease_seconds: int = 120  # visibility timeout for leased jobs
+    worker_poll_interval: float = 1.0  # seconds between lease attempts when idle
+    api_max_concurrent: int = 1  # browser pool size per API process when batch workers are external
+
+    # Batch politeness (per registrable domain)
+    host_max_concurrent: int = 2  # concurrent captures per site
+    host_min_interval: float = 1.0  # seconds between capture starts on a site
+    host_max_backoff: float = 60.0  # cap on the interval after throttling
+    host_throttle_retries: int = 3  # re-queues of a throttled job before failing it
+
+    # Batch job retries
+    job_max_attempts: int = 3  # capture attempts for transient failures (timeouts, 5xx, driver errors)
+    job_retry_base_delay: float = 2.0  # seconds before the first retry, doubling after that
+    job_retry_max_delay: float = 60.0
+    job_deadline: float = 120.0  # seconds one attempt may hold a browser before it is cancelled
+
+    # Batch pre-flight (DNS + HTTP check before a job gets a browser)
+    batch_preflight: bool = False  # default for batches that don't say
+    preflight_concurrency: int = 50  # concurrent checks (and pooled connections)
+    preflight_timeout: float = 5.0  # seconds per DNS lookup / HTTP request
+
+    # Batch progress streams
+    batch_event_interval: float = 2.0  # seconds between aggregate progress events
+    batch_event_history: int = 10000  # job events kept per batch for resuming
+
+    # Completion callbacks
+    webhook_flush_interval: float = 1.0  # seconds job events are coalesced before delivery
+    webhook_batch_size: int = 100  # max events per delivery
+    webhook_max_pending: int = 1000  # events queued per callback URL; the oldest are dropped beyond this
+    webhook_max_attempts: int = 5  # delivery attempts before events are dropped
+    webhook_retry_base_delay: float = 1.0  # seconds before the first redelivery, doubling after that
+    webhook_retry_max_delay: float = 60.0
+    webhook_timeout: float = 10.0  # seconds per delivery request
+    webhook_concurrency: int = 20  # concurrent deliveries (and pooled connections)
 
     # Auth (optional)
     api_key: str | None = None
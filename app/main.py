@@ -5,7 +5,12 @@ from fastapi.responses import JSONResponse
 
 from .config import get_settings
 from .services.browser_pool import browser_pool
-from .routes import screenshot, video, batch, health
+from .services.capture_index import capture_index
+from .services.job_queue import job_queue
+from .services.processors import process_url
+from .services.retention import retention_manager
+from .services.webhooks import webhook_dispatcher
+from .routes import screenshot, video, batch, captures, health
 from .utils.logger import logger
 
 
@@ -14,13 +19,21 @@ async def lifespan(app: FastAPI):
     """Manage application lifecycle."""
     # Startup
     logger.info("Starting Snapsht Service...")
-    await browser_pool.initialize()
+    # With external workers this process only serves interactive captures;
+    # every uvicorn worker would otherwise start a full batch-sized pool
+    await browser_pool.initialize(settings.api_max_concurrent if job_queue.external_workers else None)
+    await job_queue.start(process_url)
+    await retention_manager.start()
     logger.info("Snapsht Service ready")
 
     yield
 
     # Shutdown
     logger.info("Shutting down Snapsht Service...")
+    await retention_manager.stop()
+    await job_queue.shutdown()
+    capture_index.close()
+    await webhook_dispatcher.close()
     await browser_pool.shutdown()
     logger.info("Snapsht Service stopped")
 
@@ -59,6 +72,7 @@ app.include_router(health.router)
 app.include_router(screenshot.router)
 app.include_router(video.router)
 app.include_router(batch.router)
+app.include_router(captures.router)
 
 
 @app.get("/")
@@ -78,10 +92,22 @@ async def root():
                 "create": "POST /api/video",
                 "get": "GET /api/video/{id}",
                 "delete": "DELETE /api/video/{id}",
+                "encodes": "GET /api/video/encodes",
             },
             "batch": {
                 "create": "POST /api/batch",
                 "status": "GET /api/batch/{batch_id}",
+                "jobs": "GET /api/batch/{batch_id}/jobs",
+                "archive": "GET /api/batch/{batch_id}/archive",
+                "cancel": "DELETE /api/batch/{batch_id}",
+                "pause": "POST /api/batch/{batch_id}/pause",
+                "resume": "POST /api/batch/{batch_id}/resume",
+                "events": "GET /api/batch/{batch_id}/events",
+                "websocket": "WS /api/batch/{batch_id}/ws",
+            },
+            "captures": {
+                "list": "GET /api/captures",
+                "get": "GET /api/captures/{id}",
             },
             "health": {
                 "status": "GET /health",
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, HttpUrl, Field
+from pydantic import BaseModel, HttpUrl, Field, ValidationError, model_validator
 from typing import Literal
 from datetime import datetime
 
@@ -13,6 +13,7 @@ class ScreenshotRequest(BaseModel):
     wait_for: int = Field(default=1000, ge=0, le=30000)  # ms
     selector: str | None = None
     dismiss_popups: bool = True
+    callback_url: HttpUrl | None = None  # POSTed a "screenshot" event when the capture finishes
 
 
 class ScreenshotResponse(BaseModel):
@@ -23,6 +24,7 @@ class ScreenshotResponse(BaseModel):
     dimensions: dict
     full_page: bool
     download_url: str
+    status_code: int | None = None  # HTTP status of the captured page, when the browser reports it
     created_at: datetime
 
 
@@ -33,11 +35,34 @@ class VideoRequest(BaseModel):
     duration: int = Field(default=5000, ge=1000, le=30000)  # ms
     fps: int = Field(default=24, ge=10, le=60)
     format: Literal["mp4", "webm", "gif"] = "mp4"
+    formats: list[Literal["mp4", "webm", "gif"]] | None = Field(default=None, min_length=1, max_length=3)  # Encode several formats in one pass (overrides format)
+    profile: Literal["realtime", "balanced", "archival"] | None = None  # Encoding profile (default from settings)
     scroll_speed: Literal["slow", "medium", "fast", "realistic"] = "medium"
     scroll_depth: float = Field(default=1.0, ge=0.1, le=1.0)  # How much of page to scroll (0.1-1.0)
     max_scroll_px: int | None = Field(default=None, ge=100)  # Max pixels to scroll (overrides depth)
     pause_multiplier: float = Field(default=1.0, ge=0.5, le=3.0)  # Slow down pauses (1.0 = normal)
     dismiss_popups: bool = True  # Block popup/ESP domains and dismiss popups
+    seed: int | None = Field(default=None, ge=0, lt=2**32)  # Seed for a reproducible realistic scroll timeline
+    progressive: bool = False  # Fragmented MP4, downloadable while still recording (mp4 only)
+    callback_url: HttpUrl | None = None  # POSTed a "video" event when the video is finished
+
+    @model_validator(mode="after")
+    def check_progressive(self):
+        if self.progressive and self.output_formats != ["mp4"]:
+            raise ValueError("progressive output is only available for a single mp4 format")
+        return self
+
+    @property
+    def output_formats(self) -> list[str]:
+        """Requested output formats, de-duplicated, primary format first."""
+        return list(dict.fromkeys(self.formats or [self.format]))
+
+
+class VideoOutput(BaseModel):
+    format: str
+    filename: str
+    size: int
+    download_url: str
 
 
 class VideoResponse(BaseModel):
@@ -49,20 +74,113 @@ class VideoResponse(BaseModel):
     duration: int
     fps: int
     download_url: str
+    encode_time: float | None = None  # FFmpeg wall-clock seconds
+    encode_speed: float | None = None  # FFmpeg speed factor (e.g. 4.2 = 4.2x realtime)
+    outputs: list[VideoOutput] = []
+    status: Literal["processing", "completed"] = "completed"
+    scroll_seed: int | None = None  # Seed used for the realistic scroll pattern
+    timeline_hash: str | None = None  # Digest of the scroll timeline, stable for a given seed and page
+    achieved_fps: float | None = None  # Real screenshot rate vs requested fps
+    frames_captured: int | None = None
+    frames_synthesized: int | None = None  # Repeated frames filling slots missed by slow captures
     created_at: datetime
 
 
+class Viewport(BaseModel):
+    width: int = Field(ge=100, le=3840)
+    height: int = Field(ge=100, le=2160)
+
+
+class ViewportsRequest(ScreenshotRequest):
+    """One page captured at several viewport sizes (width/height are ignored)."""
+    viewports: list[Viewport] = Field(
+        default_factory=lambda: [
+            Viewport(width=1920, height=1080),
+            Viewport(width=768, height=1024),
+            Viewport(width=375, height=812),
+        ],
+        min_length=1,
+        max_length=10,
+    )
+
+
+# Request model each batch job type is built from; job options must fit it
+BATCH_JOB_MODELS: dict[str, type[BaseModel]] = {
+    "screenshot": ScreenshotRequest,
+    "video": VideoRequest,
+    "viewports": ViewportsRequest,
+}
+
+
+class BatchJob(BaseModel):
+    url: HttpUrl
+    type: Literal["screenshot", "video", "viewports"] = "screenshot"
+    options: dict = {}  # Overrides the batch options for this job (videos take only these)
+
+
 class BatchRequest(BaseModel):
-    urls: list[HttpUrl] = Field(..., min_length=1, max_length=100)
-    options: ScreenshotRequest | None = None
+    urls: list[HttpUrl] = Field(default=[], max_length=10_000)  # Screenshot jobs using the batch options
+    jobs: list[BatchJob] = Field(default=[], max_length=10_000)  # Typed jobs with per-job options
+    options: ScreenshotRequest | None = None  # For screenshot and viewports jobs
+    priority: Literal["batch", "background"] = "batch"  # API requests always go first
+    preflight: bool | None = None  # DNS/HTTP check before capture (default: BATCH_PREFLIGHT)
+    callback_url: HttpUrl | None = None  # POSTed job and batch completion events
+
+    @model_validator(mode="after")
+    def check_jobs(self):
+        total = len(self.urls) + len(self.jobs)
+        if not total:
+            raise ValueError("Provide at least one of urls or jobs")
+        if total > 10_000:
+            raise ValueError("A batch holds at most 10000 jobs")
+
+        # Check every job as it will run: screenshot jobs get the batch
+        # options with their overrides on top, videos only their own options
+        base = self.batch_options()
+        for index, job in enumerate(self.jobs):
+            model = BATCH_JOB_MODELS[job.type]
+            allowed = set(model.model_fields) - {"url", "progressive", "callback_url"}
+            unknown = sorted(set(job.options) - allowed)
+            if unknown:
+                raise ValueError(f"jobs[{index}]: unsupported {job.type} options: {', '.join(unknown)}")
+            try:
+                inherited = {} if job.type == "video" else base
+                model.model_validate({**inherited, **job.options, "url": job.url})
+            except ValidationError as e:
+                errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                raise ValueError(f"jobs[{index}] ({job.type}): {errors}")
+        return self
+
+    def batch_options(self) -> dict:
+        """Batch-wide options as stored with the batch."""
+        return self.options.model_dump(mode="json", exclude={"url", "callback_url"}) if self.options else {}
+
+
+class BatchOptions(BaseModel):
+    """Screenshot options applied to every URL of a bulk batch."""
+    model_config = {"extra": "forbid"}
+
+    width: int = Field(default=1280, ge=100, le=3840)
+    height: int = Field(default=720, ge=100, le=2160)
+    full_page: bool = True
+    format: Literal["png", "jpeg", "webp"] = "png"
+    quality: int = Field(default=80, ge=1, le=100)
+    wait_for: int = Field(default=2000, ge=0, le=30000)  # ms
+    dismiss_popups: bool = True
+    preflight: bool | None = None  # DNS/HTTP check before capture (default: BATCH_PREFLIGHT)
+    callback_url: HttpUrl | None = None  # POSTed job and batch completion events
 
 
 class JobStatus(BaseModel):
     id: str
     url: str
-    status: Literal["pending", "processing", "completed", "failed"]
-    result: ScreenshotResponse | None = None
+    type: Literal["screenshot", "video", "viewports"] = "screenshot"
+    options: dict = {}  # Per-job overrides of the batch options
+    status: Literal["pending", "processing", "completed", "failed", "cancelled"]
+    result: dict | None = None  # Screenshot, video or {"viewports": [...]} result
     error: str | None = None
+    preflight: dict | None = None  # ok, final_url, status_code, redirects, error, dns_ms, http_ms
+    attempts: list[dict] = []  # attempt, started_at, duration_ms, error, retryable, retry_in
 
 
 class BatchResponse(BaseModel):
@@ -70,11 +188,18 @@ class BatchResponse(BaseModel):
     total_jobs: int
     completed: int
     failed: int
+    cancelled: int = 0
     processing: int
     pending: int
-    status: Literal["pending", "processing", "completed", "failed"]
+    status: Literal["pending", "ingesting", "processing", "paused", "completed", "failed", "cancelled"]
     progress: float
+    jobs: list[JobStatus] | None = None  # Only with include_jobs=true
+
+
+class JobPage(BaseModel):
+    success: bool = True
     jobs: list[JobStatus]
+    next_cursor: int | None = None  # Pass as `cursor` for the next page; None at the end
 
 
 class HealthResponse(BaseModel):
@@ -82,3 +207,4 @@ class HealthResponse(BaseModel):
     timestamp: datetime
     uptime: float
     browser: dict
+    storage: dict | None = None  # Indexed output files and bytes vs quota
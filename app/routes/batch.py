@@ -1,70 +1,231 @@
 import asyncio
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+import json
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Request, Query, WebSocket
+from fastapi.responses import StreamingResponse
 
-from ..models.schemas import BatchRequest, ScreenshotRequest
+from ..config import get_settings
+from pydantic import ValidationError
+
+from ..models.schemas import BatchRequest, BatchOptions, JobPage
+from ..services.batch_archive import batch_archiver
+from ..services.errors import BatchStateError
 from ..services.job_queue import job_queue
-from ..services.capture import capture_service
+from ..services.processors import process_url
 from ..utils.logger import logger
+from ..utils.url_lists import UrlListReader
 
 router = APIRouter(prefix="/api/batch", tags=["batch"])
+settings = get_settings()
 
 
-async def process_url(url: str, options: dict):
-    """Process a single URL from batch."""
-    request = ScreenshotRequest(
-        url=url,
-        width=options.get("width", 1280),
-        height=options.get("height", 720),
-        full_page=options.get("full_page", True),
-        format=options.get("format", "png"),
-        quality=options.get("quality", 80),
-        wait_for=options.get("wait_for", 2000),
-        dismiss_popups=options.get("dismiss_popups", True),
-    )
+@router.post("")
+async def create_batch(request: BatchRequest):
+    """Create and start processing a batch of screenshots, videos and multi-viewport captures."""
+    specs = [{"url": str(url)} for url in request.urls]
+    specs += [{"url": str(job.url), "type": job.type, "options": job.options} for job in request.jobs]
+    options = request.batch_options()
+    if request.preflight is not None:
+        options["preflight"] = request.preflight
+    if request.callback_url:
+        options["callback_url"] = str(request.callback_url)
+
+    # Create batch
+    batch = await job_queue.create_batch(specs, options, priority=request.priority)
 
-    result = await capture_service.capture_screenshot(request)
+    # Process in background, unless external workers pull jobs from the queue
+    if settings.batch_workers == "inline":
+        job_queue.run_batch(batch.id, process_url)
 
     return {
-        "id": result.id,
-        "filename": result.filename,
-        "download_url": result.download_url,
-        "size": result.size,
-        "dimensions": result.dimensions,
+        "success": True,
+        "batch_id": batch.id,
+        "total_jobs": len(batch.jobs),
+        "status_url": f"/api/batch/{batch.id}",
+        "jobs_url": f"/api/batch/{batch.id}/jobs",
+        "events_url": f"/api/batch/{batch.id}/events",
+        "message": f"Batch submitted. {len(batch.jobs)} jobs queued for processing.",
     }
 
 
-@router.post("")
-async def create_batch(request: BatchRequest, background_tasks: BackgroundTasks):
-    """Create and start processing a batch of screenshots."""
-    urls = [str(url) for url in request.urls]
-    options = request.options.model_dump() if request.options else {}
+@router.post("/bulk")
+async def create_bulk_batch(
+    request: Request,
+    format: Literal["ndjson", "csv"] | None = Query(None, description="Defaults from Content-Type"),
+    options: str | None = Query(None, description="JSON-encoded screenshot options for every URL"),
+    priority: Literal["batch", "background"] = "batch",
+):
+    """Create a batch from a streamed NDJSON or CSV upload of URLs.
 
-    # Create batch
-    batch = await job_queue.create_batch(urls, options)
-
-    # Process in background
-    background_tasks.add_task(
-        job_queue.process_batch,
-        batch.id,
-        process_url,
-        max_concurrent=3,
-    )
+    URLs are validated, deduplicated and queued in chunks while the body is
+    still being read, and capture starts with the first chunk.
+    """
+    try:
+        batch_options = BatchOptions.model_validate_json(options) if options else BatchOptions()
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+
+    batch = await job_queue.create_bulk_batch(batch_options.model_dump(mode="json"), priority=priority)
+    reader = UrlListReader(format)
+    counts = await job_queue.ingest(batch, reader.urls(request.stream()), process_url)
 
     return {
         "success": True,
         "batch_id": batch.id,
-        "total_jobs": len(batch.jobs),
+        "total_jobs": counts["accepted"],
+        "duplicates": counts["duplicates"],
+        "invalid": reader.invalid,
+        "errors": reader.errors,
         "status_url": f"/api/batch/{batch.id}",
-        "message": f"Batch submitted. {len(batch.jobs)} jobs queued for processing.",
+        "jobs_url": f"/api/batch/{batch.id}/jobs",
+        "events_url": f"/api/batch/{batch.id}/events",
     }
 
 
 @router.get("/{batch_id}")
-async def get_batch_status(batch_id: str):
-    """Get batch status and job results."""
-    status = job_queue.get_batch_status(batch_id)
+async def get_batch_status(
+    batch_id: str,
+    include_jobs: bool = Query(False, description="Embed every job (use /jobs for large batches)"),
+):
+    """Get batch progress counts."""
+    status = job_queue.get_batch_status(batch_id, include_jobs=include_jobs)
 
     if not status:
         raise HTTPException(status_code=404, detail="Batch not found")
 
     return {"success": True, "batch": status}
+
+
+@router.get("/{batch_id}/jobs", response_model=JobPage)
+async def list_batch_jobs(
+    batch_id: str,
+    status: Literal["pending", "processing", "completed", "failed", "cancelled"] | None = None,
+    cursor: int = Query(0, ge=0, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Page through a batch's jobs and results, optionally filtered by status."""
+    page = job_queue.list_jobs(batch_id, status=status, cursor=cursor, limit=limit)
+
+    if page is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    return {"success": True, **page}
+
+
+@router.get("/{batch_id}/archive")
+async def download_batch_archive(batch_id: str):
+    """Download every completed output of a batch as one ZIP, with a manifest.json.
+
+    The archive is streamed as it is built and can be fetched while the batch
+    is still running; the manifest's `complete` flag says whether it was.
+    """
+    if not job_queue.get_batch_status(batch_id):
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    return StreamingResponse(
+        batch_archiver.stream(batch_id),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="batch-{batch_id}.zip"'},
+    )
+
+
+@router.delete("/{batch_id}")
+async def cancel_batch(batch_id: str):
+    """Cancel a batch. Running captures are stopped; completed results are kept."""
+    return await _change_batch(job_queue.cancel_batch, batch_id)
+
+
+@router.post("/{batch_id}/pause")
+async def pause_batch(batch_id: str):
+    """Stop dispatching a batch's jobs; running captures are stopped and redone on resume."""
+    return await _change_batch(job_queue.pause_batch, batch_id)
+
+
+@router.post("/{batch_id}/resume")
+async def resume_batch(batch_id: str):
+    """Continue a paused batch."""
+    return await _change_batch(job_queue.resume_batch, batch_id)
+
+
+async def _change_batch(operation, batch_id: str) -> dict:
+    try:
+        status = await operation(batch_id)
+    except BatchStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if not status:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    return {"success": True, "batch": status}
+
+
+def _sse(event: dict) -> str:
+    lines = []
+    if "id" in event:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['event']}")
+    lines.append(f"data: {json.dumps(event['data'], default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/{batch_id}/events")
+async def stream_batch_events(
+    batch_id: str,
+    request: Request,
+    last_event_id: int | None = Query(None, ge=0, description="Resume after this event id"),
+):
+    """Stream batch progress as Server-Sent Events.
+
+    Emits a `job` event per finished job, a `progress` summary every few
+    seconds and a final `done` event. Reconnecting clients resume from the
+    `Last-Event-ID` header (or the `last_event_id` parameter).
+    """
+    if not await job_queue.get_batch(batch_id):
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    header = request.headers.get("last-event-id", "")
+    cursor = last_event_id if last_event_id is not None else int(header) if header.isdigit() else 0
+
+    async def stream():
+        yield "retry: 3000\n\n"
+        async for event in job_queue.subscribe(batch_id, cursor):
+            if await request.is_disconnected():
+                break
+            yield _sse(event)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/{batch_id}/ws")
+async def batch_events_websocket(websocket: WebSocket, batch_id: str, last_event_id: int = 0):
+    """Stream the same events as `/events` over a WebSocket, one JSON message each."""
+    await websocket.accept()
+    if not await job_queue.get_batch(batch_id):
+        await websocket.close(code=4404, reason="Batch not found")
+        return
+
+    async def send_events():
+        async for event in job_queue.subscribe(batch_id, last_event_id):
+            await websocket.send_text(json.dumps(event, default=str))
+
+    async def wait_for_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    sender = asyncio.create_task(send_events())
+    receiver = asyncio.create_task(wait_for_disconnect())
+    done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+
+    if sender in done:
+        if sender.exception():
+            logger.error(f"Event stream for batch {batch_id} failed: {sender.exception()}")
+        await websocket.close()
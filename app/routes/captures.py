@@ -0,0 +1,37 @@
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Query
+
+from ..services.artifact_store import artifact_store
+from ..services.capture_index import capture_index
+
+router = APIRouter(prefix="/api/captures", tags=["captures"])
+
+
+@router.get("")
+async def list_captures(
+    kind: Literal["screenshot", "video"] | None = None,
+    url: str | None = Query(None, description="Exact source URL"),
+    request_hash: str | None = Query(None, description="Captures made with identical options"),
+    format: str | None = None,
+    cursor: int | None = Query(None, ge=1, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """List this node's stored captures, newest first, optionally filtered."""
+    rows = capture_index.search(
+        kind=kind, url=url, request_hash=request_hash, format=format, before=cursor, limit=limit + 1,
+    )
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    return {
+        "success": True,
+        "captures": [record.to_dict() for _, record in rows[:limit]],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/{capture_id}")
+async def get_capture(capture_id: str):
+    """Metadata of every stored output of a capture, made by this node or another."""
+    outputs = await artifact_store.outputs(capture_id)
+    if not outputs:
+        raise HTTPException(status_code=404, detail="Capture not found")
+    return {"success": True, "outputs": [record.to_dict() for record in outputs]}
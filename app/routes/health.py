@@ -2,6 +2,7 @@ from datetime import datetime
 from fastapi import APIRouter
 
 from ..services.browser_pool import browser_pool
+from ..services.retention import retention_manager
 from ..models.schemas import HealthResponse
 
 router = APIRouter(tags=["health"])
@@ -17,6 +18,7 @@ async def health_check():
         timestamp=datetime.utcnow(),
         uptime=(datetime.utcnow() - _start_time).total_seconds(),
         browser=browser_pool.status,
+        storage=retention_manager.status,
     )
 
 
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import RedirectResponse
 
 from ..models.schemas import ScreenshotRequest, ScreenshotResponse
+from ..services.artifact_store import artifact_store
 from ..services.capture import capture_service
+from ..services.errors import AdmissionRejected, RemoteCaptureError
+from ..services.storage import IMMUTABLE
+from ..services.capture_index import capture_index
+from ..services.webhooks import webhook_dispatcher
 from ..utils.logger import logger
+from ..utils.file_response import file_response
 
 router = APIRouter(prefix="/api/screenshot", tags=["screenshot"])
 
@@ -13,22 +19,39 @@ async def create_screenshot(request: ScreenshotRequest):
     """Capture a screenshot of the specified URL."""
     try:
         result = await capture_service.capture_screenshot(request)
-        return result
     except ValueError as e:
+        webhook_dispatcher.capture_finished(request, "screenshot", error=str(e))
         raise HTTPException(status_code=400, detail=str(e))
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Screenshot failed: {e}")
+        webhook_dispatcher.capture_finished(request, "screenshot", error="Screenshot capture failed")
         raise HTTPException(status_code=500, detail="Screenshot capture failed")
 
+    webhook_dispatcher.capture_finished(request, "screenshot", result)
+    return result
+
 
 @router.get("/{screenshot_id}")
-async def get_screenshot(screenshot_id: str):
-    """Download a screenshot by ID."""
-    filepath = await capture_service.get_screenshot(screenshot_id)
+async def get_screenshot(screenshot_id: str, request: Request):
+    """Download a screenshot by ID.
+
+    Screenshots never change, so responses carry a content-hash ETag and a
+    long-lived immutable Cache-Control, and support Range and conditional
+    requests. Everything comes from the capture index; no stat per request.
+    """
+    record = await capture_service.get_screenshot(screenshot_id)
 
-    if not filepath:
+    if not record:
         raise HTTPException(status_code=404, detail="Screenshot not found")
 
+    capture_index.touch(record)
+    filepath = artifact_store.local_path(record)
+    if filepath is None:
+        # Remote storage: the client fetches the object directly
+        return RedirectResponse(artifact_store.download_url(record), status_code=307)
+
     # Determine media type from extension
     ext = filepath.suffix.lower()
     media_types = {
@@ -38,17 +61,25 @@ async def get_screenshot(screenshot_id: str):
         ".webp": "image/webp",
     }
 
-    return FileResponse(
+    return file_response(
+        request,
         filepath,
-        media_type=media_types.get(ext, "application/octet-stream"),
-        filename=filepath.name,
+        media_types.get(ext, "application/octet-stream"),
+        filename=f"{record.id}.{record.format}",
+        etag=record.etag,
+        cache_control=IMMUTABLE,
+        size=record.size,
+        modified=record.created_at,
     )
 
 
 @router.delete("/{screenshot_id}")
 async def delete_screenshot(screenshot_id: str):
     """Delete a screenshot by ID."""
-    deleted = await capture_service.delete_screenshot(screenshot_id)
+    try:
+        deleted = await capture_service.delete_screenshot(screenshot_id)
+    except RemoteCaptureError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
     if not deleted:
         raise HTTPException(status_code=404, detail="Screenshot not found")
@@ -1,53 +1,122 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from typing import Literal
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import RedirectResponse, Response
 
 from ..models.schemas import VideoRequest, VideoResponse
+from ..services.artifact_store import artifact_store
 from ..services.video import video_service
+from ..services.ffmpeg import ffmpeg_runner
+from ..services.errors import AdmissionRejected, RemoteCaptureError
+from ..services.storage import IMMUTABLE
+from ..services.capture_index import capture_index
+from ..services.webhooks import webhook_dispatcher
+from ..utils.disconnect import ClientDisconnected, cancel_on_disconnect
 from ..utils.logger import logger
+from ..utils.file_response import file_response, growing_file_response
 
 router = APIRouter(prefix="/api/video", tags=["video"])
 
+MEDIA_TYPES = {
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+    ".gif": "image/gif",
+}
+
 
 @router.post("", response_model=VideoResponse)
-async def create_video(request: VideoRequest):
-    """Capture a scrolling video of the specified URL."""
+async def create_video(request: VideoRequest, http_request: Request):
+    """Capture a scrolling video of the specified URL.
+
+    If the client disconnects first, the capture and its encode are cancelled,
+    unless a `callback_url` is waiting for the result.
+    """
     try:
-        result = await video_service.capture_video(request)
-        return result
+        capture = video_service.capture_video(request)
+        if request.callback_url:
+            result = await capture
+        else:
+            result = await cancel_on_disconnect(http_request, capture)
+    except ClientDisconnected:
+        logger.info(f"Video capture of {request.url} cancelled: client disconnected")
+        # Nobody is listening; nginx's "client closed request"
+        return Response(status_code=499)
     except ValueError as e:
+        webhook_dispatcher.capture_finished(request, "video", error=str(e))
         raise HTTPException(status_code=400, detail=str(e))
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         logger.error(f"Video capture failed: {e}")
+        webhook_dispatcher.capture_finished(request, "video", error="Video capture failed")
         raise HTTPException(status_code=500, detail="Video capture failed")
 
+    # Progressive videos report to the callback once the encode finishes
+    if result.status == "completed":
+        webhook_dispatcher.capture_finished(request, "video", result)
+    return result
+
+
+@router.get("/encodes")
+async def list_encodes():
+    """Progress of videos currently being encoded."""
+    return {"success": True, "encodes": ffmpeg_runner.active}
+
 
 @router.get("/{video_id}")
-async def get_video(video_id: str):
-    """Download a video by ID."""
-    filepath = await video_service.get_video(video_id)
+async def get_video(video_id: str, request: Request, format: Literal["mp4", "webm", "gif"] | None = None):
+    """Download a video by ID. Use `format` to pick one of several encoded outputs.
 
-    if not filepath:
-        raise HTTPException(status_code=404, detail="Video not found")
+    Finished videos never change: they carry a content-hash ETag and an
+    immutable Cache-Control and support Range and conditional requests, all
+    answered from the capture index. Progressive videos that are still
+    recording are streamed as they are written.
+    """
+    if video_service.is_processing(video_id):
+        if format not in (None, "mp4"):
+            # Progressive captures only ever produce mp4
+            raise HTTPException(status_code=404, detail=f"Video not available as {format}")
+        filepath = await video_service.wait_for_output(video_id, format)
+        if filepath and video_service.is_processing(video_id):
+            try:
+                # Opened before responding, so a commit moving the file can't break the stream
+                return await growing_file_response(
+                    filepath,
+                    MEDIA_TYPES[".mp4"],
+                    is_growing=lambda: video_service.is_processing(video_id),
+                )
+            except FileNotFoundError:
+                # Committed since; serve the stored file instead
+                pass
 
-    # Determine media type from extension
-    ext = filepath.suffix.lower()
-    media_types = {
-        ".mp4": "video/mp4",
-        ".webm": "video/webm",
-        ".gif": "image/gif",
-    }
+    # Finished, possibly while we waited: the temp file has moved into storage
+    record = await video_service.get_video(video_id, format)
+    if not record:
+        raise HTTPException(status_code=404, detail="Video not found")
+    capture_index.touch(record)
+    filepath = artifact_store.local_path(record)
+    if filepath is None:
+        # Remote storage: the client fetches the object directly
+        return RedirectResponse(artifact_store.download_url(record), status_code=307)
 
-    return FileResponse(
+    return file_response(
+        request,
         filepath,
-        media_type=media_types.get(ext, "application/octet-stream"),
-        filename=filepath.name,
+        MEDIA_TYPES.get(filepath.suffix.lower(), "application/octet-stream"),
+        filename=f"{record.id}.{record.format}",
+        etag=record.etag,
+        cache_control=IMMUTABLE,
+        size=record.size,
+        modified=record.created_at,
     )
 
 
 @router.delete("/{video_id}")
 async def delete_video(video_id: str):
     """Delete a video by ID."""
-    deleted = await video_service.delete_video(video_id)
+    try:
+        deleted = await video_service.delete_video(video_id)
+    except RemoteCaptureError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
     if not deleted:
         raise HTTPException(status_code=404, detail="Video not found")
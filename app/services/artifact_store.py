@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import AsyncIterator
+
+from .capture_index import CaptureRecord, capture_index
+from .errors import RemoteCaptureError
+from .storage import create_backend
+from ..config import get_settings
+from ..utils.logger import logger
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ArtifactStore:
+    """Content-addressed storage for capture outputs.
+
+    Outputs are written to a temp file first (`output_dir/tmp`), then hashed
+    and handed to the storage backend as `objects/ab/cd/<sha256>.<ext>`. The
+    local backend moves them there with an atomic rename, so readers never
+    see a partial file, and the two-level shard keeps directories small
+    however many files are stored. Captures with identical bytes share one
+    file: the capture index counts its references, and the file is deleted
+    with the last capture that uses it.
+
+    Deleting a file takes two short index transactions around the storage
+    call: the first claims unreferenced files, the second forgets them. A
+    capture of the same content committed in between (by any process)
+    waits for the deletion to finish and then stores the file again.
+
+    With storage shared between nodes, each capture's outputs are also
+    published as a manifest. Lookups that miss the local index fall back to
+    it, so any node can serve any capture; only the node that made a
+    capture deletes it.
+    """
+
+    # Seconds between checks while waiting for another deletion of the same file
+    DELETE_POLL_INTERVAL = 0.05
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.temp_dir = self.settings.output_dir / "tmp"
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        self.backend = create_backend(self.settings)
+
+    def temp_path(self, name: str) -> Path:
+        """Where to write an output before it is committed."""
+        return self.temp_dir / name
+
+    @staticmethod
+    def _digest(path: Path) -> str:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    async def commit(self, outputs: list[tuple[Path, CaptureRecord]]):
+        """Move finished temp files into storage and index them.
+
+        Fills in each record's `path` and `size`. The index row is written
+        before the file is stored: once it exists, a concurrent delete of a
+        capture with the same content keeps the file, and a delete already
+        under way is waited out. Outputs are stored concurrently; if any
+        fails, the capture is unindexed again.
+        """
+        for temp, record in outputs:
+            digest = await asyncio.to_thread(self._digest, temp)
+            record.path = f"{self.backend.namespace}objects/{digest[:2]}/{digest[2:4]}/{digest}.{record.format}"
+            record.size = temp.stat().st_size
+        records = [record for _, record in outputs]
+        busy = capture_index.add(records)
+
+        try:
+            while busy:
+                await asyncio.sleep(self.DELETE_POLL_INTERVAL)
+                busy = capture_index.deleting(busy)
+            stored = await asyncio.gather(*(self.backend.put(r.path, temp) for temp, r in outputs))
+        except BaseException:
+            for temp, _ in outputs:
+                temp.unlink(missing_ok=True)
+            await self.delete_outputs(records)
+            raise
+
+        for record, written in zip(records, stored):
+            if not written:
+                logger.info(f"Stored {record.id}.{record.format}: identical to {record.path}, deduplicated")
+        await self._publish({record.id for record in records})
+
+    async def get(self, capture_id: str, kind: str, format: str | None = None) -> CaptureRecord | None:
+        """Look up an output by id, made by this node or another; without `format`, the primary one."""
+        record = capture_index.get(capture_id, kind, format)
+        if record or not self.backend.shared:
+            return record
+        for record in await self.outputs(capture_id):
+            if record.kind == kind and format in (None, record.format):
+                return record
+        return None
+
+    async def outputs(self, capture_id: str) -> list[CaptureRecord]:
+        """Every output of a capture, primary first, made by this node or another."""
+        records = [record for _, record in reversed(capture_index.search(capture_id=capture_id, limit=100))]
+        if records or not self.backend.shared:
+            return records
+        manifest = await self.backend.get_manifest(capture_id)
+        return [CaptureRecord.from_dict(output) for output in manifest["outputs"]] if manifest else []
+
+    async def delete(self, capture_id: str, kind: str) -> bool:
+        """Delete every output of a capture, and the stored files nothing else uses.
+
+        Raises RemoteCaptureError for a capture another node made.
+        """
+        with capture_index.transaction():
+            removed = capture_index.remove(capture_id, kind)
+            orphans = capture_index.claim_orphans()
+        if removed:
+            await self._publish({capture_id})
+        elif self.backend.shared:
+            manifest = await self.backend.get_manifest(capture_id)
+            if manifest and manifest["node"] != self.backend.node_id:
+                if any(output["kind"] == kind for output in manifest["outputs"]):
+                    raise RemoteCaptureError(manifest["node"])
+        await self._delete_stored(orphans)
+        return bool(removed)
+
+    async def delete_outputs(self, records: list[CaptureRecord]) -> int:
+        """Delete individual outputs; returns how many stored files were freed."""
+        with capture_index.transaction():
+            capture_index.remove_outputs(records)
+            orphans = capture_index.claim_orphans()
+        await self._publish({record.id for record in records})
+        return await self._delete_stored(orphans)
+
+    async def _publish(self, capture_ids: set[str]):
+        """Bring the shared manifests of these captures in line with the local index."""
+        if not self.backend.shared:
+            return
+
+        async def publish(capture_id: str):
+            rows = capture_index.search(capture_id=capture_id, limit=100)
+            try:
+                if rows:
+                    outputs = [record.to_dict() for _, record in reversed(rows)]
+                    await self.backend.put_manifest(capture_id, {"outputs": outputs})
+                else:
+                    await self.backend.delete_manifest(capture_id)
+            except Exception as e:
+                # The capture itself is stored; other nodes just can't find it (or still can)
+                logger.warning(f"Couldn't update the shared manifest of {capture_id}: {e}")
+
+        await asyncio.gather(*(publish(capture_id) for capture_id in capture_ids))
+
+    async def _delete_stored(self, paths: list[str]) -> int:
+        """Remove claimed files from storage, outside any index transaction."""
+        if not paths:
+            return 0
+        try:
+            await self.backend.delete(paths)
+        except BaseException:
+            # Unclaimed again, so the next delete retries them
+            capture_index.finish_deleting(paths, deleted=False)
+            raise
+        readded = capture_index.finish_deleting(paths)
+        for path in readded:
+            logger.info(f"{path} was saved again while being deleted; storing it anew")
+        return len(paths) - len(readded)
+
+    def local_path(self, record: CaptureRecord) -> Path | None:
+        """Local file to serve a download from, or None if the backend is remote."""
+        return self.backend.local_path(record.path)
+
+    def download_url(self, record: CaptureRecord) -> str | None:
+        """Presigned URL to redirect a download to, for remote backends."""
+        return self.backend.presigned_url(record.path, f"{record.id}.{record.format}")
+
+    def read(self, record: CaptureRecord) -> AsyncIterator[bytes]:
+        return self.backend.read(record.path)
+
+    def cleanup_temp(self, max_age: float = 3600):
+        """Remove temp files left behind by captures that died before committing."""
+        cutoff = time.time() - max_age
+        removed = 0
+        with os.scandir(self.temp_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    removed += 1
+        if removed:
+            logger.info(f"Removed {removed} stale temp files")
+
+
+# Global artifact store instance
+artifact_store = ArtifactStore()
@@ -0,0 +1,103 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator
+from urllib.parse import urlsplit
+
+from .artifact_store import artifact_store
+from .job_queue import job_queue
+from ..config import get_settings
+from ..utils.logger import logger
+from ..utils.zip_stream import ZipEntryError, ZipStream
+
+FINISHED = ("completed", "failed", "cancelled")
+
+
+class BatchArchiver:
+    """Streams a batch's outputs as a ZIP, built while it is being sent.
+
+    Jobs are read page by page from the queue, so it works for inline and
+    external batches alike. A batch that is still running gets whatever had
+    completed by the time the listing reached each job; the manifest says
+    whether the archive is complete. Outputs that can't be opened are listed
+    as missing; one that fails part-way through aborts the download, since
+    its partial entry is already sent.
+    """
+
+    PAGE_SIZE = 500
+
+    def __init__(self):
+        self.settings = get_settings()
+
+    async def stream(self, batch_id: str) -> AsyncIterator[bytes]:
+        zip_stream = ZipStream()
+        status = job_queue.get_batch_status(batch_id)
+        complete = bool(status) and status["status"] in FINISHED
+        manifest_jobs = []
+        position = 0
+        cursor = 0
+
+        while cursor is not None:
+            page = job_queue.list_jobs(batch_id, status=None, cursor=cursor, limit=self.PAGE_SIZE)
+            if page is None:
+                # Deleted while we were streaming
+                break
+            for job in page["jobs"]:
+                position += 1
+                entry = {key: job[key] for key in ("id", "url", "type", "status", "error")}
+                entry["files"] = []
+                if job["status"] == "completed" and job["result"]:
+                    for suffix, kind, capture_id, filename in self._outputs(job):
+                        name = self._entry_name(position, job["url"], suffix, filename)
+                        record = await artifact_store.get(capture_id, kind, Path(filename).suffix[1:])
+                        try:
+                            if not record:
+                                raise FileNotFoundError(filename)
+                            chunks = artifact_store.read(record)
+                            async for chunk in zip_stream.add_stream(name, chunks, record.size, record.created_at):
+                                yield chunk
+                        except ZipEntryError as e:
+                            # Part of the file is already sent; abort rather than ship a short entry
+                            logger.error(f"Archive {batch_id}: aborted, {e}")
+                            raise
+                        except Exception as e:
+                            logger.warning(f"Archive {batch_id}: {filename} is unavailable ({e}), skipped")
+                            entry.setdefault("missing", []).append(filename)
+                            continue
+                        entry["files"].append(name)
+                manifest_jobs.append(entry)
+            cursor = page["next_cursor"]
+
+        manifest = {
+            "batch_id": batch_id,
+            "generated_at": datetime.utcnow().isoformat(),
+            "complete": complete,
+            "summary": job_queue.get_batch_status(batch_id),
+            "jobs": manifest_jobs,
+        }
+        yield zip_stream.add_bytes("manifest.json", json.dumps(manifest, indent=2).encode())
+        yield zip_stream.close()
+
+    @staticmethod
+    def _outputs(job: dict) -> list[tuple[str | None, str, str, str]]:
+        """(name suffix, kind, capture id, filename) of every file a completed job produced."""
+        result = job["result"]
+        if job["type"] == "viewports":
+            return [
+                (f"{v['width']}x{v['height']}", "screenshot", v["id"], v["filename"])
+                for v in result["viewports"]
+            ]
+        if job["type"] == "video":
+            outputs = result.get("outputs") or [result]
+            return [(None, "video", result["id"], output["filename"]) for output in outputs]
+        return [(None, "screenshot", result["id"], result["filename"])]
+
+    @staticmethod
+    def _entry_name(position: int, url: str, suffix: str | None, filename: str) -> str:
+        host = urlsplit(url).hostname or "capture"
+        stem = f"{position:05d}_{host}" + (f"_{suffix}" if suffix else "")
+        return f"{stem}{Path(filename).suffix}"
+
+
+# Global batch archiver instance
+batch_archiver = BatchArchiver()
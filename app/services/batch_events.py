@@ -0,0 +1,53 @@
+import asyncio
+from collections import deque
+
+
+class EventLog:
+    """Append-only, numbered event log for one batch.
+
+    Subscribers resume from the last id they saw; only the most recent
+    `maxlen` events are retained, so a subscriber that fell further behind
+    than that continues from the oldest event still held.
+    """
+
+    def __init__(self, maxlen: int = 10000):
+        self._events: deque[dict] = deque(maxlen=maxlen)
+        self._last_id = 0
+        self._changed = asyncio.Event()
+        self.closed = False
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, event: str, data: dict) -> int:
+        self._last_id += 1
+        self._events.append({"id": self._last_id, "event": event, "data": data})
+        self._wake()
+        return self._last_id
+
+    def close(self):
+        """No more events will be published (the batch finished)."""
+        self.closed = True
+        self._wake()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def since(self, last_id: int) -> list[dict]:
+        if not self._events or last_id >= self._last_id:
+            return []
+        first_id = self._events[0]["id"]
+        start = max(0, last_id - first_id + 1)
+        return list(self._events)[start:]
+
+    async def wait(self, last_id: int, timeout: float) -> bool:
+        """Wait up to `timeout` for events newer than `last_id` (or close). Returns True if woken."""
+        if last_id < self._last_id or self.closed:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
@@ -5,6 +5,8 @@ from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
+from .errors import DeadlineExceeded
+from .scheduler import CaptureScheduler, current_deadline
 from ..utils.logger import logger
 from ..config import get_settings
 
@@ -88,6 +90,21 @@ class BrowserPool:
         self._lock = asyncio.Lock()
         self._initialized = False
         self._active_count = 0
+        self._replacements: set[asyncio.Task] = set()
+        # Admission control and fair queuing in front of the pool, sized by the
+        # drivers that really started
+        self.scheduler = CaptureScheduler(
+            lambda: self.capacity,
+            max_queue=self.settings.admission_max_queue,
+            max_wait=self.settings.admission_max_wait,
+        )
+
+    @property
+    def capacity(self) -> int:
+        """Number of usable drivers (configured size until the pool is initialized)."""
+        if self._initialized:
+            return len(self._drivers)
+        return self.settings.max_concurrent
 
     def _create_chrome_options(self) -> Options:
         """Create Chrome options matching snapsht configuration."""
@@ -164,24 +181,25 @@ class BrowserPool:
 
         return driver
 
-    async def initialize(self):
-        """Initialize the browser pool with configured number of drivers."""
+    async def initialize(self, size: int | None = None):
+        """Initialize the browser pool with `size` drivers (default: MAX_CONCURRENT)."""
         if self._initialized:
             return
 
+        size = size or self.settings.max_concurrent
         async with self._lock:
             if self._initialized:
                 return
 
-            logger.info(f"Initializing browser pool with {self.settings.max_concurrent} drivers")
+            logger.info(f"Initializing browser pool with {size} drivers")
 
-            for i in range(self.settings.max_concurrent):
+            for i in range(size):
                 try:
                     # Create driver synchronously with delay to avoid race conditions
                     driver = self._create_driver()
                     self._drivers.append(driver)
                     await self._available.put(driver)
-                    logger.info(f"Created browser instance {i + 1}/{self.settings.max_concurrent}")
+                    logger.info(f"Created browser instance {i + 1}/{size}")
                     # Small delay between driver creations to avoid port conflicts
                     await asyncio.sleep(0.5)
                 except Exception as e:
@@ -230,29 +248,84 @@ class BrowserPool:
     async def get_driver(self, block_popups: bool = True) -> AsyncGenerator[webdriver.Chrome, None]:
         """Get a driver from the pool.
 
+        Callers wait their fair turn in the capture scheduler first; see
+        `capture_flow` for how batch work is attributed to its own flow.
+
         Args:
             block_popups: If True, blocks popup/ESP domains at network level
         """
         if not self._initialized:
             await self.initialize()
 
+        async with self.scheduler.slot():
+            # A capture_deadline runs from here; the checkout sees it as a
+            # cancellation and replaces the driver
+            deadline = asyncio.timeout(current_deadline())
+            try:
+                async with deadline:
+                    async with self._checkout(block_popups) as driver:
+                        yield driver
+            except TimeoutError:
+                if deadline.expired():
+                    # Told apart from timeouts raised by the capture itself
+                    raise DeadlineExceeded(current_deadline())
+                raise
+
+    @asynccontextmanager
+    async def _checkout(self, block_popups: bool) -> AsyncGenerator[webdriver.Chrome, None]:
         driver = await self._available.get()
         self._active_count += 1
 
+        abandoned = False
+
         try:
             # Enable network blocking for popup domains
             self._enable_network_blocking(driver, block_popups)
             yield driver
+        except asyncio.CancelledError:
+            abandoned = True
+            raise
         finally:
             self._active_count -= 1
-            # Reset driver state
-            try:
-                driver.delete_all_cookies()
-                # Clear network blocks
-                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': []})
-            except Exception:
-                pass
-            await self._available.put(driver)
+            if abandoned:
+                # The capture was cancelled (e.g. a job deadline) while a
+                # blocking call may still be running on this driver in an
+                # executor thread, so don't hand it out again; swap in a fresh one
+                task = asyncio.create_task(self._replace_driver(driver))
+                self._replacements.add(task)
+                task.add_done_callback(self._replacements.discard)
+            else:
+                # Reset driver state
+                try:
+                    driver.delete_all_cookies()
+                    # Clear network blocks
+                    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': []})
+                except Exception:
+                    pass
+                await self._available.put(driver)
+
+    async def _replace_driver(self, driver: webdriver.Chrome):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, driver.quit)
+        except Exception as e:
+            logger.warning(f"Error closing abandoned driver: {e}")
+
+        try:
+            replacement = await loop.run_in_executor(None, self._create_driver)
+        except Exception as e:
+            logger.error(f"Failed to replace abandoned driver: {e}")
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+            return
+
+        if driver in self._drivers:
+            self._drivers[self._drivers.index(driver)] = replacement
+            await self._available.put(replacement)
+            logger.info("Replaced abandoned browser instance")
+        else:
+            # Pool shut down meanwhile
+            replacement.quit()
 
     @property
     def status(self) -> dict:
@@ -262,6 +335,7 @@ class BrowserPool:
             "total_drivers": len(self._drivers),
             "active_drivers": self._active_count,
             "available_drivers": self._available.qsize() if self._initialized else 0,
+            "scheduler": self.scheduler.status,
         }
 
 
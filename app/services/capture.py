@@ -12,6 +12,10 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
 from .browser_pool import browser_pool
+from .errors import ServerError, ThrottledError
+from .artifact_store import artifact_store
+from .capture_index import CaptureRecord, request_hash
+from .retention import retention_manager
 from .popup_blocker import (
     ALL_POPUP_SELECTORS,
     generate_hiding_css,
@@ -21,6 +25,16 @@ from ..config import get_settings
 from ..utils.logger import logger
 from ..models.schemas import ScreenshotRequest, ScreenshotResponse
 
+# Page titles served instead of the real page when a site rate-limits us or
+# puts up a bot challenge (Cloudflare, Akamai, generic 429 pages)
+THROTTLE_TITLE_MARKERS = [
+    "just a moment",
+    "attention required",
+    "too many requests",
+    "access denied",
+    "please verify you are a human",
+]
+
 
 class CaptureService:
     def __init__(self):
@@ -31,11 +45,18 @@ class CaptureService:
         """Ensure output directory exists."""
         self.settings.output_dir.mkdir(parents=True, exist_ok=True)
 
-    async def capture_screenshot(self, request: ScreenshotRequest) -> ScreenshotResponse:
-        """Capture a screenshot using snapsht-style approach."""
+    async def capture_screenshot(
+        self, request: ScreenshotRequest, reject_error_pages: bool = False
+    ) -> ScreenshotResponse:
+        """Capture a screenshot using snapsht-style approach.
+
+        With `reject_error_pages` (batch jobs), rate-limit and challenge pages
+        raise ThrottledError and 5xx pages ServerError as soon as the page has
+        loaded, so nothing is saved for them and the job queue can retry.
+        """
         capture_id = str(uuid.uuid4())
         filename = f"{capture_id}.{request.format}"
-        filepath = self.settings.output_dir / filename
+        filepath = artifact_store.temp_path(filename)
 
         async with browser_pool.get_driver(block_popups=request.dismiss_popups) as driver:
             try:
@@ -51,6 +72,10 @@ class CaptureService:
                 # Wait for page load
                 await asyncio.sleep(request.wait_for / 1000)
 
+                status_code = self._response_status(driver)
+                if reject_error_pages:
+                    self._check_error_page(driver, str(request.url), status_code)
+
                 # Dismiss popups if requested
                 if request.dismiss_popups:
                     await self._dismiss_popups(driver)
@@ -81,25 +106,65 @@ class CaptureService:
                 # Save in requested format
                 await self._save_image(image, filepath, request.format, request.quality)
 
-                file_size = filepath.stat().st_size
-
-                logger.info(f"Screenshot saved: {filename} ({file_size} bytes)")
-
-                return ScreenshotResponse(
-                    id=capture_id,
-                    filename=filename,
-                    size=file_size,
-                    format=request.format,
-                    dimensions=dimensions,
-                    full_page=request.full_page,
-                    download_url=f"/api/screenshot/{capture_id}",
-                    created_at=datetime.utcnow(),
-                )
-
             except Exception as e:
                 logger.error(f"Screenshot capture failed: {e}")
+                filepath.unlink(missing_ok=True)
                 raise
 
+        # Stored once the browser is released, so uploads never hold up captures
+        record = CaptureRecord(
+            id=capture_id,
+            kind="screenshot",
+            format=request.format,
+            path=filename,
+            size=0,
+            url=str(request.url),
+            request_hash=request_hash(request),
+            **dimensions,
+        )
+        await artifact_store.commit([(filepath, record)])
+        retention_manager.check_quota()
+        file_size = record.size
+
+        logger.info(f"Screenshot saved: {filename} ({file_size} bytes)")
+
+        return ScreenshotResponse(
+            id=capture_id,
+            filename=filename,
+            size=file_size,
+            format=request.format,
+            dimensions=dimensions,
+            full_page=request.full_page,
+            download_url=f"/api/screenshot/{capture_id}",
+            status_code=status_code,
+            created_at=datetime.utcnow(),
+        )
+
+    def _check_error_page(self, driver, url: str, status_code: int | None):
+        """Raise ThrottledError for rate-limit or challenge pages, ServerError for 5xx pages."""
+        if status_code == 429:
+            raise ThrottledError(url, "HTTP 429")
+        if status_code and status_code >= 500:
+            raise ServerError(url, status_code)
+        try:
+            title = (driver.title or "").strip().lower()
+        except Exception:
+            return
+        for marker in THROTTLE_TITLE_MARKERS:
+            if marker in title:
+                raise ThrottledError(url, f"page title '{title[:80]}'")
+
+    def _response_status(self, driver) -> int | None:
+        """HTTP status of the main document, from the Navigation Timing API (Chrome 109+)."""
+        try:
+            status = driver.execute_script(
+                "const nav = performance.getEntriesByType('navigation')[0];"
+                "return nav ? nav.responseStatus : null;"
+            )
+        except Exception:
+            return None
+        return status or None
+
     async def _prepare_full_page(self, driver):
         """Resize browser to capture full page (snapsht approach)."""
         # Get full page dimensions
@@ -228,21 +293,13 @@ class CaptureService:
             None, lambda: image.save(filepath, format.upper(), **save_kwargs)
         )
 
-    async def get_screenshot(self, screenshot_id: str) -> Path | None:
-        """Get screenshot file path by ID."""
-        for ext in ["png", "jpeg", "webp"]:
-            filepath = self.settings.output_dir / f"{screenshot_id}.{ext}"
-            if filepath.exists():
-                return filepath
-        return None
+    async def get_screenshot(self, screenshot_id: str) -> CaptureRecord | None:
+        """Look up a screenshot, made by this node or another sharing its storage."""
+        return await artifact_store.get(screenshot_id, "screenshot")
 
     async def delete_screenshot(self, screenshot_id: str) -> bool:
         """Delete a screenshot."""
-        filepath = await self.get_screenshot(screenshot_id)
-        if filepath:
-            filepath.unlink()
-            return True
-        return False
+        return await artifact_store.delete(screenshot_id, "screenshot")
 
 
 # Global capture service instance
@@ -0,0 +1,356 @@
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from ..config import get_settings
+from ..utils.logger import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    format TEXT NOT NULL,
+    path TEXT NOT NULL,  -- storage key, shared by captures with identical content
+    size INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    url TEXT NOT NULL,
+    request_hash TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    accessed_at TEXT NOT NULL,
+    UNIQUE (id, format)
+);
+
+CREATE INDEX IF NOT EXISTS idx_captures_url ON captures (url, seq);
+CREATE INDEX IF NOT EXISTS idx_captures_request ON captures (request_hash, seq);
+CREATE INDEX IF NOT EXISTS idx_captures_kind_created ON captures (kind, created_at);
+CREATE INDEX IF NOT EXISTS idx_captures_accessed ON captures (accessed_at);
+
+-- Stored files and how many capture outputs reference each one. deleting_since
+-- is set while an unreferenced file is being removed from storage
+CREATE TABLE IF NOT EXISTS blobs (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    refs INTEGER NOT NULL,
+    deleting_since REAL
+);
+
+-- Running totals of stored files, kept by triggers so every process sees them without a scan
+CREATE TABLE IF NOT EXISTS capture_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    files INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO capture_totals VALUES (0, 0, 0);
+
+CREATE TRIGGER IF NOT EXISTS blob_referenced AFTER INSERT ON captures BEGIN
+    INSERT INTO blobs (path, size, refs) VALUES (NEW.path, NEW.size, 1)
+        ON CONFLICT (path) DO UPDATE SET refs = refs + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS blob_released AFTER DELETE ON captures BEGIN
+    UPDATE blobs SET refs = refs - 1 WHERE path = OLD.path;
+END;
+CREATE TRIGGER IF NOT EXISTS blob_added AFTER INSERT ON blobs BEGIN
+    UPDATE capture_totals SET files = files + 1, bytes = bytes + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS blob_removed AFTER DELETE ON blobs BEGIN
+    UPDATE capture_totals SET files = files - 1, bytes = bytes - OLD.size WHERE id = 0;
+END;
+"""
+
+
+def request_hash(request: BaseModel) -> str:
+    """Stable digest of the options that determine a capture's output."""
+    options = request.model_dump(mode="json", exclude={"callback_url"})
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()[:32]
+
+
+@dataclass(slots=True)
+class CaptureRecord:
+    id: str
+    kind: str  # screenshot or video
+    format: str
+    path: str  # storage key (relative to output_dir for local storage)
+    size: int
+    url: str
+    request_hash: str
+    width: int | None = None
+    height: int | None = None
+    created_at: datetime | None = None
+
+    @property
+    def etag(self) -> str:
+        """Strong ETag: the content hash for content-addressed files."""
+        stem = Path(self.path).stem
+        return f'"{stem}"' if "objects/" in self.path else f'"{stem}-{self.size:x}"'
+
+    @property
+    def download_url(self) -> str:
+        return f"/api/{self.kind}/{self.id}" + (f"?format={self.format}" if self.kind == "video" else "")
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat() if self.created_at else None
+        data["download_url"] = self.download_url
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CaptureRecord":
+        """Inverse of `to_dict`."""
+        fields = {name: data.get(name) for name in cls.__slots__}
+        if fields["created_at"]:
+            fields["created_at"] = datetime.fromisoformat(fields["created_at"])
+        return cls(**fields)
+
+
+class CaptureIndex:
+    """SQLite index of every stored capture output.
+
+    Rows are written when an output is saved, so downloads, deletes and
+    retention look files up with one indexed query instead of probing the
+    filesystem. The database lives next to the job store in STATE_DIR and is
+    shared by the API and worker processes (WAL mode). Outputs with identical
+    content point at one stored file, and the blobs table counts the
+    references to it. Download times used for LRU eviction are buffered in
+    memory and written by `flush`.
+    """
+
+    # Seconds after which a deletion that never finished (its process died) is taken over
+    DELETE_TIMEOUT = 300
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._accessed: dict[tuple[str, str], str] = {}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            # API and worker processes share the file; wait for locks instead of failing
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._migrate()
+            self._conn.executescript(SCHEMA)
+            logger.info(f"Capture index opened at {self.path}")
+        return self._conn
+
+    def _migrate(self):
+        """Bring indexes written by earlier versions up to the current schema."""
+        tables = {row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "captures" in tables and "blobs" not in tables:
+            self._migrate_blobs()
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(blobs)")}
+        if columns and "deleting_since" not in columns:
+            self._conn.execute("ALTER TABLE blobs ADD COLUMN deleting_since REAL")
+
+    def _migrate_blobs(self):
+        """Move indexes written before blob reference counting onto the blobs table."""
+        self._conn.executescript("""
+            BEGIN IMMEDIATE;
+            DROP TRIGGER IF EXISTS captures_added;
+            DROP TRIGGER IF EXISTS captures_removed;
+            CREATE TABLE blobs (path TEXT PRIMARY KEY, size INTEGER NOT NULL, refs INTEGER NOT NULL);
+            INSERT INTO blobs SELECT path, MAX(size), COUNT(*) FROM captures GROUP BY path;
+            UPDATE capture_totals SET files = (SELECT COUNT(*) FROM blobs),
+                bytes = (SELECT COALESCE(SUM(size), 0) FROM blobs) WHERE id = 0;
+            COMMIT;
+        """)
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction holding the database lock, shared with other processes, until it ends."""
+        conn = self._db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self):
+        if self._conn:
+            self.flush()
+            self._conn.close()
+            self._conn = None
+
+    @property
+    def needs_import(self) -> bool:
+        """Whether files saved before the index existed still have to be imported."""
+        return self._db().execute("PRAGMA user_version").fetchone()[0] == 0
+
+    def mark_imported(self):
+        self._db().execute("PRAGMA user_version = 1")
+
+    def add(self, records: list[CaptureRecord]) -> list[str]:
+        """Record newly saved outputs; a row already indexed for the same id and format is kept.
+
+        Returns the paths among them whose stored file is being deleted right
+        now; see `deleting`.
+        """
+        now = datetime.utcnow()
+        rows = [
+            (
+                r.id, r.kind, r.format, r.path, r.size, r.width, r.height, r.url, r.request_hash,
+                (r.created_at or now).isoformat(), (r.created_at or now).isoformat(),
+            )
+            for r in records
+        ]
+        self._db().executemany(
+            "INSERT OR IGNORE INTO captures (id, kind, format, path, size, width, height, url, "
+            "request_hash, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        # Referenced now, so no new deletion can start; only one already under way matters
+        return self.deleting([r.path for r in records])
+
+    def get(self, capture_id: str, kind: str, format: str | None = None) -> CaptureRecord | None:
+        """Look up an output by id; without `format`, the capture's primary output."""
+        query = "SELECT * FROM captures WHERE id = ? AND kind = ?"
+        params: list = [capture_id, kind]
+        if format:
+            query += " AND format = ?"
+            params.append(format)
+        row = self._db().execute(query + " ORDER BY seq LIMIT 1", params).fetchone()
+        return self._record(row) if row else None
+
+    def remove(self, capture_id: str, kind: str) -> list[CaptureRecord]:
+        """Drop every output of a capture from the index, returning what was removed."""
+        rows = self._db().execute(
+            "DELETE FROM captures WHERE id = ? AND kind = ? RETURNING *", (capture_id, kind)
+        ).fetchall()
+        return [self._record(row) for row in rows]
+
+    def remove_outputs(self, records: list[CaptureRecord]):
+        """Drop individual outputs (one format of a capture) from the index."""
+        self._db().executemany(
+            "DELETE FROM captures WHERE id = ? AND format = ?", [(r.id, r.format) for r in records]
+        )
+
+    def claim_orphans(self) -> list[str]:
+        """Mark stored files no capture references any more as being deleted, returning their paths.
+
+        Files claimed by a deleter that never finished are claimed again once
+        the claim is `DELETE_TIMEOUT` seconds old. Call `finish_deleting`
+        once they are gone from storage.
+        """
+        now = time.time()
+        rows = self._db().execute(
+            """
+            UPDATE blobs SET deleting_since = ?
+            WHERE refs <= 0 AND (deleting_since IS NULL OR deleting_since < ?)
+            RETURNING path
+            """,
+            (now, now - self.DELETE_TIMEOUT),
+        ).fetchall()
+        return [row["path"] for row in rows]
+
+    def finish_deleting(self, paths: list[str], deleted: bool = True) -> list[str]:
+        """End the deletion of claimed files.
+
+        Files still unreferenced are forgotten (or, if not `deleted`, left to
+        be claimed again). Returns the paths a capture referenced again while
+        they were being deleted; their captures store the file anew.
+        """
+        placeholders = ",".join("?" * len(paths))
+        with self.transaction():
+            if deleted:
+                self._conn.execute(f"DELETE FROM blobs WHERE path IN ({placeholders}) AND refs <= 0", paths)
+            rows = self._conn.execute(
+                f"UPDATE blobs SET deleting_since = NULL WHERE path IN ({placeholders}) RETURNING path, refs",
+                paths,
+            ).fetchall()
+        return [row["path"] for row in rows if row["refs"] > 0]
+
+    def deleting(self, paths: list[str]) -> list[str]:
+        """Those of `paths` whose stored file is being deleted by some process right now."""
+        rows = self._db().execute(
+            f"SELECT path FROM blobs WHERE path IN ({','.join('?' * len(paths))}) AND deleting_since >= ?",
+            [*paths, time.time() - self.DELETE_TIMEOUT],
+        ).fetchall()
+        return [row["path"] for row in rows]
+
+    def touch(self, record: CaptureRecord):
+        """Note a download; written on the next flush."""
+        self._accessed[(record.id, record.format)] = datetime.utcnow().isoformat()
+
+    def flush(self):
+        if not self._accessed or not self._conn:
+            return
+        updates = [(accessed, id_, fmt) for (id_, fmt), accessed in self._accessed.items()]
+        self._accessed.clear()
+        self._conn.executemany("UPDATE captures SET accessed_at = ? WHERE id = ? AND format = ?", updates)
+
+    def search(
+        self,
+        kind: str | None = None,
+        capture_id: str | None = None,
+        url: str | None = None,
+        request_hash: str | None = None,
+        format: str | None = None,
+        before: int | None = None,
+        limit: int = 100,
+    ) -> list[tuple[int, CaptureRecord]]:
+        """Newest captures first, as (seq, record); pass the last seq as `before` for the next page."""
+        query = "SELECT * FROM captures WHERE 1 = 1"
+        params: list = []
+        for column, value in (("kind", kind), ("id", capture_id), ("url", url), ("request_hash", request_hash), ("format", format)):
+            if value is not None:
+                query += f" AND {column} = ?"
+                params.append(value)
+        if before is not None:
+            query += " AND seq < ?"
+            params.append(before)
+        rows = self._db().execute(query + " ORDER BY seq DESC LIMIT ?", [*params, limit]).fetchall()
+        return [(row["seq"], self._record(row)) for row in rows]
+
+    def created_before(self, kind: str, cutoff: datetime, limit: int) -> list[CaptureRecord]:
+        rows = self._db().execute(
+            "SELECT * FROM captures WHERE kind = ? AND created_at < ? ORDER BY created_at LIMIT ?",
+            (kind, cutoff.isoformat(), limit),
+        ).fetchall()
+        return [self._record(row) for row in rows]
+
+    def least_recently_used(self, limit: int) -> list[tuple[CaptureRecord, int]]:
+        """Least recently downloaded outputs, with the reference count of their stored file."""
+        rows = self._db().execute(
+            "SELECT captures.*, blobs.refs FROM captures JOIN blobs ON blobs.path = captures.path "
+            "ORDER BY accessed_at LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [(self._record(row), row["refs"]) for row in rows]
+
+    def totals(self) -> tuple[int, int]:
+        """(files, bytes) actually stored; identical outputs share one file."""
+        row = self._db().execute("SELECT files, bytes FROM capture_totals WHERE id = 0").fetchone()
+        return row["files"], row["bytes"]
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> CaptureRecord:
+        return CaptureRecord(
+            id=row["id"],
+            kind=row["kind"],
+            format=row["format"],
+            path=row["path"],
+            size=row["size"],
+            url=row["url"],
+            request_hash=row["request_hash"],
+            width=row["width"],
+            height=row["height"],
+            created_at=datetime.fromisoformat(row["created_at"]),
+        )
+
+
+# Global capture index instance
+capture_index = CaptureIndex(get_settings().state_dir / "captures.db")
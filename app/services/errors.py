@@ -0,0 +1,88 @@
+import asyncio
+
+from selenium.common.exceptions import (
+    InvalidArgumentException,
+    InvalidSelectorException,
+    NoSuchElementException,
+    TimeoutException,
+    WebDriverException,
+)
+
+# Chrome network errors that won't go away on retry
+PERMANENT_NET_ERRORS = (
+    "ERR_NAME_NOT_RESOLVED",
+    "ERR_NAME_RESOLUTION_FAILED",
+    "ERR_ADDRESS_UNREACHABLE",
+    "ERR_CERT_",
+    "ERR_SSL_",
+    "ERR_BAD_SSL_CLIENT_AUTH_CERT",
+    "ERR_INVALID_URL",
+    "ERR_UNSAFE_PORT",
+    "ERR_BLOCKED_BY_CLIENT",
+)
+
+
+class CaptureError(Exception):
+    """Base class for capture failures the job queue treats specially."""
+
+
+class ThrottledError(CaptureError):
+    """The site rate-limited us or served a bot challenge instead of the page."""
+
+    def __init__(self, url: str, reason: str):
+        super().__init__(f"Throttled by {url}: {reason}")
+        self.url = url
+        self.reason = reason
+
+
+class AdmissionRejected(CaptureError):
+    """The capture queue is full (or the wait too long); the client should retry later."""
+
+    def __init__(self, retry_after: int, reason: str = "Capture queue is full"):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """A capture held its browser longer than its `capture_deadline`."""
+
+    def __init__(self, seconds: float):
+        super().__init__(f"Timed out after {seconds:g}s")
+        self.seconds = seconds
+
+
+class RemoteCaptureError(Exception):
+    """The capture was made by another node sharing the storage; only that node can delete it."""
+
+    def __init__(self, node: str):
+        super().__init__(f"Capture is stored by node {node}; delete it there")
+        self.node = node
+
+
+class BatchStateError(Exception):
+    """A batch operation (pause, resume, cancel) doesn't apply to the batch's current status."""
+
+
+class ServerError(CaptureError):
+    """The site answered with a 5xx error page."""
+
+    def __init__(self, url: str, status_code: int):
+        super().__init__(f"{url} returned HTTP {status_code}")
+        self.url = url
+        self.status_code = status_code
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether a failed capture is worth another attempt.
+
+    Timeouts, 5xx pages, dropped connections and driver/session hiccups are
+    transient; bad selectors, invalid URLs, DNS and certificate errors and
+    anything raised by our own validation are not.
+    """
+    if isinstance(exc, (ServerError, asyncio.TimeoutError, TimeoutException, ConnectionError)):
+        return True
+    if isinstance(exc, (InvalidSelectorException, NoSuchElementException, InvalidArgumentException)):
+        return False
+    if isinstance(exc, WebDriverException):
+        return not any(marker in str(exc) for marker in PERMANENT_NET_ERRORS)
+    return False
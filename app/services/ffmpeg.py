@@ -0,0 +1,256 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable
+
+from ..config import get_settings
+from ..utils.logger import logger
+
+# Set while the current task holds an encoder slot taken with `FFmpegRunner.slot`
+_holding_slot: ContextVar[bool] = ContextVar("holding_encoder_slot", default=False)
+
+
+class FFmpegError(RuntimeError):
+    """Raised when an FFmpeg invocation fails or times out."""
+
+    def __init__(self, message: str, returncode: int | None = None, stderr: str = ""):
+        super().__init__(message)
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+@dataclass
+class EncodeProgress:
+    """Live progress of a single FFmpeg run, parsed from `-progress` output."""
+    job_id: str
+    total_frames: int | None = None
+    frame: int = 0
+    fps: float = 0.0
+    speed: float | None = None
+    out_time_ms: int = 0
+    status: str = "starting"
+    returncode: int | None = None
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def percent(self) -> float | None:
+        if not self.total_frames:
+            return None
+        return round(min(self.frame / self.total_frames, 1.0) * 100, 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "frame": self.frame,
+            "total_frames": self.total_frames,
+            "percent": self.percent,
+            "fps": self.fps,
+            "speed": self.speed,
+            "elapsed": round(time.monotonic() - self.started_at, 3),
+        }
+
+
+@dataclass
+class EncodeResult:
+    elapsed: float
+    frames: int
+    speed: float | None
+
+
+class FFmpegRunner:
+    """Runs FFmpeg as an asyncio subprocess with progress, timeout and cancellation."""
+
+    # Only the tail of stderr is kept for error reporting
+    STDERR_TAIL = 4096
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._active: dict[str, EncodeProgress] = {}
+        # Bounds concurrent encodes so they don't oversubscribe the cores
+        self._slots = asyncio.Semaphore(self.settings.encoder_pool_size)
+
+    @property
+    def active(self) -> list[dict]:
+        """Progress of all queued and running encodes."""
+        return [p.to_dict() for p in self._active.values()]
+
+    @property
+    def threads_per_job(self) -> int:
+        """FFmpeg thread budget for one encode, given the encoder pool size."""
+        if self.settings.ffmpeg_threads:
+            return self.settings.ffmpeg_threads
+        return max(1, (os.cpu_count() or 1) // self.settings.encoder_pool_size)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold an encoder pool slot; runs started inside the block use it instead of waiting again."""
+        if _holding_slot.get():
+            yield
+            return
+        async with self._slots:
+            token = _holding_slot.set(True)
+            try:
+                yield
+            finally:
+                _holding_slot.reset(token)
+
+    def _parse_progress_line(self, progress: EncodeProgress, line: str):
+        key, _, value = line.partition("=")
+        value = value.strip()
+        try:
+            if key == "frame":
+                progress.frame = int(value)
+            elif key == "fps":
+                progress.fps = float(value)
+            elif key == "out_time_ms":
+                progress.out_time_ms = int(value)
+            elif key == "speed" and value.endswith("x"):
+                progress.speed = float(value[:-1])
+            elif key == "progress":
+                progress.status = "finished" if value == "end" else "encoding"
+        except ValueError:
+            # FFmpeg reports "N/A" before the first frame is out
+            pass
+
+    async def _read_progress(self, stream: asyncio.StreamReader, progress: EncodeProgress,
+                             on_progress: Callable[[EncodeProgress], None] | None):
+        while True:
+            line = await stream.readline()
+            if not line:
+                break
+            self._parse_progress_line(progress, line.decode(errors="replace"))
+            if on_progress and line.startswith(b"progress="):
+                on_progress(progress)
+
+    async def _read_stderr(self, stream: asyncio.StreamReader) -> bytes:
+        tail = b""
+        while True:
+            chunk = await stream.read(8192)
+            if not chunk:
+                return tail
+            tail = (tail + chunk)[-self.STDERR_TAIL:]
+
+    async def _write_stdin(self, proc: asyncio.subprocess.Process, source: AsyncIterator[bytes]):
+        try:
+            async for chunk in source:
+                proc.stdin.write(chunk)
+                await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # FFmpeg exited early; its return code and stderr tell the story
+            pass
+        finally:
+            proc.stdin.close()
+
+    async def _kill(self, proc: asyncio.subprocess.Process):
+        if proc.returncode is not None:
+            return
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            return
+        await proc.wait()
+
+    async def run(
+        self,
+        args: list[str],
+        job_id: str,
+        total_frames: int | None = None,
+        timeout: float | None = None,
+        on_progress: Callable[[EncodeProgress], None] | None = None,
+        stdin: AsyncIterator[bytes] | None = None,
+    ) -> EncodeResult:
+        """Run FFmpeg with the given arguments (everything after the binary name).
+
+        The process is killed if it exceeds `timeout` seconds or if the awaiting
+        task is cancelled (e.g. `/api/video` noticed its client disconnect). Runs wait for a slot in
+        the encoder pool first, unless the caller already holds one (see `slot`); the
+        timeout only covers FFmpeg itself.
+
+        If `stdin` is given, its chunks are piped to FFmpeg (e.g. `-i pipe:0`) and
+        the timeout starts once the input is exhausted.
+        """
+        timeout = timeout if timeout is not None else self.settings.ffmpeg_timeout
+        cmd = [
+            self.settings.ffmpeg_path, "-hide_banner", "-nostats",
+            "-progress", "pipe:1",
+            *args,
+        ]
+
+        progress = EncodeProgress(job_id=job_id, total_frames=total_frames, status="queued")
+        self._active[job_id] = progress
+
+        try:
+            async with self.slot():
+                progress.started_at = time.monotonic()
+                stderr_tail = await self._run_process(cmd, job_id, progress, timeout, on_progress, stdin)
+        finally:
+            self._active.pop(job_id, None)
+
+        elapsed = time.monotonic() - progress.started_at
+
+        if progress.returncode != 0:
+            stderr_text = stderr_tail.decode(errors="replace")
+            logger.error(f"FFmpeg exited with {progress.returncode}: {stderr_text[-500:]}")
+            raise FFmpegError(
+                f"FFmpeg exited with code {progress.returncode}",
+                returncode=progress.returncode,
+                stderr=stderr_text,
+            )
+
+        return EncodeResult(elapsed=elapsed, frames=progress.frame, speed=progress.speed)
+
+    async def _run_process(
+        self,
+        cmd: list[str],
+        job_id: str,
+        progress: EncodeProgress,
+        timeout: float,
+        on_progress: Callable[[EncodeProgress], None] | None,
+        stdin: AsyncIterator[bytes] | None = None,
+    ) -> bytes:
+        """Spawn FFmpeg and wait for it, returning the tail of its stderr."""
+        progress.status = "starting"
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+        stdout_task = asyncio.create_task(self._read_progress(proc.stdout, progress, on_progress))
+        stderr_task = asyncio.create_task(self._read_stderr(proc.stderr))
+
+        try:
+            if stdin is not None:
+                await self._write_stdin(proc, stdin)
+            await asyncio.wait_for(proc.wait(), timeout=timeout)
+            await stdout_task
+            stderr_tail = await stderr_task
+        except asyncio.TimeoutError:
+            await self._kill(proc)
+            progress.status = "timeout"
+            raise FFmpegError(f"FFmpeg timed out after {timeout}s")
+        except asyncio.CancelledError:
+            await self._kill(proc)
+            progress.status = "cancelled"
+            logger.info(f"Encode {job_id} cancelled, FFmpeg killed")
+            raise
+        except Exception:
+            # Input source failed (e.g. capture error while streaming frames)
+            await self._kill(proc)
+            progress.status = "failed"
+            raise
+        finally:
+            stdout_task.cancel()
+            stderr_task.cancel()
+
+        progress.returncode = proc.returncode
+        return stderr_tail
+
+
+# Global FFmpeg runner instance
+ffmpeg_runner = FFmpegRunner()
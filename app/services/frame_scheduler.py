@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+
+class FrameScheduler:
+    """Schedules video frames against absolute wall-clock timestamps.
+
+    Frame `n` is due at `start + n / fps`. Sleeping until each slot (instead of
+    sleeping a fixed delay after each capture) keeps capture latency from
+    accumulating into drift. When a capture overruns, the slots that went by
+    are reported as missed so the caller can fill them with synthesized
+    (repeated) frames and the output keeps the requested frame rate.
+    """
+
+    def __init__(self, fps: int):
+        self.fps = fps
+        self.interval = 1 / fps
+        self.started_at: float | None = None
+        self.captures = 0
+        self.synthesized = 0
+        self._latency_total = 0.0
+
+    def start(self):
+        self.started_at = time.monotonic()
+
+    def slot_time(self, slot: int) -> float:
+        return self.started_at + slot * self.interval
+
+    def current_slot(self) -> int:
+        """Index of the slot whose time window we are currently in."""
+        return int((time.monotonic() - self.started_at) / self.interval)
+
+    async def wait_for_slot(self, slot: int):
+        delay = self.slot_time(slot) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record_capture(self, latency: float):
+        self.captures += 1
+        self._latency_total += latency
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at if self.started_at else 0.0
+
+    @property
+    def achieved_fps(self) -> float:
+        """Rate of real (non-synthesized) captures."""
+        return round(self.captures / self.elapsed, 2) if self.elapsed else 0.0
+
+    @property
+    def avg_capture_ms(self) -> float:
+        return round(self._latency_total / self.captures * 1000, 1) if self.captures else 0.0
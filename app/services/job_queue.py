@@ -1,144 +1,809 @@
 import asyncio
+import random
+import time
 import uuid
-from datetime import datetime
-from typing import Callable, Any
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable
 from dataclasses import dataclass, field
 
+from .batch_events import EventLog
+from .browser_pool import browser_pool
+from .errors import BatchStateError, ThrottledError, is_retryable
+from .job_store import JobStore
+from .politeness import HostScheduler
+from .preflight import preflight_checker
+from .scheduler import capture_deadline, capture_flow
+from .webhooks import webhook_dispatcher
+from ..config import get_settings
+from ..utils.domains import registrable_domain
 from ..utils.logger import logger
 
 
-@dataclass
+@dataclass(slots=True)
 class Job:
     id: str
     url: str
+    type: str = "screenshot"  # screenshot, video or viewports
+    options: dict = field(default_factory=dict)  # Overrides of the batch options for this job
     status: str = "pending"
     result: Any = None
     error: str | None = None
     created_at: datetime = field(default_factory=datetime.utcnow)
     started_at: datetime | None = None
     completed_at: datetime | None = None
+    preflight: dict | None = None  # PreflightResult, once checked
+    attempts: list[dict] = field(default_factory=list)  # One record per capture attempt
 
+    @property
+    def target_url(self) -> str:
+        """URL to capture: where pre-flight redirects led, else the submitted URL."""
+        return self.preflight["final_url"] if self.preflight else self.url
 
-@dataclass
+
+@dataclass(slots=True)
 class Batch:
     id: str
     jobs: list[Job]
     options: dict
     status: str = "pending"
+    priority: str = "batch"
+    # Bulk uploads keep their jobs in the store; `jobs` only holds those being worked on
+    bulk: bool = False
     created_at: datetime = field(default_factory=datetime.utcnow)
+    # Jobs per status, kept current by set_job_status
+    counts: Counter = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.counts = Counter(job.status for job in self.jobs)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def set_job_status(self, job: Job, status: str):
+        """Move a job to a new status, keeping the per-status counts in step."""
+        self.counts[job.status] -= 1
+        self.counts[status] += 1
+        job.status = status
+
+
+def summarize_batch(batch_id: str, status: str, counts: dict[str, int]) -> dict:
+    """Progress counts of a batch, as returned by the status endpoint and events."""
+    total = sum(counts.values())
+    finished = counts.get("completed", 0) + counts.get("failed", 0) + counts.get("cancelled", 0)
+    return {
+        "batch_id": batch_id,
+        "total_jobs": total,
+        "completed": counts.get("completed", 0),
+        "failed": counts.get("failed", 0),
+        "cancelled": counts.get("cancelled", 0),
+        "processing": counts.get("processing", 0),
+        "pending": counts.get("pending", 0),
+        "status": status,
+        "progress": round(finished / total * 100, 1) if total else 0,
+    }
+
+
+def job_event(
+    job_id: str,
+    url: str,
+    type: str,
+    status: str,
+    result: dict | None = None,
+    error: str | None = None,
+    preflight: dict | None = None,
+    attempts: list[dict] | None = None,
+    completed_at: datetime | None = None,
+) -> dict:
+    """A finished job as published in events and callbacks, whichever process ran it."""
+    return {
+        "job_id": job_id,
+        "url": url,
+        "type": type,
+        "status": status,
+        "result": result,
+        "error": error,
+        "preflight": preflight,
+        "attempts": attempts or [],
+        "completed_at": completed_at.isoformat() if completed_at else None,
+    }
+
+
+def failed_attempts(attempts: list[dict]) -> int:
+    """Attempts that count towards JOB_MAX_ATTEMPTS: throttling and interruptions don't."""
+    return sum(1 for a in attempts if not (a.get("throttled") or a.get("interrupted")))
+
+
+def retry_delay(failures: int) -> float:
+    """Exponential backoff with jitter: half the capped delay plus a random half."""
+    settings = get_settings()
+    delay = min(settings.job_retry_max_delay, settings.job_retry_base_delay * 2 ** (failures - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
 
 
 class JobQueue:
     def __init__(self):
+        self.settings = get_settings()
         self._batches: dict[str, Batch] = {}
         self._lock = asyncio.Lock()
+        self._store = JobStore(
+            self.settings.state_dir / "jobs.db",
+            flush_interval=self.settings.job_flush_interval,
+        )
+        self._tasks: set[asyncio.Task] = set()
+        # process_batch task per running batch, so it can be paused or cancelled
+        self._runners: dict[str, asyncio.Task] = {}
+        self._processor: Callable | None = None
+        self._events: dict[str, EventLog] = {}
+        # Wakes a running process_batch: bulk uploads adding jobs, retries coming due
+        self._wakeups: dict[str, asyncio.Event] = {}
+
+    @property
+    def external_workers(self) -> bool:
+        """Whether jobs are run by `app.worker` processes instead of this one."""
+        return self.settings.batch_workers == "external"
+
+    @property
+    def store(self) -> JobStore:
+        return self._store
 
-    async def create_batch(self, urls: list[str], options: dict) -> Batch:
-        """Create a new batch of jobs."""
+    async def start(self, processor: Callable):
+        """Open the job store and resume batches left unfinished by the last run."""
+        self._processor = processor
+        self._store.open()
+        self._store.start()
+
+        # Jobs that were mid-capture in a runner that stopped are run again;
+        # leased ones are left to their worker or lease expiry
+        self._store.requeue_unleased()
+        if self.external_workers:
+            return
+
+        for data in self._store.load_unfinished():
+            batch = self._batch_from_store(data)
+            if batch.status == "ingesting":
+                # The upload was cut off; run what made it in
+                logger.warning(f"Bulk upload for batch {batch.id} was interrupted")
+                batch.status = "processing"
+            self._batches[batch.id] = batch
+
+            logger.info(f"Resuming batch {batch.id} ({batch.counts['pending']}/{batch.total} jobs pending)")
+            self.run_batch(batch.id)
+
+    async def shutdown(self):
+        """Stop processing and flush job state to disk."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await preflight_checker.close()
+        await self._store.close()
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def run_batch(self, batch_id: str, processor: Callable | None = None):
+        """Process a batch in the background (with the processor given to `start` by default)."""
+        task = self._spawn(self.process_batch(batch_id, processor or self._processor))
+        self._runners[batch_id] = task
+
+        def forget(finished: asyncio.Task):
+            if self._runners.get(batch_id) is finished:
+                del self._runners[batch_id]
+
+        task.add_done_callback(forget)
+
+    async def _stop_runner(self, batch_id: str):
+        """Cancel a batch's process_batch task and wait until its captures have let go."""
+        task = self._runners.pop(batch_id, None)
+        if task:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def pause_batch(self, batch_id: str) -> dict | None:
+        """Stop dispatching a batch. In-flight captures are cancelled and run again on resume."""
+        if self.external_workers:
+            return self._set_stored_status(batch_id, "paused", ("pending", "processing"))
+
+        batch = self._get_batch(batch_id)
+        if not batch:
+            return None
+        if batch.status not in ("pending", "processing"):
+            raise BatchStateError(f"Can't pause a batch that is {batch.status}")
+
+        batch.status = "paused"
+        self._store.save_batch(batch)
+        await self._stop_runner(batch_id)
+        summary = self._batch_summary(batch)
+        self._event_log(batch).publish("paused", summary)
+        logger.info(f"Paused batch {batch_id} ({batch.counts['pending']} jobs pending)")
+        return summary
+
+    async def resume_batch(self, batch_id: str) -> dict | None:
+        if self.external_workers:
+            return self._set_stored_status(batch_id, "processing", ("paused",))
+
+        batch = self._get_batch(batch_id)
+        if not batch:
+            return None
+        if batch.status != "paused":
+            raise BatchStateError(f"Can't resume a batch that is {batch.status}")
+
+        batch.status = "processing"
+        self._store.save_batch(batch)
+        self._event_log(batch).publish("resumed", self._batch_summary(batch))
+        self.run_batch(batch_id)
+        logger.info(f"Resumed batch {batch_id}")
+        return self._batch_summary(batch)
+
+    async def cancel_batch(self, batch_id: str) -> dict | None:
+        """Stop a batch for good: in-flight captures are cancelled, unfinished jobs marked
+        cancelled, and completed results kept."""
+        unfinished = ("pending", "ingesting", "processing", "paused")
+        if self.external_workers:
+            return self._set_stored_status(batch_id, "cancelled", unfinished)
+
+        batch = self._get_batch(batch_id)
+        if not batch:
+            return None
+        if batch.status not in unfinished:
+            raise BatchStateError(f"Can't cancel a batch that is {batch.status}")
+
+        batch.status = "cancelled"
+        self._store.save_batch(batch)
+        await self._stop_runner(batch_id)
+
+        if batch.bulk:
+            # Most pending jobs are only in the store
+            self._store.flush()
+            cancelled = self._store.cancel_pending(batch_id)
+            batch.counts["pending"] -= cancelled
+            batch.counts["cancelled"] += cancelled
+            batch.jobs.clear()
+        else:
+            now = datetime.utcnow()
+            for job in batch.jobs:
+                if job.status == "pending":
+                    batch.set_job_status(job, "cancelled")
+                    job.completed_at = now
+                    self._store.save_job(job)
+
+        summary = self._batch_summary(batch)
+        events = self._event_log(batch)
+        events.publish("done", summary)
+        events.close()
+        self._callback(batch.options, "batch", summary)
+        logger.info(f"Cancelled batch {batch_id} ({batch.counts['cancelled']} jobs cancelled)")
+        return summary
+
+    def _set_stored_status(self, batch_id: str, status: str, allowed_from: tuple[str, ...]) -> dict | None:
+        """Pause/resume/cancel with external workers, who notice the change in the store."""
+        current = self._store.count_jobs(batch_id)
+        if not current:
+            return None
+        if not self._store.set_batch_status(batch_id, status, allowed_from):
+            raise BatchStateError(f"Batch is {current[0]}")
+        logger.info(f"Batch {batch_id} is now {status}")
+        summary = summarize_batch(batch_id, *self._store.count_jobs(batch_id))
+        if status == "cancelled":
+            self._callback(self._store.batch_options(batch_id), "batch", summary)
+        return summary
+
+    @staticmethod
+    def _callback(options: dict, event: str, data: dict):
+        """Queue an event for the batch's callback URL, if it gave one."""
+        if url := options.get("callback_url"):
+            webhook_dispatcher.send(url, event, data, flush=event == "batch")
+
+    def _batch_from_store(self, data: dict) -> Batch:
+        jobs = [Job(**job) for job in data.pop("jobs")]
+        batch = Batch(jobs=jobs, **data)
+        if batch.bulk:
+            batch.counts = Counter(self._store.count_jobs(batch.id)[1])
+        return batch
+
+    async def create_batch(self, specs: list[dict], options: dict, priority: str = "batch") -> Batch:
+        """Create a new batch of jobs.
+
+        Each spec has a "url" and optionally a job "type" and per-job "options".
+        """
         batch_id = str(uuid.uuid4())
 
         jobs = [
-            Job(id=str(uuid.uuid4()), url=str(url))
-            for url in urls
+            Job(id=str(uuid.uuid4()), **spec)
+            for spec in specs
         ]
 
-        batch = Batch(id=batch_id, jobs=jobs, options=options)
-        self._batches[batch_id] = batch
+        batch = Batch(id=batch_id, jobs=jobs, options=options, priority=priority)
+        self._store.insert_batch(batch)
+        if not self.external_workers:
+            self._batches[batch_id] = batch
 
         logger.info(f"Created batch {batch_id} with {len(jobs)} jobs")
         return batch
 
+    async def create_bulk_batch(self, options: dict, priority: str = "batch") -> Batch:
+        """Create an empty batch that jobs are streamed into with `ingest`."""
+        batch = Batch(
+            id=str(uuid.uuid4()), jobs=[], options=options, status="ingesting", priority=priority, bulk=True,
+        )
+        self._store.insert_batch(batch)
+        if not self.external_workers:
+            self._batches[batch.id] = batch
+            self._wakeups[batch.id] = asyncio.Event()
+
+        logger.info(f"Created bulk batch {batch.id}")
+        return batch
+
+    async def ingest(self, batch: Batch, urls: AsyncIterator[str], processor: Callable) -> dict:
+        """Add streamed URLs to a bulk batch in chunks of `bulk_chunk_size`.
+
+        Processing starts with the first chunk. URLs already in the batch are
+        skipped. Jobs only go to the store, and the batch's runner (or the
+        external workers) read them back a chunk at a time, so memory stays
+        bounded by the chunk size however large the upload.
+        """
+        if not self.external_workers:
+            self.run_batch(batch.id, processor)
+
+        accepted = duplicates = 0
+        chunk: list[str] = []
+
+        def flush_chunk():
+            nonlocal accepted, duplicates
+            jobs = [Job(id=str(uuid.uuid4()), url=url) for url in chunk]
+            inserted = self._store.insert_jobs(batch.id, jobs, first_seq=accepted)
+            accepted += len(inserted)
+            duplicates += len(jobs) - len(inserted)
+            chunk.clear()
+            if not self.external_workers:
+                batch.counts["pending"] += len(inserted)
+                self._wake(batch.id)
+
+        def cancelled() -> bool:
+            if self.external_workers:
+                return self._store.count_jobs(batch.id)[0] == "cancelled"
+            return batch.status == "cancelled"
+
+        try:
+            async for url in urls:
+                chunk.append(url)
+                if len(chunk) >= self.settings.bulk_chunk_size:
+                    if cancelled():
+                        logger.info(f"Bulk batch {batch.id} was cancelled; ignoring the rest of the upload")
+                        chunk.clear()
+                        break
+                    flush_chunk()
+            if chunk and not cancelled():
+                flush_chunk()
+        finally:
+            if self.external_workers:
+                # Workers may have finished every job before the upload did
+                if self._store.finish_ingest(batch.id):
+                    summary = summarize_batch(batch.id, *self._store.count_jobs(batch.id))
+                    self._callback(batch.options, "batch", summary)
+            elif batch.status == "ingesting":
+                batch.status = "processing"
+                self._store.save_batch(batch)
+                self._wake(batch.id)
+            logger.info(f"Bulk batch {batch.id}: {accepted} jobs added, {duplicates} duplicates skipped")
+
+        return {"accepted": accepted, "duplicates": duplicates}
+
+    def _wake(self, batch_id: str):
+        if event := self._wakeups.get(batch_id):
+            event.set()
+
     async def get_batch(self, batch_id: str) -> Batch | None:
         """Get batch by ID."""
-        return self._batches.get(batch_id)
+        return self._get_batch(batch_id)
+
+    def _get_batch(self, batch_id: str) -> Batch | None:
+        """Look up a batch in memory, falling back to the job store."""
+        if self.external_workers:
+            # Workers update the store directly, so memory would be stale
+            data = self._store.load_batch(batch_id)
+            return self._batch_from_store(data) if data else None
+
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            data = self._store.load_batch(batch_id)
+            if data:
+                batch = self._batch_from_store(data)
+                self._batches[batch_id] = batch
+        return batch
 
     async def process_batch(
         self,
         batch_id: str,
         processor: Callable,
-        max_concurrent: int = 3,
+        max_concurrent: int | None = None,
     ):
-        """Process all jobs in a batch."""
+        """Process all jobs in a batch.
+
+        Jobs run in the batch's own capture flow at the batch's priority, so the
+        browser pool's scheduler shares drivers fairly with other batches while
+        API requests go first. The processor is called with the job's URL, the
+        batch options, the job type and the job's own option overrides.
+        At most `max_concurrent` (default: the pool's driver count) are in flight.
+
+        With pre-flight enabled (batch option "preflight", default
+        BATCH_PREFLIGHT), every job is first checked for DNS and HTTP
+        reachability, concurrently and without a browser. Unreachable jobs fail
+        right away and the rest are captured at their final redirected URL.
+
+        Bulk batches are read from the store `bulk_chunk_size` pending jobs at
+        a time, topped up as the in-memory window drains, and finished jobs
+        leave memory once their result is saved.
+        """
         batch = self._batches.get(batch_id)
         if not batch:
             return
 
-        batch.status = "processing"
-        semaphore = asyncio.Semaphore(max_concurrent)
-
-        async def process_job(job: Job):
-            async with semaphore:
-                job.status = "processing"
-                job.started_at = datetime.utcnow()
-
-                try:
-                    result = await processor(job.url, batch.options)
-                    job.result = result
-                    job.status = "completed"
-                except Exception as e:
+        if max_concurrent is None:
+            max_concurrent = browser_pool.capacity
+
+        if batch.status != "ingesting":
+            batch.status = "processing"
+            self._store.save_batch(batch)
+        if batch.bulk:
+            # Start over from the store, where interrupted jobs were saved as pending
+            self._store.flush()
+            batch.jobs.clear()
+        events = self._event_log(batch)
+        wake = self._wakeups.setdefault(batch_id, asyncio.Event())
+
+        # Group jobs by site so each host gets polite, interleaved dispatch;
+        # jobs finished before a restart keep their results
+        hosts = HostScheduler(
+            max_per_host=self.settings.host_max_concurrent,
+            min_interval=self.settings.host_min_interval,
+            max_backoff=self.settings.host_max_backoff,
+        )
+        scheduled = 0
+        preflight = batch.options.get("preflight")
+        if preflight is None:
+            preflight = self.settings.batch_preflight
+        awaiting_preflight: deque[Job] = deque()
+        throttle_counts: dict[str, int] = {}
+        chunk_size = self.settings.bulk_chunk_size
+        # Bulk batches: store position read up to, and the job count when the store was last read to the end
+        read_seq = -1
+        read_all_of = None
+
+        def new_jobs() -> list[Job]:
+            nonlocal scheduled, read_seq, read_all_of
+            if not batch.bulk:
+                jobs = batch.jobs[scheduled:]
+                scheduled = len(batch.jobs)
+                return jobs
+            # Uploads still adding jobs change the total, so the store is worth reading again
+            if len(batch.jobs) >= chunk_size or read_all_of == batch.total:
+                return []
+            total = batch.total
+            rows = self._store.pending_jobs(batch.id, read_seq, chunk_size)
+            if len(rows) < chunk_size:
+                read_all_of = total
+            if rows:
+                read_seq = rows[-1][0]
+            jobs = [Job(**kwargs) for _, kwargs in rows]
+            batch.jobs.extend(jobs)
+            return jobs
+
+        def schedule_new_jobs():
+            for job in new_jobs():
+                if job.status != "pending":
+                    continue
+                if preflight and job.preflight is None:
+                    awaiting_preflight.append(job)
+                else:
+                    hosts.add(registrable_domain(job.target_url), job)
+
+        def job_finished(job: Job):
+            throttle_counts.pop(job.id, None)
+            if batch.bulk:
+                batch.jobs.remove(job)
+            job.completed_at = datetime.utcnow()
+            event = self._job_event(job)
+            events.publish("job", event)
+            self._callback(batch.options, "job", {"batch_id": batch.id, **event})
+
+        async def preflight_job(job: Job):
+            check = await preflight_checker.check(job.url)
+            job.preflight = check.to_dict()
+            if check.ok:
+                hosts.add(registrable_domain(check.final_url), job)
+            else:
+                job.error = f"Pre-flight failed: {check.error}"
+                batch.set_job_status(job, "failed")
+                job_finished(job)
+            self._store.save_job(job)
+
+        retry_timers: set[asyncio.TimerHandle] = set()
+        loop = asyncio.get_running_loop()
+
+        def retry_later(host: str, job: Job, delay: float):
+            def requeue():
+                retry_timers.discard(handle)
+                hosts.add(host, job)
+                wake.set()
+
+            handle = loop.call_later(delay, requeue)
+            retry_timers.add(handle)
+
+        async def process_job(host: str, job: Job):
+            batch.set_job_status(job, "processing")
+            job.started_at = datetime.utcnow()
+            attempt = {"attempt": len(job.attempts) + 1, "started_at": job.started_at.isoformat()}
+            job.attempts.append(attempt)
+            self._store.save_job(job)
+            started = time.monotonic()
+            throttled = False
+
+            try:
+                # The deadline only runs while the capture holds a driver, so
+                # queueing behind other batches never times a job out
+                with capture_flow(batch.id, priority=batch.priority), capture_deadline(self.settings.job_deadline):
+                    result = await processor(job.target_url, batch.options, job.type, job.options)
+                job.result = result
+                job.error = None
+                batch.set_job_status(job, "completed")
+            except asyncio.CancelledError:
+                # Paused, cancelled or shutting down; the job runs again if the batch does
+                attempt["error"] = "Interrupted"
+                attempt["interrupted"] = True
+                batch.set_job_status(job, "pending")
+                job.started_at = None
+                raise
+            except ThrottledError as e:
+                throttled = True
+                attempt["error"] = str(e)
+                attempt["throttled"] = True
+                throttle_counts[job.id] = throttle_counts.get(job.id, 0) + 1
+                if throttle_counts[job.id] <= self.settings.host_throttle_retries:
+                    # Back off the whole host and retry this job later
+                    batch.set_job_status(job, "pending")
+                    job.started_at = None
+                    hosts.add(host, job, front=True)
+                    logger.warning(f"{e}; backing off {host}")
+                else:
                     job.error = str(e)
-                    job.status = "failed"
-                    logger.error(f"Job {job.id} failed: {e}")
-                finally:
-                    job.completed_at = datetime.utcnow()
+                    batch.set_job_status(job, "failed")
+            except Exception as e:
+                # A DeadlineExceeded names the deadline; other timeouts have no message of their own
+                error = str(e) or e.__class__.__name__
+                retryable = is_retryable(e)
+                attempt["error"] = error
+                attempt["retryable"] = retryable
+                failures = failed_attempts(job.attempts)
+                if retryable and failures < self.settings.job_max_attempts:
+                    delay = retry_delay(failures)
+                    attempt["retry_in"] = round(delay, 2)
+                    batch.set_job_status(job, "pending")
+                    job.started_at = None
+                    retry_later(host, job, delay)
+                    logger.warning(f"Job {job.id} attempt {failures} failed ({error}); retrying in {delay:.1f}s")
+                else:
+                    job.error = error
+                    batch.set_job_status(job, "failed")
+                    logger.error(f"Job {job.id} failed: {error}")
+            finally:
+                attempt["duration_ms"] = round((time.monotonic() - started) * 1000)
+                if job.status in ("completed", "failed"):
+                    job_finished(job)
+                self._store.save_job(job)
+                hosts.finished(host, throttled=throttled)
+
+        in_flight: set[asyncio.Task] = set()
+        checking: set[asyncio.Task] = set()
+        try:
+            while True:
+                wake.clear()
+                schedule_new_jobs()
+                if not (hosts.pending or in_flight or awaiting_preflight or checking or retry_timers
+                        or batch.status == "ingesting"):
+                    break
 
-        # Process all jobs concurrently (with semaphore limiting)
-        await asyncio.gather(*[process_job(job) for job in batch.jobs])
+                while len(checking) < preflight_checker.concurrency and awaiting_preflight:
+                    checking.add(asyncio.create_task(preflight_job(awaiting_preflight.popleft())))
+                while len(in_flight) < max_concurrent and (ready := hosts.next_ready()):
+                    in_flight.add(asyncio.create_task(process_job(*ready)))
+
+                # Sleep until a job or check finishes, a throttled host may
+                # start again, a retry comes due or more jobs are uploaded
+                timeout = hosts.time_until_ready() if len(in_flight) < max_concurrent else None
+                wakers = in_flight | checking
+                if retry_timers or batch.status == "ingesting":
+                    wakers.add(asyncio.create_task(wake.wait()))
+                if wakers:
+                    done, _ = await asyncio.wait(wakers, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    in_flight -= done
+                    checking -= done
+                    for task in wakers - in_flight - checking:
+                        task.cancel()
+                else:
+                    await asyncio.sleep(timeout or 0)
+        finally:
+            # Wait for cancelled captures to unwind so their jobs are back to
+            # pending and their drivers released before we report stopped
+            for task in in_flight | checking:
+                task.cancel()
+            await asyncio.gather(*in_flight, *checking, return_exceptions=True)
+            for handle in retry_timers:
+                handle.cancel()
+            self._wakeups.pop(batch_id, None)
 
         # Update batch status
-        failed_count = sum(1 for j in batch.jobs if j.status == "failed")
-        batch.status = "failed" if failed_count == len(batch.jobs) else "completed"
+        failed_count = batch.counts["failed"]
+        total = batch.total
+        batch.status = "failed" if failed_count == total else "completed"
+        self._store.save_batch(batch)
+        summary = self._batch_summary(batch)
+        events.publish("done", summary)
+        events.close()
+        self._callback(batch.options, "batch", summary)
 
-        logger.info(f"Batch {batch_id} completed: {len(batch.jobs) - failed_count}/{len(batch.jobs)} successful")
+        logger.info(f"Batch {batch_id} completed: {total - failed_count}/{total} successful")
 
-    def get_batch_status(self, batch_id: str) -> dict | None:
-        """Get detailed batch status."""
-        batch = self._batches.get(batch_id)
+    def get_batch_status(self, batch_id: str, include_jobs: bool = False) -> dict | None:
+        """Get batch progress counts, optionally with every job embedded."""
+        if self.external_workers and not include_jobs:
+            counts = self._store.count_jobs(batch_id)
+            return summarize_batch(batch_id, *counts) if counts else None
+
+        batch = self._get_batch(batch_id)
         if not batch:
             return None
 
-        jobs = batch.jobs
-        completed = sum(1 for j in jobs if j.status == "completed")
-        failed = sum(1 for j in jobs if j.status == "failed")
-        processing = sum(1 for j in jobs if j.status == "processing")
-        pending = sum(1 for j in jobs if j.status == "pending")
+        status = self._batch_summary(batch)
+        if include_jobs and batch.bulk:
+            self._store.flush()
+            status["jobs"] = [self._job_dict(row) for row in self._store.list_jobs(batch_id, None, 0, -1)]
+        elif include_jobs:
+            status["jobs"] = [self._job_dict(j) for j in batch.jobs]
+        return status
+
+    def list_jobs(
+        self,
+        batch_id: str,
+        status: str | None = None,
+        cursor: int = 0,
+        limit: int = 100,
+    ) -> dict | None:
+        """Page through a batch's jobs in submission order.
+
+        `cursor` is the position to resume from; the returned `next_cursor` is
+        None once the end of the batch is reached.
+        """
+        if self.external_workers:
+            if not self._store.count_jobs(batch_id):
+                return None
+            return self._list_stored_jobs(batch_id, status, cursor, limit)
+
+        batch = self._get_batch(batch_id)
+        if not batch:
+            return None
+        if batch.bulk:
+            self._store.flush()
+            return self._list_stored_jobs(batch_id, status, cursor, limit)
+
+        jobs = []
+        position = cursor
+        while position < len(batch.jobs) and len(jobs) < limit:
+            job = batch.jobs[position]
+            position += 1
+            if status is None or job.status == status:
+                jobs.append(self._job_dict(job))
+        return {
+            "jobs": jobs,
+            "next_cursor": position if position < len(batch.jobs) else None,
+        }
+
+    def _list_stored_jobs(self, batch_id: str, status: str | None, cursor: int, limit: int) -> dict:
+        rows = self._store.list_jobs(batch_id, status, cursor, limit + 1)
+        next_cursor = rows.pop()["seq"] if len(rows) > limit else None
+        return {"jobs": [self._job_dict(row) for row in rows], "next_cursor": next_cursor}
 
+    @staticmethod
+    def _job_dict(job: Job | dict) -> dict:
+        if isinstance(job, dict):
+            return {
+                key: job[key]
+                for key in ("id", "url", "type", "options", "status", "result", "error", "preflight", "attempts")
+            }
         return {
-            "batch_id": batch.id,
-            "total_jobs": len(jobs),
-            "completed": completed,
-            "failed": failed,
-            "processing": processing,
-            "pending": pending,
-            "status": batch.status,
-            "progress": round((completed + failed) / len(jobs) * 100, 1) if jobs else 0,
-            "jobs": [
-                {
-                    "id": j.id,
-                    "url": j.url,
-                    "status": j.status,
-                    "result": j.result,
-                    "error": j.error,
-                }
-                for j in jobs
-            ],
+            "id": job.id,
+            "url": job.url,
+            "type": job.type,
+            "options": job.options,
+            "status": job.status,
+            "result": job.result,
+            "error": job.error,
+            "preflight": job.preflight,
+            "attempts": job.attempts,
         }
 
-    async def cleanup_old_batches(self, max_age_hours: int = 24):
-        """Remove batches older than max_age_hours."""
-        now = datetime.utcnow()
-        to_remove = []
+    def _batch_summary(self, batch: Batch) -> dict:
+        return summarize_batch(batch.id, batch.status, batch.counts)
+
+    @staticmethod
+    def _job_event(job: Job) -> dict:
+        return job_event(
+            job.id, job.url, job.type, job.status, job.result, job.error,
+            job.preflight, job.attempts, job.completed_at,
+        )
+
+    def _event_log(self, batch: Batch) -> EventLog:
+        """Get a batch's event log, replaying already finished jobs into a new one.
+
+        Finished jobs of bulk batches are only in the store, so theirs starts
+        with the jobs finished from then on.
+        """
+        log = self._events.get(batch.id)
+        if log is None:
+            log = self._events[batch.id] = EventLog(self.settings.batch_event_history)
+            finished = [j for j in batch.jobs if j.status in ("completed", "failed", "cancelled")]
+            for job in sorted(finished, key=lambda j: j.completed_at or j.created_at):
+                log.publish("job", self._job_event(job))
+            if batch.status in ("completed", "failed", "cancelled"):
+                log.publish("done", self._batch_summary(batch))
+                log.close()
+        return log
+
+    async def subscribe(self, batch_id: str, last_event_id: int = 0) -> AsyncIterator[dict]:
+        """Stream a batch's events until it finishes.
+
+        Yields job completion and "done" events (numbered, replayed after
+        `last_event_id`) and an unnumbered "progress" summary every
+        `batch_event_interval` seconds.
+        """
+        interval = self.settings.batch_event_interval
+
+        if self.external_workers:
+            # Workers only write to the store, so all we can report is progress
+            while counts := self._store.count_jobs(batch_id):
+                summary = summarize_batch(batch_id, *counts)
+                if summary["status"] in ("completed", "failed", "cancelled"):
+                    yield {"event": "done", "data": summary}
+                    return
+                yield {"event": "progress", "data": summary}
+                await asyncio.sleep(interval)
+            return
+
+        batch = self._get_batch(batch_id)
+        if not batch:
+            return
+        log = self._event_log(batch)
+        cursor = last_event_id
+        next_progress = time.monotonic()
+
+        while True:
+            for event in log.since(cursor):
+                cursor = event["id"]
+                yield event
+            if log.closed and cursor >= log.last_id:
+                return
+
+            now = time.monotonic()
+            if now >= next_progress:
+                yield {"event": "progress", "data": self._batch_summary(batch)}
+                next_progress = now + interval
+            await log.wait(cursor, next_progress - now)
 
-        for batch_id, batch in self._batches.items():
-            age = (now - batch.created_at).total_seconds() / 3600
-            if age > max_age_hours and batch.status in ["completed", "failed"]:
-                to_remove.append(batch_id)
+    async def cleanup_old_batches(self, max_age_hours: float = 24):
+        """Remove finished batches older than max_age_hours, from memory and the store."""
+        cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+        removed = self._store.delete_finished_batches(cutoff)
 
-        for batch_id in to_remove:
-            del self._batches[batch_id]
+        for batch_id in removed:
+            self._batches.pop(batch_id, None)
+            self._events.pop(batch_id, None)
 
-        if to_remove:
-            logger.info(f"Cleaned up {len(to_remove)} old batches")
+        if removed:
+            logger.info(f"Cleaned up {len(removed)} old batches")
 
 
 # Global job queue instance
@@ -0,0 +1,546 @@
+import json
+import time
+import sqlite3
+import asyncio
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import datetime
+
+from ..utils.logger import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id TEXT PRIMARY KEY,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority TEXT NOT NULL DEFAULT 'batch',
+    bulk INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    batch_id TEXT NOT NULL REFERENCES batches(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    type TEXT NOT NULL DEFAULT 'screenshot',
+    options TEXT,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    completed_at TEXT,
+    lease_owner TEXT,
+    lease_expires REAL,
+    not_before REAL,
+    preflight TEXT,
+    attempts TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs (batch_id, seq);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, lease_expires);
+CREATE INDEX IF NOT EXISTS idx_jobs_batch_url ON jobs (batch_id, url);
+CREATE INDEX IF NOT EXISTS idx_batches_status_created ON batches (status, created_at);
+"""
+
+
+def _ts(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+def _dt(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+class JobStore:
+    """SQLite persistence for batches and jobs.
+
+    The database runs in WAL mode so status reads don't block writers. Job and
+    batch state changes are buffered and written in one transaction per flush,
+    either every `flush_interval` seconds or once `max_pending` updates pile up.
+    """
+
+    def __init__(self, path: Path, flush_interval: float = 0.5, max_pending: int = 500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._conn: sqlite3.Connection | None = None
+        self._pending_jobs: dict[str, tuple] = {}
+        self._pending_batches: dict[str, tuple] = {}
+        self._flusher: asyncio.Task | None = None
+
+    def open(self):
+        if self._conn:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        # API and worker processes share the file; wait for locks instead of failing
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._migrate()
+        self._conn.executescript(SCHEMA)
+        logger.info(f"Job store opened at {self.path}")
+
+    def _migrate(self):
+        """Add columns introduced after a database was first created."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if columns and "lease_owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_owner TEXT")
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_expires REAL")
+
+        if columns and "preflight" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN preflight TEXT")
+        if columns and "attempts" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN attempts TEXT")
+        if columns and "not_before" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN not_before REAL")
+        if columns and "type" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN type TEXT NOT NULL DEFAULT 'screenshot'")
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN options TEXT")
+
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(batches)")}
+        if columns and "priority" not in columns:
+            self._conn.execute("ALTER TABLE batches ADD COLUMN priority TEXT NOT NULL DEFAULT 'batch'")
+        if columns and "bulk" not in columns:
+            self._conn.execute("ALTER TABLE batches ADD COLUMN bulk INTEGER NOT NULL DEFAULT 0")
+        # Superseded by idx_batches_status_created
+        self._conn.execute("DROP INDEX IF EXISTS idx_batches_status")
+
+    def start(self):
+        """Start the periodic flush loop."""
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+        if self._conn:
+            self.flush()
+            self._conn.close()
+            self._conn = None
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"Job store flush failed: {e}")
+
+    def flush(self):
+        """Write all buffered job and batch updates in a single transaction."""
+        if not (self._pending_jobs or self._pending_batches) or not self._conn:
+            return
+
+        jobs = list(self._pending_jobs.values())
+        batches = list(self._pending_batches.values())
+        self._pending_jobs.clear()
+        self._pending_batches.clear()
+
+        with self._transaction():
+            self._conn.executemany(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, started_at = ?, completed_at = ?, "
+                "preflight = ?, attempts = ? WHERE id = ?",
+                jobs,
+            )
+            self._conn.executemany("UPDATE batches SET status = ? WHERE id = ?", batches)
+
+    @contextmanager
+    def _transaction(self):
+        # IMMEDIATE takes the write lock up front so concurrent workers can't
+        # both read the same pending jobs before one of them claims them
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def insert_batch(self, batch):
+        """Persist a new batch and its jobs immediately."""
+        with self._transaction():
+            self._conn.execute(
+                "INSERT INTO batches (id, options, status, priority, bulk, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (batch.id, json.dumps(batch.options), batch.status, batch.priority, batch.bulk,
+                 _ts(batch.created_at)),
+            )
+            self._conn.executemany(
+                "INSERT INTO jobs (id, batch_id, seq, url, type, options, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (job.id, batch.id, seq, job.url, job.type, json.dumps(job.options) if job.options else None,
+                     job.status, _ts(job.created_at))
+                    for seq, job in enumerate(batch.jobs)
+                ],
+            )
+
+    def insert_jobs(self, batch_id: str, jobs: list, first_seq: int) -> list:
+        """Append jobs to a batch, skipping URLs it already has. Returns the jobs inserted."""
+        inserted = []
+        with self._transaction():
+            for job in jobs:
+                cursor = self._conn.execute(
+                    """
+                    INSERT INTO jobs (id, batch_id, seq, url, status, created_at)
+                    SELECT ?, ?, ?, ?, ?, ?
+                    WHERE NOT EXISTS (SELECT 1 FROM jobs WHERE batch_id = ? AND url = ?)
+                    """,
+                    (job.id, batch_id, first_seq + len(inserted), job.url, job.status,
+                     _ts(job.created_at), batch_id, job.url),
+                )
+                if cursor.rowcount:
+                    inserted.append(job)
+        return inserted
+
+    def finish_ingest(self, batch_id: str) -> str | None:
+        """Mark a bulk upload complete, closing the batch if workers already ran every job.
+
+        Returns the batch's final status if this closed it.
+        """
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE batches SET status = 'processing' WHERE id = ? AND status = 'ingesting'",
+                (batch_id,),
+            )
+            return self._close_if_done(batch_id)
+
+    def save_job(self, job):
+        """Buffer a job state change for the next flush."""
+        self._pending_jobs[job.id] = (
+            job.status,
+            json.dumps(job.result) if job.result is not None else None,
+            job.error,
+            _ts(job.started_at),
+            _ts(job.completed_at),
+            json.dumps(job.preflight) if job.preflight is not None else None,
+            json.dumps(job.attempts) if job.attempts else None,
+            job.id,
+        )
+        if len(self._pending_jobs) >= self.max_pending:
+            self.flush()
+
+    def save_batch(self, batch):
+        """Buffer a batch status change for the next flush."""
+        self._pending_batches[batch.id] = (batch.status, batch.id)
+
+    def load_batch(self, batch_id: str) -> dict | None:
+        """Load a batch and its jobs as plain dicts (Batch/Job keyword arguments).
+
+        Bulk batches come without their jobs; read those with `pending_jobs`
+        and `list_jobs`.
+        """
+        row = self._conn.execute("SELECT * FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        if not row:
+            return None
+        return self._build_batch(row)
+
+    def load_unfinished(self) -> list[dict]:
+        """Load batches that were pending or processing when the service stopped."""
+        rows = self._conn.execute(
+            "SELECT * FROM batches WHERE status IN ('pending', 'ingesting', 'processing') ORDER BY created_at"
+        ).fetchall()
+        return [self._build_batch(row) for row in rows]
+
+    def batch_options(self, batch_id: str) -> dict:
+        row = self._conn.execute("SELECT options FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        return json.loads(row["options"]) if row else {}
+
+    def count_jobs(self, batch_id: str) -> tuple[str, dict[str, int]] | None:
+        """Batch status and job counts per status, without loading the jobs."""
+        row = self._conn.execute("SELECT status FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        if not row:
+            return None
+        counts = self._conn.execute(
+            "SELECT status, COUNT(*) FROM jobs WHERE batch_id = ? GROUP BY status", (batch_id,)
+        ).fetchall()
+        return row["status"], {status: count for status, count in counts}
+
+    def list_jobs(self, batch_id: str, status: str | None, start: int, limit: int) -> list[dict]:
+        """Jobs of a batch from position `start` on, optionally only those in `status`."""
+        query = (
+            "SELECT seq, id, url, type, options, status, result, error, preflight, attempts FROM jobs "
+            "WHERE batch_id = ? AND seq >= ?"
+        )
+        params: list = [batch_id, start]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        rows = self._conn.execute(query + " ORDER BY seq LIMIT ?", [*params, limit]).fetchall()
+        return [
+            {
+                **dict(row),
+                "options": json.loads(row["options"]) if row["options"] else {},
+                "result": json.loads(row["result"]) if row["result"] else None,
+                "preflight": json.loads(row["preflight"]) if row["preflight"] else None,
+                "attempts": json.loads(row["attempts"]) if row["attempts"] else [],
+            }
+            for row in rows
+        ]
+
+    def pending_jobs(self, batch_id: str, after_seq: int, limit: int) -> list[tuple[int, dict]]:
+        """The next `limit` pending jobs of a batch after position `after_seq`, as (seq, Job kwargs)."""
+        rows = self._conn.execute(
+            "SELECT * FROM jobs WHERE batch_id = ? AND seq > ? AND status = 'pending' ORDER BY seq LIMIT ?",
+            (batch_id, after_seq, limit),
+        ).fetchall()
+        return [(row["seq"], self._job_kwargs(row)) for row in rows]
+
+    def _build_batch(self, row: sqlite3.Row) -> dict:
+        jobs = []
+        if not row["bulk"]:
+            job_rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE batch_id = ? ORDER BY seq", (row["id"],)
+            ).fetchall()
+            jobs = [self._job_kwargs(j) for j in job_rows]
+        return {
+            "id": row["id"],
+            "jobs": jobs,
+            "options": json.loads(row["options"]),
+            "status": row["status"],
+            "priority": row["priority"],
+            "bulk": bool(row["bulk"]),
+            "created_at": _dt(row["created_at"]),
+        }
+
+    @staticmethod
+    def _job_kwargs(row: sqlite3.Row) -> dict:
+        return {
+            "id": row["id"],
+            "url": row["url"],
+            "type": row["type"],
+            "options": json.loads(row["options"]) if row["options"] else {},
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": _dt(row["created_at"]),
+            "started_at": _dt(row["started_at"]),
+            "completed_at": _dt(row["completed_at"]),
+            "preflight": json.loads(row["preflight"]) if row["preflight"] else None,
+            "attempts": json.loads(row["attempts"]) if row["attempts"] else [],
+        }
+
+    def delete_finished_batches(self, before: datetime) -> list[str]:
+        """Delete finished batches (and their jobs) created before `before`. Returns their ids."""
+        with self._transaction():
+            rows = self._conn.execute(
+                """
+                DELETE FROM batches
+                WHERE status IN ('completed', 'failed', 'cancelled') AND created_at < ?
+                RETURNING id
+                """,
+                (_ts(before),),
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    # Worker leasing: jobs are claimed for a visibility timeout and become
+    # claimable again if the worker doesn't complete or extend them in time.
+
+    def lease_jobs(self, owner: str, limit: int, lease_seconds: float) -> list[dict]:
+        """Claim up to `limit` pending (or lease-expired) jobs for `owner`.
+
+        Pending jobs waiting out a retry backoff are skipped until it ends.
+        """
+        now = time.time()
+        with self._transaction():
+            rows = self._conn.execute(
+                """
+                UPDATE jobs
+                SET status = 'processing', lease_owner = ?, lease_expires = ?, started_at = ?
+                WHERE id IN (
+                    SELECT id FROM jobs
+                    WHERE ((status = 'pending' AND (not_before IS NULL OR not_before <= ?))
+                           OR (status = 'processing' AND lease_expires < ?))
+                      AND batch_id NOT IN (SELECT id FROM batches WHERE status IN ('paused', 'cancelled'))
+                    ORDER BY rowid
+                    LIMIT ?
+                )
+                RETURNING id, batch_id, url, type, options, attempts
+                """,
+                (owner, now + lease_seconds, _ts(datetime.utcnow()), now, now, limit),
+            ).fetchall()
+
+            if not rows:
+                return []
+
+            batch_ids = {row["batch_id"] for row in rows}
+            self._conn.executemany(
+                "UPDATE batches SET status = 'processing' WHERE id = ? AND status = 'pending'",
+                [(b,) for b in batch_ids],
+            )
+            batches = {
+                row["id"]: row
+                for row in self._conn.execute(
+                    f"SELECT id, options, priority FROM batches WHERE id IN ({','.join('?' * len(batch_ids))})",
+                    list(batch_ids),
+                )
+            }
+
+        return [
+            {
+                "id": row["id"],
+                "batch_id": row["batch_id"],
+                "url": row["url"],
+                "type": row["type"],
+                "options": json.loads(batches[row["batch_id"]]["options"]),
+                "job_options": json.loads(row["options"]) if row["options"] else {},
+                "priority": batches[row["batch_id"]]["priority"],
+                "attempts": json.loads(row["attempts"]) if row["attempts"] else [],
+            }
+            for row in rows
+        ]
+
+    def extend_leases(self, owner: str, job_ids: list[str], lease_seconds: float):
+        """Heartbeat: push back the lease expiry of jobs still being worked on."""
+        if not job_ids:
+            return
+        expires = time.time() + lease_seconds
+        with self._transaction():
+            self._conn.executemany(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ?",
+                [(expires, job_id, owner) for job_id in job_ids],
+            )
+
+    def complete_job(self, owner: str, job_id: str, batch_id: str, status: str,
+                     result=None, error: str | None = None,
+                     attempts: list[dict] | None = None,
+                     completed_at: datetime | None = None) -> tuple[bool, str | None]:
+        """Record a leased job's outcome.
+
+        Returns whether the lease was still held, and the batch's final status
+        if this was the job that finished it.
+        """
+        with self._transaction():
+            updated = self._conn.execute(
+                """
+                UPDATE jobs
+                SET status = ?, result = ?, error = ?, completed_at = ?, attempts = ?,
+                    lease_owner = NULL, lease_expires = NULL
+                WHERE id = ? AND lease_owner = ?
+                """,
+                (
+                    status,
+                    json.dumps(result) if result is not None else None,
+                    error,
+                    _ts(completed_at or datetime.utcnow()),
+                    json.dumps(attempts) if attempts else None,
+                    job_id,
+                    owner,
+                ),
+            ).rowcount
+            closed = self._close_if_done(batch_id)
+        return updated == 1, closed
+
+    def retry_job(self, owner: str, job_id: str, attempts: list[dict], not_before: float) -> bool:
+        """Hand a leased job back to the queue, not to be leased again before `not_before`.
+
+        Returns whether the lease was still held. A job whose batch was
+        cancelled meanwhile is cancelled instead.
+        """
+        with self._transaction():
+            updated = self._conn.execute(
+                """
+                UPDATE jobs
+                SET status = CASE
+                        WHEN (SELECT status FROM batches WHERE id = jobs.batch_id) = 'cancelled' THEN 'cancelled'
+                        ELSE 'pending' END,
+                    attempts = ?, not_before = ?,
+                    lease_owner = NULL, lease_expires = NULL, started_at = NULL
+                WHERE id = ? AND lease_owner = ?
+                """,
+                (json.dumps(attempts), not_before, job_id, owner),
+            ).rowcount
+        return updated == 1
+
+    def _close_if_done(self, batch_id: str) -> str | None:
+        """Complete (or fail) a batch once nothing is left to run and no more jobs are coming.
+
+        Returns the new status if the batch was closed by this call.
+        """
+        row = self._conn.execute(
+            """
+            UPDATE batches
+            SET status = CASE
+                WHEN EXISTS (SELECT 1 FROM jobs WHERE batch_id = :b AND status != 'failed')
+                THEN 'completed' ELSE 'failed' END
+            WHERE id = :b
+              AND status IN ('pending', 'processing')
+              AND NOT EXISTS (
+                  SELECT 1 FROM jobs WHERE batch_id = :b AND status IN ('pending', 'processing')
+              )
+            RETURNING status
+            """,
+            {"b": batch_id},
+        ).fetchone()
+        return row["status"] if row else None
+
+    def release_leases(self, owner: str, job_ids: list[str] | None = None):
+        """Return a worker's jobs (all, or just `job_ids`) to the queue, or cancel them if their batch was."""
+        query = f"""
+            UPDATE jobs
+            SET status = CASE
+                    WHEN (SELECT status FROM batches WHERE id = jobs.batch_id) = 'cancelled' THEN 'cancelled'
+                    ELSE 'pending' END,
+                lease_owner = NULL, lease_expires = NULL, started_at = NULL
+            WHERE lease_owner = ? AND status = 'processing'
+            {f"AND id IN ({','.join('?' * len(job_ids))})" if job_ids else ""}
+        """
+        with self._transaction():
+            self._conn.execute(query, [owner, *(job_ids or [])])
+
+    def halted_jobs(self, job_ids: list[str]) -> list[str]:
+        """Those of `job_ids` whose batch has been paused or cancelled."""
+        if not job_ids:
+            return []
+        rows = self._conn.execute(
+            f"""
+            SELECT jobs.id FROM jobs JOIN batches ON batches.id = jobs.batch_id
+            WHERE jobs.id IN ({','.join('?' * len(job_ids))})
+              AND batches.status IN ('paused', 'cancelled')
+            """,
+            job_ids,
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def set_batch_status(self, batch_id: str, status: str, allowed_from: tuple[str, ...]) -> bool:
+        """Move a batch to `status` if it's currently in one of `allowed_from`.
+
+        Cancelling also cancels its pending jobs; leased ones follow when their
+        worker lets go. Resuming closes the batch if nothing is left to run.
+        """
+        with self._transaction():
+            updated = self._conn.execute(
+                f"UPDATE batches SET status = ? WHERE id = ? AND status IN ({','.join('?' * len(allowed_from))})",
+                [status, batch_id, *allowed_from],
+            ).rowcount
+            if updated and status == "cancelled":
+                self._cancel_pending(batch_id)
+            elif updated:
+                self._close_if_done(batch_id)
+        return updated == 1
+
+    def cancel_pending(self, batch_id: str) -> int:
+        """Cancel a batch's pending jobs. Returns how many there were."""
+        with self._transaction():
+            return self._cancel_pending(batch_id)
+
+    def _cancel_pending(self, batch_id: str) -> int:
+        return self._conn.execute(
+            "UPDATE jobs SET status = 'cancelled', completed_at = ? WHERE batch_id = ? AND status = 'pending'",
+            (_ts(datetime.utcnow()), batch_id),
+        ).rowcount
+
+    def requeue_unleased(self):
+        """Reset jobs left processing by an in-process runner that stopped."""
+        with self._transaction():
+            self._conn.execute(
+                """
+                UPDATE jobs SET status = 'pending', started_at = NULL
+                WHERE status = 'processing' AND lease_owner IS NULL
+                """
+            )
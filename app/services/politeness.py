@@ -0,0 +1,92 @@
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class _HostState:
+    interval: float
+    queue: deque = field(default_factory=deque)
+    active: int = 0
+    next_start: float = 0.0
+
+
+class HostScheduler:
+    """Per-host politeness for batch dispatch.
+
+    Caps concurrent captures per host, spaces out request starts by a minimum
+    interval and interleaves hosts round-robin so one big host doesn't hog the
+    pool. A host that throttles us has its interval doubled (up to
+    `max_backoff`); successful captures halve it back towards the baseline.
+    """
+
+    def __init__(self, max_per_host: int, min_interval: float, max_backoff: float):
+        self.max_per_host = max_per_host
+        self.min_interval = min_interval
+        self.max_backoff = max_backoff
+        self._hosts: dict[str, _HostState] = {}
+        # Hosts with queued items, in round-robin order
+        self._order: deque[str] = deque()
+        self._pending = 0
+
+    def add(self, host: str, item: Any, front: bool = False):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(interval=self.min_interval)
+        if not state.queue:
+            self._order.append(host)
+        if front:
+            state.queue.appendleft(item)
+        else:
+            state.queue.append(item)
+        self._pending += 1
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def next_ready(self) -> tuple[str, Any] | None:
+        """Pop the next item from the first host (round-robin) allowed to start now."""
+        now = time.monotonic()
+        for _ in range(len(self._order)):
+            host = self._order[0]
+            self._order.rotate(-1)
+            state = self._hosts[host]
+            if state.active < self.max_per_host and now >= state.next_start:
+                item = state.queue.popleft()
+                self._pending -= 1
+                if not state.queue:
+                    # Just rotated to the back
+                    self._order.pop()
+                state.active += 1
+                state.next_start = now + state.interval
+                return host, item
+        return None
+
+    def time_until_ready(self) -> float | None:
+        """Seconds until some queued host may start again (None if all are at their concurrency cap)."""
+        now = time.monotonic()
+        waits = [
+            max(0.0, self._hosts[h].next_start - now)
+            for h in self._order
+            if self._hosts[h].active < self.max_per_host
+        ]
+        return min(waits) if waits else None
+
+    def finished(self, host: str, throttled: bool = False):
+        state = self._hosts[host]
+        state.active -= 1
+        if throttled:
+            state.interval = min(max(state.interval * 2, self.min_interval * 2, 1.0), self.max_backoff)
+            state.next_start = time.monotonic() + state.interval
+        else:
+            state.interval = max(self.min_interval, state.interval / 2)
+
+        # Forget idle hosts at baseline so state stays proportional to active sites
+        if (not state.queue and not state.active and state.interval == self.min_interval
+                and state.next_start <= time.monotonic()):
+            del self._hosts[host]
+
+    def interval(self, host: str) -> float:
+        return self._hosts[host].interval
@@ -0,0 +1,115 @@
+import asyncio
+import socket
+import time
+from dataclasses import dataclass, asdict
+from urllib.parse import urlsplit
+
+import httpx
+
+from ..config import get_settings
+
+# Statuses that mean the page is gone for good; anything else is left for the browser to judge
+DEAD_STATUSES = {404, 410}
+# HEAD answers that are retried with GET: HEAD unsupported, or a dead status to confirm
+GET_FALLBACK_STATUSES = {405, 501} | DEAD_STATUSES
+
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+@dataclass
+class PreflightResult:
+    ok: bool
+    final_url: str
+    status_code: int | None = None
+    redirects: int = 0
+    error: str | None = None
+    dns_ms: float | None = None
+    http_ms: float | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class PreflightChecker:
+    """Cheap reachability check run before a batch job is given a browser.
+
+    Resolves the host, then sends a HEAD request following redirects, all
+    through one pooled HTTP client. Servers that reject HEAD, or answer it
+    with 404/410, are asked again with GET, since SPA routers and some CDNs
+    mishandle HEAD. Hosts that don't resolve, refuse connections, time out
+    or answer GET with 404/410 fail here in milliseconds instead of tying
+    up a driver for the whole navigation timeout.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.concurrency = self.settings.preflight_concurrency
+        self.timeout = self.settings.preflight_timeout
+        self._client: httpx.AsyncClient | None = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def check(self, url: str) -> PreflightResult:
+        result = PreflightResult(ok=False, final_url=url)
+        parts = urlsplit(url)
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                asyncio.get_running_loop().getaddrinfo(
+                    parts.hostname, parts.port or (443 if parts.scheme == "https" else 80),
+                    type=socket.SOCK_STREAM,
+                ),
+                self.timeout,
+            )
+        except (OSError, asyncio.TimeoutError):
+            result.error = f"DNS lookup failed for {parts.hostname}"
+            return result
+        finally:
+            result.dns_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        client = self._get_client()
+        started = time.perf_counter()
+        try:
+            response = await client.head(url)
+            if response.status_code in GET_FALLBACK_STATUSES:
+                async with client.stream("GET", url) as response:
+                    pass
+        except httpx.TimeoutException:
+            result.error = "Timed out connecting"
+            return result
+        except httpx.HTTPError as e:
+            result.error = f"Unreachable: {e.__class__.__name__}"
+            return result
+        finally:
+            result.http_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        result.status_code = response.status_code
+        result.final_url = str(response.url)
+        result.redirects = len(response.history)
+        if response.status_code in DEAD_STATUSES:
+            result.error = f"HTTP {response.status_code}"
+            return result
+
+        result.ok = True
+        return result
+
+
+# Global pre-flight checker instance
+preflight_checker = PreflightChecker()
@@ -0,0 +1,75 @@
+from pydantic import BaseModel
+
+from .capture import capture_service
+from .scheduler import capture_cost
+from .video import video_service
+from ..models.schemas import ScreenshotRequest, VideoRequest, ViewportsRequest
+
+# Defaults batch screenshots used before per-job options existed
+SCREENSHOT_DEFAULTS = {"full_page": True, "wait_for": 2000}
+
+# Rough driver time of a screenshot (navigation + wait + capture), in seconds
+SCREENSHOT_SECONDS = 5.0
+
+
+def slot_cost(job_type: str, options: dict) -> float:
+    """Expected driver time of one browser checkout for a job, in screenshot units.
+
+    Multi-viewport jobs take one ordinary screenshot slot per viewport, so
+    they are weighted by the number of checkouts rather than here.
+    """
+    if job_type == "video":
+        duration = options.get("duration", VideoRequest.model_fields["duration"].default) / 1000
+        return 1 + duration / SCREENSHOT_SECONDS
+    return 1.0
+
+
+async def process_url(url: str, options: dict, job_type: str = "screenshot", overrides: dict | None = None):
+    """Process a single job from a batch.
+
+    Screenshot and viewports jobs use the batch `options` with the job's
+    `overrides` on top. Batch options are screenshot options, so videos are
+    configured by their overrides alone.
+    """
+    overrides = overrides or {}
+    if job_type == "video":
+        request = _build(VideoRequest, url, overrides)
+        with capture_cost(slot_cost(job_type, overrides)):
+            result = await video_service.capture_video(request)
+        return result.model_dump(mode="json", exclude={"status"})
+
+    if job_type == "viewports":
+        request = _build(ViewportsRequest, url, {**SCREENSHOT_DEFAULTS, **options, **overrides})
+        captures = []
+        try:
+            # One viewport at a time, so the job stays within the host's politeness limit
+            for viewport in request.viewports:
+                screenshot = request.model_copy(update=viewport.model_dump())
+                captures.append({**viewport.model_dump(), **await _screenshot(screenshot)})
+        except BaseException:
+            # A retry captures every viewport again; don't keep half a job's outputs
+            for capture in captures:
+                await capture_service.delete_screenshot(capture["id"])
+            raise
+        return {"viewports": captures}
+
+    return await _screenshot(_build(ScreenshotRequest, url, {**SCREENSHOT_DEFAULTS, **options, **overrides}))
+
+
+def _build(model: type[BaseModel], url: str, options: dict):
+    fields = {key: value for key, value in options.items() if key in model.model_fields}
+    fields.pop("progressive", None)
+    return model(**{**fields, "url": url})
+
+
+async def _screenshot(request: ScreenshotRequest) -> dict:
+    # A screenshot of an error page isn't a result; let the job queue retry it
+    result = await capture_service.capture_screenshot(request, reject_error_pages=True)
+    return {
+        "id": result.id,
+        "filename": result.filename,
+        "download_url": result.download_url,
+        "size": result.size,
+        "dimensions": result.dimensions,
+        "status_code": result.status_code,
+    }
@@ -0,0 +1,153 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from .artifact_store import artifact_store
+from .capture_index import CaptureRecord, capture_index
+from .job_queue import job_queue
+from ..config import get_settings
+from ..utils.logger import logger
+
+IMAGE_EXTENSIONS = {".png", ".jpeg", ".webp"}
+VIDEO_EXTENSIONS = {".mp4", ".webm", ".gif"}
+
+
+class RetentionManager:
+    """Keeps output_dir within its TTL and disk quota, and forgets old batches.
+
+    Works off the capture index, so maintenance passes never walk the
+    directory: expired outputs come from the (kind, created_at) index and the
+    quota is enforced least-recently-downloaded first, so each pass only
+    reads the rows it deletes. Stored files are removed by the artifact store
+    once no output references them. Because the index is shared, outputs
+    saved by worker processes are covered too. A pass runs every
+    `retention_interval` seconds, or right away once a save takes output_dir
+    over quota.
+    """
+
+    PAGE_SIZE = 500
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def _ttl_hours(self, kind: str) -> float:
+        if kind == "video" and self.settings.video_ttl_hours is not None:
+            return self.settings.video_ttl_hours
+        return self.settings.artifact_ttl_hours
+
+    def check_quota(self):
+        """Called after a save: start a pass now if output_dir went over quota."""
+        quota = self.settings.output_max_bytes
+        if quota and capture_index.totals()[1] > quota:
+            self._wakeup.set()
+
+    async def start(self):
+        await asyncio.to_thread(artifact_store.cleanup_temp)
+        if capture_index.needs_import:
+            # One-time walk to index flat-layout outputs saved before the index existed
+            found = await asyncio.to_thread(self._scan) if self.settings.storage_backend == "local" else []
+            capture_index.add(found)
+            capture_index.mark_imported()
+            logger.info(f"Retention: imported {len(found)} existing files into the capture index")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _scan(self) -> list[CaptureRecord]:
+        found = []
+        if not self.settings.output_dir.exists():
+            return found
+        with os.scandir(self.settings.output_dir) as entries:
+            for entry in entries:
+                path = Path(entry.name)
+                if not entry.is_file() or path.suffix not in IMAGE_EXTENSIONS | VIDEO_EXTENSIONS:
+                    continue
+                stat = entry.stat()
+                found.append(CaptureRecord(
+                    id=path.stem,
+                    kind="video" if path.suffix in VIDEO_EXTENSIONS else "screenshot",
+                    format=path.suffix[1:],
+                    path=entry.name,
+                    size=stat.st_size,
+                    url="",
+                    request_hash="",
+                    created_at=datetime.utcfromtimestamp(stat.st_mtime),
+                ))
+        # Oldest first, so a video's primary output keeps the lowest seq
+        return sorted(found, key=lambda record: record.created_at)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.settings.retention_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Retention pass failed: {e}")
+
+    async def run_once(self) -> list[str]:
+        """Delete expired outputs, then least recently used ones while over quota."""
+        # Download times feed the LRU order
+        capture_index.flush()
+        now = datetime.utcnow()
+        doomed: list[CaptureRecord] = []
+        freed = 0
+
+        for kind in ("screenshot", "video"):
+            hours = self._ttl_hours(kind)
+            if not hours:
+                continue
+            cutoff = now - timedelta(hours=hours)
+            while page := capture_index.created_before(kind, cutoff, self.PAGE_SIZE):
+                freed += await artifact_store.delete_outputs(page)
+                doomed.extend(page)
+
+        quota = self.settings.output_max_bytes
+        _, total = capture_index.totals()
+        while quota and total > quota:
+            page = capture_index.least_recently_used(self.PAGE_SIZE)
+            if not page:
+                break
+            evicted = []
+            # A stored file shared by several outputs is only freed with the last of them
+            refs_left: dict[str, int] = {}
+            for record, refs in page:
+                if total <= quota:
+                    break
+                evicted.append(record)
+                refs_left[record.path] = refs_left.get(record.path, refs) - 1
+                if not refs_left[record.path]:
+                    total -= record.size
+            freed += await artifact_store.delete_outputs(evicted)
+            doomed.extend(evicted)
+
+        if doomed:
+            _, total = capture_index.totals()
+            logger.info(f"Retention: deleted {len(doomed)} outputs ({freed} files), {total} bytes kept")
+
+        if self.settings.batch_retention_hours:
+            await job_queue.cleanup_old_batches(self.settings.batch_retention_hours)
+        return [f"{record.id}.{record.format}" for record in doomed]
+
+    @property
+    def status(self) -> dict:
+        files, total = capture_index.totals()
+        return {
+            "files": files,
+            "bytes": total,
+            "quota_bytes": self.settings.output_max_bytes or None,
+        }
+
+
+# Global retention manager instance
+retention_manager = RetentionManager()
@@ -0,0 +1,242 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator, Callable
+
+from .errors import AdmissionRejected
+
+# Priority classes, highest first. A free driver always goes to the highest
+# class with waiters; flows within a class share by weight.
+PRIORITIES = ("interactive", "batch", "background")
+
+# (flow name, weight, priority) of the code currently asking for a driver. Batch
+# jobs set their own flow; anything else (API requests) is interactive.
+INTERACTIVE_FLOW = "interactive"
+_current_flow: ContextVar[tuple[str, float, str] | None] = ContextVar("capture_flow", default=None)
+# Expected driver time of the current capture, in screenshot units
+_current_cost: ContextVar[float] = ContextVar("capture_cost", default=1.0)
+# Seconds a driver checkout of the current capture may last (None: no limit)
+_current_deadline: ContextVar[float | None] = ContextVar("capture_deadline", default=None)
+
+
+@contextmanager
+def capture_flow(name: str, weight: float = 1.0, priority: str = "batch"):
+    """Attribute driver requests made inside this block to the given flow."""
+    token = _current_flow.set((name, weight, priority))
+    try:
+        yield
+    finally:
+        _current_flow.reset(token)
+
+
+@contextmanager
+def capture_cost(cost: float):
+    """Charge driver slots taken inside this block `cost` units of their flow's share.
+
+    A screenshot costs 1; a job that holds its driver five times as long
+    (a scroll video) should cost about 5, so its flow is served that much
+    less often and other flows keep their share of driver time.
+    """
+    token = _current_cost.set(cost)
+    try:
+        yield
+    finally:
+        _current_cost.reset(token)
+
+
+@contextmanager
+def capture_deadline(seconds: float | None):
+    """Time out driver checkouts made inside this block after `seconds`.
+
+    The clock starts when the driver is granted, so waiting for a fair turn
+    or admission doesn't count against the deadline. An expired checkout is
+    cancelled (the pool replaces its driver) and raises DeadlineExceeded, a TimeoutError.
+    """
+    token = _current_deadline.set(seconds)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> float | None:
+    return _current_deadline.get()
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[index], 3)
+
+
+class CaptureScheduler:
+    """Hands out browser driver slots by priority class, then weighted fair queuing.
+
+    Every batch is its own flow, so one large batch can't starve other
+    batches, and interactive requests outrank batch and background work.
+    Within a class it uses start-time fair queuing: a request's tag is
+    max(virtual time, its flow's last finish tag) and the lowest tag is
+    dispatched whenever a driver is free. A flow with nothing queued or
+    running is forgotten and starts afresh at the virtual time. `capacity` reports how many drivers
+    the pool really has.
+
+    Interactive requests go through admission control: when `max_queue`
+    requests are already waiting, or a request waits longer than `max_wait`
+    seconds, AdmissionRejected is raised with a Retry-After estimate based on
+    the measured slot hold time.
+    """
+
+    # Samples kept per class for wait-time percentiles
+    WAIT_SAMPLES = 1000
+
+    def __init__(
+        self,
+        capacity: Callable[[], int],
+        max_queue: int = 50,
+        max_wait: float = 30.0,
+    ):
+        self._capacity = capacity
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._queue: list[tuple[int, float, int, str, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._virtual_time = {p: 0.0 for p in PRIORITIES}
+        # Only kept for flows with queued or running work
+        self._finish_tags: dict[str, float] = {}
+        self._queued: dict[str, int] = {}
+        self._running: dict[str, int] = {}
+        self._queued_by_class = {p: 0 for p in PRIORITIES}
+        self._waits = {p: deque(maxlen=self.WAIT_SAMPLES) for p in PRIORITIES}
+        self._rejected = 0
+        self._in_use = 0
+        # Exponentially weighted average of how long a slot is held (seconds per cost unit)
+        self._service_time = 5.0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity()
+
+    @property
+    def status(self) -> dict:
+        waits = {}
+        for priority, samples in self._waits.items():
+            ordered = sorted(samples)
+            waits[priority] = {
+                "p50": _percentile(ordered, 50),
+                "p90": _percentile(ordered, 90),
+                "p99": _percentile(ordered, 99),
+            }
+        return {
+            "in_use": self._in_use,
+            "capacity": self.capacity,
+            "queued": sum(self._queued.values()),
+            "queued_by_class": dict(self._queued_by_class),
+            "queued_by_flow": dict(self._queued),
+            "wait_seconds": waits,
+            "avg_service_seconds": round(self._service_time, 3),
+            "rejected": self._rejected,
+        }
+
+    def _flow(self) -> tuple[str, float, str]:
+        return _current_flow.get() or (INTERACTIVE_FLOW, 1.0, "interactive")
+
+    def retry_after(self, priority: str = "interactive") -> int:
+        """Seconds until a new request of this class would likely get a driver."""
+        ahead = sum(self._queued_by_class[p] for p in PRIORITIES[: PRIORITIES.index(priority) + 1])
+        capacity = max(self.capacity, 1)
+        return max(1, math.ceil(self._service_time * (ahead + 1) / capacity))
+
+    def check_admission(self):
+        """Raise AdmissionRejected if a new request from the current flow would be turned away."""
+        _, _, priority = self._flow()
+        if priority == "interactive" and self._queued_by_class[priority] >= self.max_queue:
+            self._rejected += 1
+            raise AdmissionRejected(self.retry_after(priority))
+
+    @asynccontextmanager
+    async def slot(self, cost: float | None = None) -> AsyncGenerator[None, None]:
+        """Wait for this flow's fair turn at a driver, holding the slot inside the block.
+
+        `cost` defaults to the surrounding `capture_cost`.
+        """
+        flow, weight, priority = self._flow()
+        if cost is None:
+            cost = _current_cost.get()
+        self.check_admission()
+
+        start = max(self._virtual_time[priority], self._finish_tags.get(flow, 0.0))
+        self._finish_tags[flow] = start + cost / weight
+        self._queued[flow] = self._queued.get(flow, 0) + 1
+        self._queued_by_class[priority] += 1
+
+        future = asyncio.get_running_loop().create_future()
+        rank = PRIORITIES.index(priority)
+        heapq.heappush(self._queue, (rank, start, next(self._seq), flow, priority, future))
+        enqueued_at = time.monotonic()
+        self._dispatch()
+
+        try:
+            if priority == "interactive":
+                await asyncio.wait_for(asyncio.shield(future), self.max_wait)
+            else:
+                await future
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            if future.done() and not future.cancelled():
+                # Granted just as we gave up; give the slot back
+                self._release(flow)
+            else:
+                future.cancel()
+                self._dequeued(flow, priority)
+            if isinstance(e, asyncio.TimeoutError):
+                self._rejected += 1
+                raise AdmissionRejected(self.retry_after(priority), "Timed out waiting for a browser")
+            raise
+
+        granted_at = time.monotonic()
+        self._waits[priority].append(granted_at - enqueued_at)
+
+        try:
+            yield
+        finally:
+            # Tracked per cost unit so long videos don't inflate Retry-After for screenshots
+            held = (time.monotonic() - granted_at) / cost
+            self._service_time = 0.8 * self._service_time + 0.2 * held
+            self._release(flow)
+
+    def _dequeued(self, flow: str, priority: str):
+        self._queued_by_class[priority] -= 1
+        self._queued[flow] -= 1
+        if not self._queued[flow]:
+            del self._queued[flow]
+            self._forget_if_idle(flow)
+
+    def _release(self, flow: str):
+        self._in_use -= 1
+        self._running[flow] -= 1
+        if not self._running[flow]:
+            del self._running[flow]
+            self._forget_if_idle(flow)
+        self._dispatch()
+
+    def _forget_if_idle(self, flow: str):
+        # Idle flows restart at the current virtual time, so their tag isn't needed;
+        # batches come and go, and keeping every tag would grow without bound
+        if flow not in self._queued and flow not in self._running:
+            self._finish_tags.pop(flow, None)
+
+    def _dispatch(self):
+        while self._queue and self._in_use < self.capacity:
+            _, start, _, flow, priority, future = heapq.heappop(self._queue)
+            if future.cancelled():
+                continue
+            self._virtual_time[priority] = max(self._virtual_time[priority], start)
+            self._in_use += 1
+            self._running[flow] = self._running.get(flow, 0) + 1
+            self._dequeued(flow, priority)
+            future.set_result(None)
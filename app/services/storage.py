@@ -0,0 +1,284 @@
+import asyncio
+import json
+import os
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import AsyncIterator
+
+import aiofiles
+
+from ..config import Settings
+from ..utils.logger import logger
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # only needed for STORAGE_BACKEND=s3
+    boto3 = None
+
+CHUNK_SIZE = 256 * 1024
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "mp4": "video/mp4",
+    "webm": "video/webm",
+    "gif": "image/gif",
+}
+
+# Keys are content hashes, so a stored object never changes
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class StorageBackend(ABC):
+    """Where committed output files live.
+
+    Keys are the content-addressed paths the capture index records, such as
+    `objects/ab/cd/<sha256>.png`. Files are staged on local disk and handed
+    to `put`, which takes ownership of them.
+
+    A backend several nodes can share (`shared`) also keeps a manifest of
+    each capture's outputs, so a node can serve captures made by another.
+    """
+
+    # Set by backends other nodes share; namespaces the keys of files this node stores
+    node_id: str | None = None
+
+    @property
+    def shared(self) -> bool:
+        return self.node_id is not None
+
+    @property
+    def namespace(self) -> str:
+        """Prepended to the keys of files this node stores."""
+        return f"{self.node_id}/" if self.node_id else ""
+
+    @abstractmethod
+    async def put(self, key: str, source: Path) -> bool:
+        """Store `source` under `key`, consuming it. Returns False if the key already existed."""
+
+    @abstractmethod
+    async def delete(self, keys: list[str]):
+        """Remove stored files; keys that don't exist are ignored."""
+
+    @abstractmethod
+    def read(self, key: str) -> AsyncIterator[bytes]:
+        """Stream a stored file's bytes."""
+
+    def local_path(self, key: str) -> Path | None:
+        """Path to serve the file from directly, if this backend keeps it on local disk."""
+        return None
+
+    def presigned_url(self, key: str, filename: str) -> str | None:
+        """Time-limited URL clients can download the file from instead of going through the API."""
+        return None
+
+    async def put_manifest(self, capture_id: str, manifest: dict):
+        """Publish a capture's outputs to the other nodes."""
+
+    async def get_manifest(self, capture_id: str) -> dict | None:
+        """A capture's outputs as published by whichever node made it."""
+        return None
+
+    async def delete_manifest(self, capture_id: str):
+        pass
+
+
+class LocalStorage(StorageBackend):
+    """Files under output_dir; `put` is an atomic rename from the staging directory."""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    async def put(self, key: str, source: Path) -> bool:
+        return await asyncio.to_thread(self._place, key, source)
+
+    def _place(self, key: str, source: Path) -> bool:
+        target = self.root / key
+        if target.exists():
+            source.unlink(missing_ok=True)
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, target)
+        return True
+
+    async def delete(self, keys: list[str]):
+        await asyncio.to_thread(self._unlink, keys)
+
+    def _unlink(self, keys: list[str]):
+        for key in keys:
+            (self.root / key).unlink(missing_ok=True)
+
+    async def read(self, key: str) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self.root / key, "rb") as f:
+            while chunk := await f.read(CHUNK_SIZE):
+                yield chunk
+
+    def local_path(self, key: str) -> Path:
+        return self.root / key
+
+
+class S3Storage(StorageBackend):
+    """Objects in an S3-compatible bucket (AWS, MinIO, R2, ...).
+
+    Several nodes can use one bucket. Each keeps its own capture index, and
+    its reference counts only cover its own captures, so the files a node
+    stores are namespaced by node (`<prefix><node id>/objects/...`): a node
+    only ever deletes objects its own index counted, and identical content
+    is only deduplicated within a node. Every capture also gets a manifest
+    at `<prefix>manifests/<id>.json`, which other nodes read to serve it.
+    The processes of one node share STATE_DIR, and so the index and the
+    node id.
+
+    boto3 is blocking, so transfers run in threads: uploads are bounded by
+    `storage_upload_concurrency`, and files above `storage_multipart_threshold`
+    go up as concurrent multipart parts. Downloads are redirected to presigned
+    URLs, so artifact bytes never pass through the API.
+    """
+
+    def __init__(self, settings: Settings):
+        if boto3 is None:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+        if not settings.s3_bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+
+        self.bucket = settings.s3_bucket
+        self.prefix = settings.s3_prefix
+        self.node_id = node_id(settings)
+        self.presign_expires = settings.s3_presign_expires
+        self._uploads = asyncio.Semaphore(settings.storage_upload_concurrency)
+        self._transfer = TransferConfig(
+            multipart_threshold=settings.storage_multipart_threshold,
+            multipart_chunksize=settings.storage_multipart_threshold,
+            max_concurrency=4,
+        )
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=settings.s3_endpoint_url,
+            region_name=settings.s3_region,
+            aws_access_key_id=settings.s3_access_key_id,
+            aws_secret_access_key=settings.s3_secret_access_key,
+            # Room for every concurrent upload's multipart streams
+            config=BotoConfig(max_pool_connections=settings.storage_upload_concurrency * 4),
+        )
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    async def put(self, key: str, source: Path) -> bool:
+        async with self._uploads:
+            try:
+                return await asyncio.to_thread(self._upload, key, source)
+            finally:
+                source.unlink(missing_ok=True)
+
+    def _upload(self, key: str, source: Path) -> bool:
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return False
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("404", "NoSuchKey", "NotFound"):
+                raise
+        self._client.upload_file(
+            str(source),
+            self.bucket,
+            self._key(key),
+            ExtraArgs={
+                "ContentType": CONTENT_TYPES.get(key.rsplit(".", 1)[-1], "application/octet-stream"),
+                "CacheControl": IMMUTABLE,
+            },
+            Config=self._transfer,
+        )
+        return True
+
+    async def delete(self, keys: list[str]):
+        if keys:
+            await asyncio.to_thread(self._delete, keys)
+
+    def _delete(self, keys: list[str]):
+        # DeleteObjects takes up to 1000 keys per request
+        for start in range(0, len(keys), 1000):
+            response = self._client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": self._key(k)} for k in keys[start:start + 1000]], "Quiet": True},
+            )
+            for error in response.get("Errors", []):
+                logger.warning(f"S3 delete of {error['Key']} failed: {error['Message']}")
+
+    async def read(self, key: str) -> AsyncIterator[bytes]:
+        response = await asyncio.to_thread(self._client.get_object, Bucket=self.bucket, Key=self._key(key))
+        body = response["Body"]
+        try:
+            while chunk := await asyncio.to_thread(body.read, CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    def _manifest_key(self, capture_id: str) -> str:
+        return f"{self.prefix}manifests/{capture_id}.json"
+
+    async def put_manifest(self, capture_id: str, manifest: dict):
+        await asyncio.to_thread(
+            self._client.put_object,
+            Bucket=self.bucket,
+            Key=self._manifest_key(capture_id),
+            Body=json.dumps({"node": self.node_id, **manifest}).encode(),
+            ContentType="application/json",
+        )
+
+    async def get_manifest(self, capture_id: str) -> dict | None:
+        return await asyncio.to_thread(self._get_manifest, capture_id)
+
+    def _get_manifest(self, capture_id: str) -> dict | None:
+        try:
+            response = self._client.get_object(Bucket=self.bucket, Key=self._manifest_key(capture_id))
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return json.loads(response["Body"].read())
+
+    async def delete_manifest(self, capture_id: str):
+        await asyncio.to_thread(self._client.delete_object, Bucket=self.bucket, Key=self._manifest_key(capture_id))
+
+    def presigned_url(self, key: str, filename: str) -> str:
+        # Signed locally; no request is made
+        return self._client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(key),
+                "ResponseContentDisposition": f'attachment; filename="{filename}"',
+            },
+            ExpiresIn=self.presign_expires,
+        )
+
+
+def node_id(settings: Settings) -> str:
+    """This node's id: S3_NODE_ID, or one generated on first use and kept in STATE_DIR."""
+    if settings.s3_node_id:
+        return settings.s3_node_id
+    path = settings.state_dir / "node_id"
+    if not path.exists():
+        candidate = uuid.uuid4().hex[:16]
+        staged = path.with_name(f"node_id.{candidate}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staged.write_text(candidate)
+        try:
+            # Atomic and never overwrites, so concurrently starting processes agree on one id
+            os.link(staged, path)
+        except FileExistsError:
+            pass
+        finally:
+            staged.unlink()
+    return path.read_text().strip()
+
+
+def create_backend(settings: Settings) -> StorageBackend:
+    if settings.storage_backend == "s3":
+        return S3Storage(settings)
+    return LocalStorage(settings.output_dir)
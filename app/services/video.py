@@ -1,16 +1,26 @@
 import os
+import time
 import uuid
+import secrets
 import asyncio
 import tempfile
-import subprocess
 import shutil
-import random
+import hashlib
+from functools import lru_cache
 from pathlib import Path
+from dataclasses import dataclass
 from datetime import datetime
 from PIL import Image
 from io import BytesIO
+import numpy as np
 
 from .browser_pool import browser_pool
+from .ffmpeg import ffmpeg_runner, EncodeResult
+from .frame_scheduler import FrameScheduler
+from .artifact_store import artifact_store
+from .capture_index import CaptureRecord, capture_index, request_hash
+from .retention import retention_manager
+from .webhooks import webhook_dispatcher
 from .popup_blocker import (
     ALL_POPUP_SELECTORS,
     generate_hiding_css,
@@ -18,12 +28,73 @@ from .popup_blocker import (
 )
 from ..config import get_settings
 from ..utils.logger import logger
-from ..models.schemas import VideoRequest, VideoResponse
+from ..models.schemas import VideoRequest, VideoResponse, VideoOutput
+
+# Encoding profiles: codec-specific speed/quality trade-offs per output format
+ENCODING_PROFILES = {
+    "realtime": {
+        "mp4": ["-c:v", "libx264", "-preset", "veryfast", "-tune", "fastdecode", "-crf", "26"],
+        "webm": ["-c:v", "libvpx-vp9", "-deadline", "realtime", "-cpu-used", "8",
+                 "-row-mt", "1", "-crf", "36", "-b:v", "0"],
+        "gif": {"max_fps": 12, "dither": "bayer:bayer_scale=3"},
+    },
+    "balanced": {
+        "mp4": ["-c:v", "libx264", "-preset", "fast", "-crf", "23"],
+        "webm": ["-c:v", "libvpx-vp9", "-deadline", "good", "-cpu-used", "4",
+                 "-row-mt", "1", "-crf", "32", "-b:v", "0"],
+        "gif": {"max_fps": 15, "dither": "sierra2_4a"},
+    },
+    "archival": {
+        "mp4": ["-c:v", "libx264", "-preset", "slow", "-crf", "18"],
+        "webm": ["-c:v", "libvpx-vp9", "-deadline", "good", "-cpu-used", "1",
+                 "-row-mt", "1", "-crf", "24", "-b:v", "0"],
+        "gif": {"max_fps": 20, "dither": "floyd_steinberg"},
+    },
+}
+
+# Realistic scroll timelines: one (scroll position, is-pause) record per frame
+SCROLL_PATTERN_DTYPE = np.dtype([("pos", np.int32), ("pause", np.bool_)])
+
+
+@lru_cache(maxsize=64)
+def _smoothstep_table(frames: int) -> np.ndarray:
+    """Smoothstep easing factors for an animation of `frames` frames."""
+    t = np.arange(frames, dtype=np.float64) / frames
+    table = t * t * (3 - 2 * t)
+    table.setflags(write=False)
+    return table
+
+
+def _scroll_segment(start: int, end: int, frames: int) -> np.ndarray:
+    segment = np.empty(frames, dtype=SCROLL_PATTERN_DTYPE)
+    positions = start + (end - start) * _smoothstep_table(frames)
+    segment["pos"] = np.maximum(positions, 0)
+    segment["pause"] = False
+    return segment
+
+
+def _pause_segment(pos: int, frames: int) -> np.ndarray:
+    segment = np.empty(max(frames, 0), dtype=SCROLL_PATTERN_DTYPE)
+    segment["pos"] = max(pos, 0)
+    segment["pause"] = True
+    return segment
+
+
+@dataclass
+class RecordingStats:
+    frames_total: int = 0  # frames handed to the encoder
+    frames_captured: int = 0  # real screenshots
+    frames_synthesized: int = 0  # repeats filling missed frame slots
+    achieved_fps: float = 0.0
+    avg_capture_ms: float = 0.0
+    scroll_seed: int | None = None
+    timeline_hash: str | None = None
 
 
 class VideoService:
     def __init__(self):
         self.settings = get_settings()
+        self._in_progress: dict[str, asyncio.Task] = {}
         self._ensure_output_dir()
 
     def _ensure_output_dir(self):
@@ -39,25 +110,39 @@ class VideoService:
         }
         return speeds.get(speed, speeds["medium"])
 
-    def _generate_realistic_scroll_pattern(self, total_scroll: int, pause_multiplier: float = 1.0):
+    def _generate_realistic_scroll_pattern(
+        self,
+        total_scroll: int,
+        pause_multiplier: float = 1.0,
+        seed: int | None = None,
+    ) -> np.ndarray:
         """
         Generate a realistic scroll pattern mimicking human behavior.
         - Unequal scroll distances (some short, some long)
         - Varying pause durations
         - Occasional small backtracks
         - Scrolls down then back up
-        Returns list of (scroll_position, is_pause) tuples.
+        Returns a SCROLL_PATTERN_DTYPE array of (pos, pause) frames. The same
+        seed always yields a byte-identical pattern.
         """
-        pattern = []
+        rng = np.random.default_rng(seed)
+
+        def randint(low: int, high: int) -> int:
+            return int(rng.integers(low, high, endpoint=True))
+
+        def pause(low: int, high: int) -> int:
+            return int(randint(low, high) * pause_multiplier)
+
+        segments = []
         current_pos = 0
 
         # Adjust number of segments based on scroll distance (fewer for shorter scrolls)
         if total_scroll < 1000:
-            num_down_scrolls = random.randint(2, 4)
+            num_down_scrolls = randint(2, 4)
         elif total_scroll < 2000:
-            num_down_scrolls = random.randint(3, 5)
+            num_down_scrolls = randint(3, 5)
         else:
-            num_down_scrolls = random.randint(4, 7)
+            num_down_scrolls = randint(4, 7)
         remaining = total_scroll
         scroll_targets = []
 
@@ -67,7 +152,7 @@ class VideoService:
                 scroll_targets.append(total_scroll)
             else:
                 # Random portion of remaining distance (15-40%)
-                portion = random.uniform(0.15, 0.40)
+                portion = rng.uniform(0.15, 0.40)
                 target = current_pos + int(remaining * portion)
                 scroll_targets.append(target)
                 remaining = total_scroll - target
@@ -80,58 +165,36 @@ class VideoService:
             scroll_distance = target - current_pos
 
             # Varying scroll speed (frames) - shorter scrolls are quicker
-            scroll_frames = random.randint(8, 18) if scroll_distance > 200 else random.randint(5, 10)
-
-            # Animate the scroll with easing
-            for f in range(scroll_frames):
-                t = f / scroll_frames
-                ease = t * t * (3 - 2 * t)  # Smoothstep
-                pos = current_pos + scroll_distance * ease
-                pattern.append((int(pos), False))
+            scroll_frames = randint(8, 18) if scroll_distance > 200 else randint(5, 10)
+            segments.append(_scroll_segment(current_pos, target, scroll_frames))
 
             current_pos = target
 
             # Varying pause duration (longer pauses mid-page, shorter at edges)
             if i == 0:
-                pause_frames = int(random.randint(12, 20) * pause_multiplier)
+                pause_frames = pause(12, 20)
             elif i == len(scroll_targets) - 1:
-                pause_frames = int(random.randint(15, 25) * pause_multiplier)
+                pause_frames = pause(15, 25)
             else:
-                pause_frames = int(random.randint(10, 30) * pause_multiplier)
-
-            for _ in range(pause_frames):
-                pattern.append((current_pos, True))
+                pause_frames = pause(10, 30)
+            segments.append(_pause_segment(current_pos, pause_frames))
 
             # Occasional small backtrack (30% chance, not on first or last)
-            if 0 < i < len(scroll_targets) - 1 and random.random() < 0.3:
-                backtrack = random.randint(30, 80)
-                back_pos = max(0, current_pos - backtrack)
-
-                # Quick scroll up
-                for f in range(6):
-                    t = f / 6
-                    ease = t * t * (3 - 2 * t)
-                    pos = current_pos - (current_pos - back_pos) * ease
-                    pattern.append((int(pos), False))
-
-                # Brief pause
-                for _ in range(int(random.randint(8, 15) * pause_multiplier)):
-                    pattern.append((back_pos, True))
-
-                # Scroll back down
-                for f in range(6):
-                    t = f / 6
-                    ease = t * t * (3 - 2 * t)
-                    pos = back_pos + (current_pos - back_pos) * ease
-                    pattern.append((int(pos), False))
+            if 0 < i < len(scroll_targets) - 1 and rng.random() < 0.3:
+                back_pos = max(0, current_pos - randint(30, 80))
+
+                # Quick scroll up, brief pause, scroll back down
+                segments.append(_scroll_segment(current_pos, back_pos, 6))
+                segments.append(_pause_segment(back_pos, pause(8, 15)))
+                segments.append(_scroll_segment(back_pos, current_pos, 6))
 
         # Scroll back UP (fewer segments, more direct)
         if total_scroll < 1000:
-            num_up_scrolls = random.randint(2, 3)
+            num_up_scrolls = randint(2, 3)
         elif total_scroll < 2000:
-            num_up_scrolls = random.randint(2, 4)
+            num_up_scrolls = randint(2, 4)
         else:
-            num_up_scrolls = random.randint(3, 5)
+            num_up_scrolls = randint(3, 5)
         up_targets = []
         remaining = total_scroll
 
@@ -139,7 +202,7 @@ class VideoService:
             if i == num_up_scrolls - 1:
                 up_targets.append(0)
             else:
-                portion = random.uniform(0.20, 0.45)
+                portion = rng.uniform(0.20, 0.45)
                 target = current_pos - int(remaining * portion)
                 up_targets.append(max(0, target))
                 remaining = target
@@ -148,255 +211,459 @@ class VideoService:
         current_pos = total_scroll
 
         # Scroll UP
-        for i, target in enumerate(up_targets):
-            scroll_distance = current_pos - target
-            scroll_frames = random.randint(10, 16)
-
-            for f in range(scroll_frames):
-                t = f / scroll_frames
-                ease = t * t * (3 - 2 * t)
-                pos = current_pos - scroll_distance * ease
-                pattern.append((int(max(0, pos)), False))
-
+        for target in up_targets:
+            segments.append(_scroll_segment(current_pos, target, randint(10, 16)))
             current_pos = target
 
             # Shorter pauses on the way up (scanning, not reading)
-            pause_frames = int(random.randint(8, 18) * pause_multiplier)
-            for _ in range(pause_frames):
-                pattern.append((max(0, current_pos), True))
+            segments.append(_pause_segment(current_pos, pause(8, 18)))
 
-        return pattern
+        return np.concatenate(segments)
 
     async def capture_video(self, request: VideoRequest) -> VideoResponse:
         """Capture a scrolling video of the URL."""
         video_id = str(uuid.uuid4())
-        filename = f"{video_id}.{request.format}"
-        filepath = self.settings.output_dir / filename
-
-        # Check for realistic scroll mode
-        realistic_mode = getattr(request, 'realistic', False) or request.scroll_speed == "realistic"
+        formats = request.output_formats
+        # Encoded to temp files, then committed to storage once complete
+        outputs = {fmt: artifact_store.temp_path(f"{video_id}.{fmt}") for fmt in formats}
+        filename = outputs[formats[0]].name
+        # Seed the scroll pattern so the timeline can be reproduced
+        seed = request.seed if request.seed is not None else secrets.randbits(32)
 
-        async with browser_pool.get_driver(block_popups=request.dismiss_popups) as driver:
-            # Create temp directory for frames
-            temp_dir = Path(tempfile.mkdtemp())
+        if request.progressive:
+            # Reject up front; the capture itself runs after we've responded
+            browser_pool.scheduler.check_admission()
+            return self._start_progressive(video_id, request, outputs, seed)
 
-            try:
-                # Set viewport size
-                driver.set_window_size(request.width, request.height)
+        # Create temp directory for frames
+        temp_dir = Path(tempfile.mkdtemp())
 
-                # Navigate to URL
-                logger.info(f"Navigating to {request.url}")
-                await asyncio.get_event_loop().run_in_executor(
-                    None, driver.get, str(request.url)
-                )
+        try:
+            async def write_frame(index: int, frame: bytes):
+                (temp_dir / f"frame_{index:05d}.png").write_bytes(frame)
 
-                # Wait for page load
-                await asyncio.sleep(2)
+            async with browser_pool.get_driver(block_popups=request.dismiss_popups) as driver:
+                stats = await self._record_frames(driver, request, write_frame, seed)
 
-                # Dismiss popups before capturing video
-                if request.dismiss_popups:
-                    await self._dismiss_popups(driver)
+            logger.info(
+                f"Captured {stats.frames_captured} frames "
+                f"({stats.achieved_fps}/{request.fps} FPS), encoding video..."
+            )
 
-                # Trigger lazy loading by doing a quick scroll-through first
-                await self._trigger_lazy_load(driver)
+            # Frames are on disk, so the browser is released before waiting for an encoder slot
+            encode = await self._encode_video(
+                video_id,
+                temp_dir,
+                outputs,
+                request.fps,
+                request.width,
+                request.profile or self.settings.video_profile,
+                stats.frames_total,
+            )
 
-                # Get page height (using multiple methods for reliability)
-                page_height = driver.execute_script("""
-                    return Math.max(
-                        document.body.scrollHeight || 0,
-                        document.body.offsetHeight || 0,
-                        document.documentElement.scrollHeight || 0,
-                        document.documentElement.offsetHeight || 0,
-                        document.documentElement.clientHeight || 0
-                    );
-                """)
+            output_info = [
+                VideoOutput(
+                    format=fmt,
+                    filename=path.name,
+                    size=path.stat().st_size,
+                    download_url=f"/api/video/{video_id}?format={fmt}",
+                )
+                for fmt, path in outputs.items()
+            ]
+            response = VideoResponse(
+                id=video_id,
+                filename=filename,
+                size=output_info[0].size,
+                format=formats[0],
+                dimensions={"width": request.width, "height": request.height},
+                duration=request.duration,
+                fps=request.fps,
+                download_url=f"/api/video/{video_id}",
+                encode_time=round(encode.elapsed, 3),
+                encode_speed=encode.speed,
+                outputs=output_info,
+                scroll_seed=stats.scroll_seed,
+                timeline_hash=stats.timeline_hash,
+                achieved_fps=stats.achieved_fps,
+                frames_captured=stats.frames_captured,
+                frames_synthesized=stats.frames_synthesized,
+                created_at=datetime.utcnow(),
+            )
 
-                total_scroll = max(0, page_height - request.height)
+        finally:
+            # Cleanup temp directory
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        # Stored once the browser is released, so uploads never hold up captures
+        await self._commit(video_id, request, outputs)
+        logger.info(
+            f"Video saved: {', '.join(o.filename for o in response.outputs)} "
+            f"({response.size} bytes, encoded in {response.encode_time:.2f}s)"
+        )
+        return response
+
+    def _start_progressive(
+        self, video_id: str, request: VideoRequest, outputs: dict[str, Path], seed: int
+    ) -> VideoResponse:
+        """Start a progressive capture in the background and return immediately.
+
+        Frames are piped straight into FFmpeg, which writes fragmented MP4 that
+        can be downloaded while the capture is still running.
+        """
+        response = VideoResponse(
+            id=video_id,
+            filename=outputs["mp4"].name,
+            size=0,
+            format="mp4",
+            dimensions={"width": request.width, "height": request.height},
+            duration=request.duration,
+            fps=request.fps,
+            download_url=f"/api/video/{video_id}",
+            status="processing",
+            scroll_seed=seed if request.scroll_speed == "realistic" else None,
+            created_at=datetime.utcnow(),
+        )
+
+        task = asyncio.create_task(self._capture_progressive(video_id, request, outputs, seed))
+        self._in_progress[video_id] = task
+        task.add_done_callback(lambda t: self._progressive_done(video_id, t, request, response, outputs))
+        return response
+
+    async def _capture_progressive(self, video_id: str, request: VideoRequest, outputs: dict[str, Path], seed: int):
+        """Record frames and stream them into a fragmented-MP4 encode."""
+        # Small buffer so a slow encoder applies backpressure to the capture loop
+        frames: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=request.fps)
+
+        async def frame_source():
+            while (frame := await frames.get()) is not None:
+                yield frame
+
+        args = self._build_encode_args(
+            None, outputs, request.fps, request.width,
+            request.profile or self.settings.video_profile, progressive=True,
+        )
+
+        # Frames go straight into FFmpeg, so the encoder slot is taken before the
+        # browser; waiting for it then holds no driver and doesn't count toward a deadline
+        async with ffmpeg_runner.slot():
+            encode_task = asyncio.create_task(ffmpeg_runner.run(args, job_id=video_id, stdin=frame_source()))
+
+            async def put_frame(frame: bytes | None):
+                put = asyncio.ensure_future(frames.put(frame))
+                await asyncio.wait({put, encode_task}, return_when=asyncio.FIRST_COMPLETED)
+                if not put.done():
+                    # FFmpeg stopped reading; surface its error instead of blocking forever
+                    put.cancel()
+                    encode_task.result()
+                    raise RuntimeError("FFmpeg exited before all frames were written")
+
+            async def write_frame(index: int, frame: bytes):
+                await put_frame(frame)
 
-                # Apply scroll depth limit (percentage of page)
-                total_scroll = int(total_scroll * request.scroll_depth)
+            try:
+                async with browser_pool.get_driver(block_popups=request.dismiss_popups) as driver:
+                    stats = await self._record_frames(driver, request, write_frame, seed)
+                await put_frame(None)
+                encode = await encode_task
+            except BaseException:
+                encode_task.cancel()
+                # Let FFmpeg be killed before the slot is handed on
+                await asyncio.gather(encode_task, return_exceptions=True)
+                raise
+
+        logger.info(
+            f"Progressive video saved: {outputs['mp4'].name} "
+            f"({stats.frames_total} frames, {stats.achieved_fps}/{request.fps} FPS, "
+            f"encoded in {encode.elapsed:.2f}s)"
+        )
+        # Still "processing" until committed, so downloads switch over to the stored file
+        await self._commit(video_id, request, outputs)
+
+    def _progressive_done(
+        self, video_id: str, task: asyncio.Task, request: VideoRequest, response: VideoResponse,
+        outputs: dict[str, Path],
+    ):
+        self._in_progress.pop(video_id, None)
+        if task.cancelled() or task.exception():
+            if not task.cancelled():
+                logger.error(f"Progressive video {video_id} failed: {task.exception()}")
+                webhook_dispatcher.capture_finished(request, "video", error="Video capture failed")
+            for path in outputs.values():
+                path.unlink(missing_ok=True)
+            return
+
+        record = capture_index.get(video_id, "video")
+        finished = response.model_copy(update={"status": "completed", "size": record.size if record else 0})
+        webhook_dispatcher.capture_finished(request, "video", finished)
+
+    async def _commit(self, video_id: str, request: VideoRequest, outputs: dict[str, Path]):
+        """Move finished outputs into storage and index them, primary format first."""
+        digest = request_hash(request)
+        await artifact_store.commit([
+            (
+                path,
+                CaptureRecord(
+                    id=video_id,
+                    kind="video",
+                    format=fmt,
+                    path=path.name,
+                    size=0,
+                    url=str(request.url),
+                    request_hash=digest,
+                    width=request.width,
+                    height=request.height,
+                ),
+            )
+            for fmt, path in outputs.items()
+        ])
+        retention_manager.check_quota()
 
-                # Apply max pixel limit if specified (overrides depth)
-                if request.max_scroll_px is not None:
-                    total_scroll = min(total_scroll, request.max_scroll_px)
+    def is_processing(self, video_id: str) -> bool:
+        """Whether a progressive video is still being captured/encoded."""
+        return video_id in self._in_progress
 
-                logger.info(f"Page height: {page_height}px, scrolling {total_scroll}px (depth: {request.scroll_depth}, max_px: {request.max_scroll_px})")
+    async def wait_for_output(self, video_id: str, format: str | None = None, timeout: float = 30) -> Path | None:
+        """Wait for a progressive video's output file to appear (FFmpeg opens it on the first frame).
 
-                # Scroll to top
-                driver.execute_script("window.scrollTo(0, 0)")
-                await asyncio.sleep(0.1)
+        Progressive videos are only indexed once finished, so this looks at the
+        file being written directly.
+        """
+        filepath = artifact_store.temp_path(f"{video_id}.{format or 'mp4'}")
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        while self.is_processing(video_id) and loop.time() < deadline:
+            if filepath.exists():
+                return filepath
+            await asyncio.sleep(0.1)
+        return filepath if filepath.exists() else None
 
-                frames_captured = 0
+    async def _record_frames(self, driver, request: VideoRequest, emit, seed: int | None = None) -> RecordingStats:
+        """Load the page and capture scroll frames, passing each PNG to `emit(index, data)`."""
+        # Check for realistic scroll mode
+        realistic_mode = getattr(request, 'realistic', False) or request.scroll_speed == "realistic"
 
-                if realistic_mode:
-                    # Realistic human-like scrolling with varying speeds and pauses
-                    logger.info(f"Using realistic scroll pattern (pause_multiplier: {request.pause_multiplier})")
-                    scroll_pattern = self._generate_realistic_scroll_pattern(total_scroll, request.pause_multiplier)
+        # Set viewport size
+        driver.set_window_size(request.width, request.height)
 
-                    for scroll_pos, is_pause in scroll_pattern:
-                        # Capture frame
-                        screenshot = await asyncio.get_event_loop().run_in_executor(
-                            None, driver.get_screenshot_as_png
-                        )
+        # Navigate to URL
+        logger.info(f"Navigating to {request.url}")
+        await asyncio.get_event_loop().run_in_executor(
+            None, driver.get, str(request.url)
+        )
 
-                        frame_path = temp_dir / f"frame_{frames_captured:05d}.png"
-                        image = Image.open(BytesIO(screenshot))
+        # Wait for page load
+        await asyncio.sleep(2)
 
-                        if image.size != (request.width, request.height):
-                            image = image.crop((0, 0, request.width, request.height))
+        # Dismiss popups before capturing video
+        if request.dismiss_popups:
+            await self._dismiss_popups(driver)
 
-                        image.save(frame_path, "PNG")
-                        frames_captured += 1
+        # Trigger lazy loading by doing a quick scroll-through first
+        await self._trigger_lazy_load(driver)
 
-                        # Scroll to position
-                        driver.execute_script(f"window.scrollTo(0, {scroll_pos})")
+        # Get page height (using multiple methods for reliability)
+        page_height = driver.execute_script("""
+            return Math.max(
+                document.body.scrollHeight || 0,
+                document.body.offsetHeight || 0,
+                document.documentElement.scrollHeight || 0,
+                document.documentElement.offsetHeight || 0,
+                document.documentElement.clientHeight || 0
+            );
+        """)
 
-                        # Faster capture during scroll, slower during pause
-                        delay = 0.05 if not is_pause else 0.033
-                        await asyncio.sleep(delay)
+        total_scroll = max(0, page_height - request.height)
 
-                else:
-                    # Original smooth scroll mode
-                    scroll_per_frame = self._get_scroll_speed_pixels(request.scroll_speed, request.height)
-                    frame_interval = 1000 / request.fps
-                    total_frames = int((request.duration / 1000) * request.fps)
+        # Apply scroll depth limit (percentage of page)
+        total_scroll = int(total_scroll * request.scroll_depth)
 
-                    logger.info(f"Capturing {total_frames} frames at {request.fps} FPS")
+        # Apply max pixel limit if specified (overrides depth)
+        if request.max_scroll_px is not None:
+            total_scroll = min(total_scroll, request.max_scroll_px)
 
-                    current_scroll = 0
+        logger.info(f"Page height: {page_height}px, scrolling {total_scroll}px (depth: {request.scroll_depth}, max_px: {request.max_scroll_px})")
 
-                    for frame_num in range(total_frames):
-                        screenshot = await asyncio.get_event_loop().run_in_executor(
-                            None, driver.get_screenshot_as_png
-                        )
+        # Scroll to top
+        driver.execute_script("window.scrollTo(0, 0)")
+        await asyncio.sleep(0.1)
 
-                        frame_path = temp_dir / f"frame_{frame_num:05d}.png"
-                        image = Image.open(BytesIO(screenshot))
+        stats = RecordingStats()
+        scheduler = FrameScheduler(request.fps)
 
-                        if image.size != (request.width, request.height):
-                            image = image.crop((0, 0, request.width, request.height))
+        if realistic_mode:
+            # Realistic human-like scrolling with varying speeds and pauses
+            logger.info(f"Using realistic scroll pattern (pause_multiplier: {request.pause_multiplier}, seed: {seed})")
+            scroll_pattern = self._generate_realistic_scroll_pattern(
+                total_scroll, request.pause_multiplier, seed
+            )
+            stats.scroll_seed = seed
+            stats.timeline_hash = hashlib.sha256(scroll_pattern.tobytes()).hexdigest()[:16]
+            scheduler.start()
 
-                        image.save(frame_path, "PNG")
-                        frames_captured += 1
+            for frame_num, (scroll_pos, is_pause) in enumerate(scroll_pattern.tolist()):
+                # Capture frame
+                capture_start = time.monotonic()
+                await emit(frame_num, await self._capture_frame(driver, request))
+                scheduler.record_capture(time.monotonic() - capture_start)
 
-                        if current_scroll < total_scroll:
-                            current_scroll = min(current_scroll + scroll_per_frame, total_scroll)
-                            driver.execute_script(f"window.scrollTo(0, {current_scroll})")
+                # Scroll to position
+                driver.execute_script(f"window.scrollTo(0, {scroll_pos})")
 
-                        await asyncio.sleep(frame_interval / 1000 * 0.5)
+                # Faster capture during scroll, slower during pause
+                delay = 0.05 if not is_pause else 0.033
+                await asyncio.sleep(delay)
 
-                logger.info(f"Captured {frames_captured} frames, encoding video...")
+            stats.frames_total = len(scroll_pattern)
 
-                # Encode video with FFmpeg
-                await self._encode_video(
-                    temp_dir,
-                    filepath,
-                    request.fps,
-                    request.format,
-                    request.width,
-                    request.height,
+        else:
+            # Smooth scroll mode, paced against wall-clock frame slots
+            scroll_per_frame = self._get_scroll_speed_pixels(request.scroll_speed, request.height)
+            total_frames = int((request.duration / 1000) * request.fps)
+
+            logger.info(f"Capturing {total_frames} frames at {request.fps} FPS")
+
+            current_scroll = 0
+            slot = 0
+            scheduler.start()
+
+            while slot < total_frames:
+                await scheduler.wait_for_slot(slot)
+
+                capture_start = time.monotonic()
+                frame = await self._capture_frame(driver, request)
+                scheduler.record_capture(time.monotonic() - capture_start)
+                await emit(slot, frame)
+                slot += 1
+
+                # Slots that went by during a slow capture repeat this frame,
+                # so the output still has fps * duration frames
+                missed = min(scheduler.current_slot(), total_frames) - slot
+                for _ in range(max(missed, 0)):
+                    await emit(slot, frame)
+                    slot += 1
+                    scheduler.synthesized += 1
+
+                # Scroll to where the page should be at the next slot
+                target_scroll = min(slot * scroll_per_frame, total_scroll)
+                if target_scroll != current_scroll:
+                    current_scroll = target_scroll
+                    driver.execute_script(f"window.scrollTo(0, {current_scroll})")
+
+            stats.frames_total = total_frames
+
+            if scheduler.synthesized:
+                logger.info(
+                    f"Synthesized {scheduler.synthesized}/{total_frames} frames "
+                    f"(avg capture {scheduler.avg_capture_ms}ms at {request.fps} FPS)"
                 )
 
-                file_size = filepath.stat().st_size
-                logger.info(f"Video saved: {filename} ({file_size} bytes)")
+        stats.frames_captured = scheduler.captures
+        stats.frames_synthesized = scheduler.synthesized
+        stats.achieved_fps = scheduler.achieved_fps
+        stats.avg_capture_ms = scheduler.avg_capture_ms
+        return stats
 
-                return VideoResponse(
-                    id=video_id,
-                    filename=filename,
-                    size=file_size,
-                    format=request.format,
-                    dimensions={"width": request.width, "height": request.height},
-                    duration=request.duration,
-                    fps=request.fps,
-                    download_url=f"/api/video/{video_id}",
-                    created_at=datetime.utcnow(),
-                )
+    async def _capture_frame(self, driver, request: VideoRequest) -> bytes:
+        """Take a viewport screenshot as PNG, cropped to the requested size."""
+        screenshot = await asyncio.get_event_loop().run_in_executor(
+            None, driver.get_screenshot_as_png
+        )
 
-            finally:
-                # Cleanup temp directory
-                shutil.rmtree(temp_dir, ignore_errors=True)
+        image = Image.open(BytesIO(screenshot))
+        if image.size == (request.width, request.height):
+            # Already the right size; skip the decode/re-encode round trip
+            return screenshot
 
-    async def _encode_video(
+        buffer = BytesIO()
+        image.crop((0, 0, request.width, request.height)).save(buffer, "PNG")
+        return buffer.getvalue()
+
+    def _build_encode_args(
         self,
-        frames_dir: Path,
-        output_path: Path,
+        frames_dir: Path | None,
+        outputs: dict[str, Path],
         fps: int,
-        format: str,
         width: int,
-        height: int,
-    ):
-        """Encode frames into video using FFmpeg."""
-        frame_pattern = str(frames_dir / "frame_%05d.png")
-
-        if format == "gif":
-            # Create GIF with palette for better quality
-            palette_path = frames_dir / "palette.png"
-
-            # Generate palette
-            palette_cmd = [
-                "ffmpeg", "-y",
-                "-framerate", str(fps),
-                "-i", frame_pattern,
-                "-vf", f"fps={min(fps, 15)},scale={width}:-1:flags=lanczos,palettegen",
-                str(palette_path),
-            ]
-
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: subprocess.run(palette_cmd, capture_output=True, check=True),
-            )
-
-            # Create GIF using palette
-            gif_cmd = [
-                "ffmpeg", "-y",
-                "-framerate", str(fps),
-                "-i", frame_pattern,
-                "-i", str(palette_path),
-                "-lavfi", f"fps={min(fps, 15)},scale={width}:-1:flags=lanczos[x];[x][1:v]paletteuse",
-                str(output_path),
-            ]
-
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: subprocess.run(gif_cmd, capture_output=True, check=True),
-            )
+        profile: str,
+        progressive: bool = False,
+    ) -> list[str]:
+        """Build a single FFmpeg invocation producing every requested format.
+
+        The decoded frame sequence is split once in the filtergraph and fanned out
+        to each encoder; the GIF palette is generated and applied in-graph, so the
+        frames are only decoded a single time. With no `frames_dir`, PNG frames are
+        read from stdin. `progressive` writes fragmented MP4 that is playable
+        while it is still being written.
+        """
+        settings = ENCODING_PROFILES[profile]
+        threads = str(ffmpeg_runner.threads_per_job)
+
+        input_args = [
+            "-y",
+            "-filter_threads", threads,
+            "-framerate", str(fps),
+        ]
+        if frames_dir is None:
+            input_args += ["-f", "image2pipe", "-c:v", "png", "-i", "pipe:0"]
+        else:
+            input_args += ["-i", str(frames_dir / "frame_%05d.png")]
 
+        formats = list(outputs)
+        filters = []
+        if len(formats) > 1:
+            labels = [f"[v{i}]" for i in range(len(formats))]
+            filters.append(f"[0:v]split={len(formats)}{''.join(labels)}")
         else:
-            # MP4 or WebM
-            codec = "libx264" if format == "mp4" else "libvpx-vp9"
-            pix_fmt = "yuv420p" if format == "mp4" else "yuva420p"
-
-            cmd = [
-                "ffmpeg", "-y",
-                "-framerate", str(fps),
-                "-i", frame_pattern,
-                "-c:v", codec,
-                "-pix_fmt", pix_fmt,
-                "-preset", "fast",
-                "-crf", "23",
-                str(output_path),
-            ]
+            labels = ["[0:v]"]
+
+        output_args = []
+        for fmt, label in zip(formats, labels):
+            if fmt == "gif":
+                gif = settings["gif"]
+                filters.append(
+                    f"{label}fps={min(fps, gif['max_fps'])},scale={width}:-1:flags=lanczos,split[g0][g1];"
+                    f"[g0]palettegen[pal];[g1][pal]paletteuse=dither={gif['dither']}[gif]"
+                )
+                output_args += ["-map", "[gif]"]
+            else:
+                output_args += ["-map", label if label != "[0:v]" else "0:v"]
+                pix_fmt = "yuv420p" if fmt == "mp4" else "yuva420p"
+                output_args += [*settings[fmt], "-pix_fmt", pix_fmt, "-threads", threads]
+                if progressive and fmt == "mp4":
+                    # One-second keyframe interval so fragments are flushed promptly
+                    output_args += [
+                        "-g", str(fps),
+                        "-movflags", "frag_keyframe+empty_moov+default_base_moof",
+                        "-flush_packets", "1",
+                    ]
+            output_args.append(str(outputs[fmt]))
+
+        if filters:
+            input_args += ["-filter_complex_threads", threads, "-filter_complex", ";".join(filters)]
+
+        return input_args + output_args
 
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: subprocess.run(cmd, capture_output=True, check=True),
-            )
+    async def _encode_video(
+        self,
+        video_id: str,
+        frames_dir: Path,
+        outputs: dict[str, Path],
+        fps: int,
+        width: int,
+        profile: str,
+        total_frames: int,
+    ) -> EncodeResult:
+        """Encode frames into all requested formats using FFmpeg."""
+        args = self._build_encode_args(frames_dir, outputs, fps, width, profile)
+        return await ffmpeg_runner.run(args, job_id=video_id, total_frames=total_frames)
 
-    async def get_video(self, video_id: str) -> Path | None:
-        """Get video file path by ID."""
-        for ext in ["mp4", "webm", "gif"]:
-            filepath = self.settings.output_dir / f"{video_id}.{ext}"
-            if filepath.exists():
-                return filepath
-        return None
+    async def get_video(self, video_id: str, format: str | None = None) -> CaptureRecord | None:
+        """Look up a finished video, optionally for a specific output format, made by any node."""
+        return await artifact_store.get(video_id, "video", format)
 
     async def delete_video(self, video_id: str) -> bool:
-        """Delete a video."""
-        filepath = await self.get_video(video_id)
-        if filepath:
-            filepath.unlink()
-            return True
-        return False
+        """Delete a video and all of its output formats."""
+        return await artifact_store.delete(video_id, "video")
 
     async def _trigger_lazy_load(self, driver):
         """Scroll through page quickly to trigger lazy-loaded content."""
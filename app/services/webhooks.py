@@ -0,0 +1,139 @@
+import asyncio
+import random
+from datetime import datetime
+
+import httpx
+
+from ..config import get_settings
+from ..utils.logger import logger
+
+# Receiver errors worth retrying; any other 4xx means the delivery will never be accepted
+RETRY_STATUSES = {408, 425, 429}
+
+
+class WebhookDispatcher:
+    """Delivers completion events to client callback URLs.
+
+    Events are queued per callback URL and sent as `{"events": [...]}` POSTs
+    through one pooled HTTP client. Job events are coalesced for up to
+    `webhook_flush_interval` seconds (or `webhook_batch_size` events), while
+    batch and single-capture completions go out right away, together with
+    whatever was queued before them. Each URL has at most one delivery in
+    flight, so events arrive in order. Failed deliveries are retried with
+    exponential backoff and dropped after `webhook_max_attempts`. A slow or
+    unreachable receiver holds at most `webhook_max_pending` queued events;
+    the oldest are dropped to make room.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+        self._client: httpx.AsyncClient | None = None
+        self._pending: dict[str, list[dict]] = {}
+        self._ready: dict[str, asyncio.Event] = {}
+        self._senders: dict[str, asyncio.Task] = {}
+        # Events dropped per URL since its last delivery because the queue was full
+        self._dropped: dict[str, int] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            concurrency = self.settings.webhook_concurrency
+            self._client = httpx.AsyncClient(
+                timeout=self.settings.webhook_timeout,
+                headers={"User-Agent": "snapsht-webhooks"},
+                limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            )
+        return self._client
+
+    def send(self, url: str, event: str, data: dict, flush: bool = False):
+        """Queue an event for `url`. With `flush`, deliver it without waiting to coalesce."""
+        pending = self._pending.setdefault(url, [])
+        pending.append({"event": event, "sent_at": datetime.utcnow().isoformat(), "data": data})
+        if len(pending) > self.settings.webhook_max_pending:
+            del pending[0]
+            self._dropped[url] = self._dropped.get(url, 0) + 1
+
+        if url not in self._senders:
+            self._ready[url] = asyncio.Event()
+            self._senders[url] = asyncio.create_task(self._sender(url))
+        if flush or len(pending) >= self.settings.webhook_batch_size:
+            self._ready[url].set()
+
+    def capture_finished(self, request, event: str, result=None, error: str | None = None):
+        """Report a single capture's outcome to the request's callback URL, if it gave one."""
+        if not request.callback_url:
+            return
+        if result is not None:
+            data = {"status": "completed", **result.model_dump(mode="json")}
+        else:
+            data = {"status": "failed", "url": str(request.url), "error": error}
+        self.send(str(request.callback_url), event, data, flush=True)
+
+    async def _sender(self, url: str):
+        ready = self._ready[url]
+        try:
+            while self._pending.get(url):
+                try:
+                    await asyncio.wait_for(ready.wait(), self.settings.webhook_flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                ready.clear()
+
+                if dropped := self._dropped.pop(url, 0):
+                    logger.warning(f"Webhook {url}: queue full, dropped the {dropped} oldest events")
+
+                pending = self._pending[url]
+                events = pending[: self.settings.webhook_batch_size]
+                del pending[: len(events)]
+                await self._deliver(url, events)
+
+                if len(pending) >= self.settings.webhook_batch_size:
+                    ready.set()
+        finally:
+            del self._senders[url]
+            del self._ready[url]
+            if not self._pending.get(url):
+                self._pending.pop(url, None)
+                self._dropped.pop(url, None)
+
+    async def _deliver(self, url: str, events: list[dict]):
+        client = self._get_client()
+        attempts = self.settings.webhook_max_attempts
+
+        for attempt in range(1, attempts + 1):
+            try:
+                response = await client.post(url, json={"events": events})
+                if response.status_code < 300:
+                    return
+                error = f"HTTP {response.status_code}"
+                if response.status_code < 500 and response.status_code not in RETRY_STATUSES:
+                    break
+            except httpx.HTTPError as e:
+                error = f"{e.__class__.__name__}: {e}" if str(e) else e.__class__.__name__
+
+            if attempt < attempts:
+                delay = min(
+                    self.settings.webhook_retry_max_delay,
+                    self.settings.webhook_retry_base_delay * 2 ** (attempt - 1),
+                )
+                logger.warning(f"Webhook {url} failed ({error}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay / 2 + random.uniform(0, delay / 2))
+
+        logger.error(f"Webhook {url}: dropped {len(events)} events after {attempt} attempts ({error})")
+
+    async def close(self):
+        """Deliver what is queued (bounded by one request timeout), then close the client."""
+        for ready in self._ready.values():
+            ready.set()
+        senders = list(self._senders.values())
+        if senders:
+            _, unfinished = await asyncio.wait(senders, timeout=self.settings.webhook_timeout)
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global webhook dispatcher instance
+webhook_dispatcher = WebhookDispatcher()
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Awaitable, TypeVar
+
+from fastapi import Request
+
+T = TypeVar("T")
+
+
+class ClientDisconnected(Exception):
+    """The client went away before the work it asked for finished."""
+
+
+async def cancel_on_disconnect(request: Request, work: Awaitable[T], poll_interval: float = 0.5) -> T:
+    """Await `work`, cancelling it if the client disconnects first.
+
+    Starlette doesn't cancel a handler when its client goes away, so long
+    captures would otherwise keep their browser slot and FFmpeg process
+    running for a response nobody will read.
+    """
+    task = asyncio.ensure_future(work)
+
+    async def watch():
+        while not await request.is_disconnected():
+            await asyncio.sleep(poll_interval)
+
+    watcher = asyncio.create_task(watch())
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            raise ClientDisconnected()
+    return task.result()
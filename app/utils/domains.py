@@ -0,0 +1,29 @@
+from urllib.parse import urlsplit
+
+# Common multi-label public suffixes (including hosting platforms where each
+# subdomain is a separate site). Not the full Public Suffix List, but enough
+# to keep e.g. shop.example.co.uk and www.example.co.uk together.
+MULTI_LABEL_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "me.uk", "ltd.uk", "plc.uk",
+    "com.au", "net.au", "org.au", "edu.au", "gov.au",
+    "co.nz", "org.nz", "net.nz",
+    "co.jp", "ne.jp", "or.jp",
+    "com.br", "net.br", "org.br",
+    "com.mx", "com.ar", "com.co", "com.tr", "com.sg", "com.hk", "com.tw", "com.cn",
+    "co.za", "co.in", "co.kr", "co.il", "co.id", "com.my", "com.ph",
+    "myshopify.com", "github.io", "herokuapp.com", "netlify.app", "vercel.app",
+}
+
+
+def registrable_domain(url: str) -> str:
+    """Best-effort registrable domain (eTLD+1) of a URL, e.g. shop.example.co.uk -> example.co.uk."""
+    host = (urlsplit(url).hostname or url).lower().rstrip(".")
+    labels = host.split(".")
+
+    # IP addresses and single-label hosts are their own key
+    if len(labels) <= 2 or host.replace(".", "").isdigit():
+        return host
+
+    if ".".join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
@@ -0,0 +1,172 @@
+import asyncio
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import AsyncIterator, Callable
+
+import aiofiles
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Parse a single `bytes=` range into an inclusive (start, end) pair.
+
+    Returns None for headers we don't handle (multiple ranges, other units),
+    in which case the whole file is served. Raises ValueError if the range
+    can't be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    if size == 0:
+        # No byte of an empty file can be addressed; serve the (empty) whole
+        return None
+
+    start_s, _, end_s = spec.strip().partition("-")
+    try:
+        if not start_s:
+            # Suffix range: last N bytes
+            length = int(end_s)
+        else:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+
+    if not start_s:
+        if length <= 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return etag in tags or "*" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    return False
+
+
+async def _read_file(path: Path, start: int, length: int) -> AsyncIterator[bytes]:
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_response(
+    request: Request,
+    path: Path,
+    media_type: str,
+    filename: str | None = None,
+    etag: str | None = None,
+    cache_control: str | None = None,
+    size: int | None = None,
+    modified: datetime | None = None,
+) -> Response:
+    """Serve a finished file with Range, If-None-Match and If-Modified-Since support.
+
+    Callers that already know the file's `size` and `modified` time (naive
+    datetimes are UTC) save a stat per request; a 304 then touches no file.
+    """
+    if size is None or modified is None:
+        stat = path.stat()
+        size, mtime = stat.st_size, stat.st_mtime
+        etag = etag or f'"{stat.st_mtime_ns:x}-{size:x}"'
+    else:
+        mtime = (modified if modified.tzinfo else modified.replace(tzinfo=timezone.utc)).timestamp()
+        etag = etag or f'"{int(mtime * 1e9):x}-{size:x}"'
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": formatdate(mtime, usegmt=True),
+    }
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+
+    if _not_modified(request, etag, mtime):
+        return Response(status_code=304, headers=headers)
+
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(length)
+            return StreamingResponse(
+                _read_file(path, start, length),
+                status_code=206,
+                media_type=media_type,
+                headers=headers,
+            )
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(_read_file(path, 0, size), media_type=media_type, headers=headers)
+
+
+async def growing_file_response(
+    path: Path,
+    media_type: str,
+    is_growing: Callable[[], bool],
+    poll_interval: float = 0.1,
+) -> StreamingResponse:
+    """Stream a file that is still being written, following it until the writer finishes.
+
+    The file is opened right away, so the stream keeps reading it even if
+    it is moved or unlinked once finished; raises FileNotFoundError if it
+    is already gone.
+    """
+    f = await aiofiles.open(path, "rb")
+
+    async def follow() -> AsyncIterator[bytes]:
+        try:
+            while True:
+                chunk = await f.read(CHUNK_SIZE)
+                if chunk:
+                    yield chunk
+                    continue
+                if not is_growing():
+                    # Writer is done; drain whatever landed since the last read
+                    while chunk := await f.read(CHUNK_SIZE):
+                        yield chunk
+                    return
+                await asyncio.sleep(poll_interval)
+        finally:
+            await f.close()
+
+    return StreamingResponse(
+        follow(),
+        media_type=media_type,
+        headers={"Accept-Ranges": "none", "Cache-Control": "no-store"},
+    )
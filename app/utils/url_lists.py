@@ -0,0 +1,109 @@
+import csv
+import json
+from typing import AsyncIterator, Literal
+
+from pydantic import HttpUrl, TypeAdapter, ValidationError
+
+_http_url = TypeAdapter(HttpUrl)
+
+
+class UrlListReader:
+    """Incrementally parse an uploaded URL list, one line at a time.
+
+    NDJSON lines are either a JSON string or an object with a "url" key. CSV
+    uses the "url" (or "domain") column when the first row is a header, else
+    the first column. Bare domains get an https:// scheme. Invalid lines are
+    counted and the first few reported, never held in memory.
+    """
+
+    MAX_ERRORS = 20
+    MAX_LINE = 8192
+
+    def __init__(self, fmt: Literal["ndjson", "csv"]):
+        self.fmt = fmt
+        self.lines = 0
+        self.invalid = 0
+        self.errors: list[dict] = []
+        self._column: int | None = None
+
+    async def urls(self, stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+        """Yield normalized, validated URLs from a byte stream."""
+        async for line in self._lines(stream):
+            self.lines += 1
+            if not line.strip():
+                continue
+            try:
+                raw = self._extract(line)
+                if raw is None:
+                    continue
+                yield self._validate(raw)
+            except ValueError as e:
+                self._invalid(str(e))
+
+    async def _lines(self, stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+        buffer = b""
+        # Inside the rest of a line already rejected as too long
+        skipping = False
+        async for chunk in stream:
+            if skipping:
+                end = chunk.find(b"\n")
+                if end < 0:
+                    continue
+                chunk = chunk[end + 1:]
+                skipping = False
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if len(line) > self.MAX_LINE:
+                    self._too_long()
+                else:
+                    yield line.decode("utf-8", errors="replace").rstrip("\r")
+            if len(buffer) > self.MAX_LINE:
+                # Don't let one runaway line grow the buffer without bound
+                self._too_long()
+                buffer = b""
+                skipping = True
+        if buffer:
+            yield buffer.decode("utf-8", errors="replace").rstrip("\r")
+
+    def _too_long(self):
+        self.lines += 1
+        self._invalid("Line too long")
+
+    def _extract(self, line: str) -> str | None:
+        if self.fmt == "ndjson":
+            try:
+                value = json.loads(line)
+            except json.JSONDecodeError:
+                raise ValueError("Invalid JSON")
+            if isinstance(value, dict):
+                value = value.get("url")
+            if not isinstance(value, str):
+                raise ValueError('Expected a string or an object with a "url" key')
+            return value
+
+        row = next(csv.reader([line]), [])
+        if self._column is None:
+            header = [cell.strip().lower() for cell in row]
+            for name in ("url", "domain"):
+                if name in header:
+                    self._column = header.index(name)
+                    return None
+            self._column = 0
+        if len(row) <= self._column:
+            raise ValueError("Missing URL column")
+        return row[self._column]
+
+    def _validate(self, raw: str) -> str:
+        raw = raw.strip()
+        if "://" not in raw:
+            raw = f"https://{raw}"
+        try:
+            return str(_http_url.validate_python(raw))
+        except ValidationError:
+            raise ValueError(f"Invalid URL: {raw[:200]}")
+
+    def _invalid(self, message: str):
+        self.invalid += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append({"line": self.lines, "error": message})
@@ -0,0 +1,91 @@
+import io
+import time
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator
+
+
+class ZipEntryError(Exception):
+    """A source failed or ended early after its entry was started; the archive can't be completed."""
+
+
+class _Buffer(io.RawIOBase):
+    """Unseekable sink that collects what zipfile writes until it is drained."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        # Nothing to push anywhere; also lets an abandoned archive (a failed
+        # entry or a client that went away) be garbage collected quietly
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStream:
+    """Write a ZIP archive entry by entry, handing back bytes as they are produced.
+
+    zipfile writes to an unseekable sink, so every entry gets a trailing data
+    descriptor (CRC and sizes) and nothing has to be staged on disk or held
+    in memory beyond one chunk. ZIP64 is used automatically for large files.
+    """
+
+    def __init__(self):
+        self._buffer = _Buffer()
+        self._zip = zipfile.ZipFile(self._buffer, "w", allowZip64=True)
+
+    async def add_stream(
+        self, name: str, chunks: AsyncIterator[bytes], size: int, modified: datetime, compress: bool = False,
+    ):
+        """Stream content into the archive, yielding archive bytes chunk by chunk.
+
+        Images and videos are already compressed, so entries are stored as-is
+        unless `compress` is set. The entry header is only written once the
+        first chunk arrives, so an error opening the source leaves the archive
+        untouched. Past that point the bytes already sent can't be taken back:
+        a source that fails, or ends short of `size`, raises ZipEntryError
+        and the archive must be abandoned rather than finished with a
+        truncated entry.
+        """
+        first = await anext(chunks, b"")
+        info = zipfile.ZipInfo(name, date_time=modified.timetuple()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        # Lets zipfile decide up front whether the entry needs ZIP64
+        info.file_size = size
+        written = len(first)
+        with self._zip.open(info, "w") as entry:
+            entry.write(first)
+            yield self._buffer.drain()
+            try:
+                async for chunk in chunks:
+                    entry.write(chunk)
+                    written += len(chunk)
+                    yield self._buffer.drain()
+            except Exception as e:
+                raise ZipEntryError(f"{name}: source failed after {written} of {size} bytes ({e})") from e
+            if written != size:
+                raise ZipEntryError(f"{name}: source ended after {written} of {size} bytes")
+        yield self._buffer.drain()
+
+    def add_bytes(self, name: str, data: bytes, compress: bool = True) -> bytes:
+        """Add an in-memory entry and return the archive bytes it produced."""
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        self._zip.writestr(info, data)
+        return self._buffer.drain()
+
+    def close(self) -> bytes:
+        """Write the central directory and return the final bytes."""
+        self._zip.close()
+        return self._buffer.drain()
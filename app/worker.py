@@ -0,0 +1,181 @@
+"""Standalone capture worker.
+
+Runs its own browser pool and pulls batch jobs from the shared SQLite job
+store, so capture work scales independently of the HTTP tier:
+
+    BATCH_WORKERS=external uvicorn app.main:app --workers 4
+    python -m app.worker
+"""
+
+import os
+import time
+import signal
+import socket
+import asyncio
+from datetime import datetime
+
+from .config import get_settings
+from .services.browser_pool import browser_pool
+from .services.capture_index import capture_index
+from .services.errors import ThrottledError, is_retryable
+from .services.job_queue import failed_attempts, job_event, retry_delay, summarize_batch
+from .services.job_store import JobStore
+from .services.scheduler import capture_deadline, capture_flow
+from .services.processors import process_url
+from .services.webhooks import webhook_dispatcher
+from .utils.logger import logger
+
+
+class Worker:
+    def __init__(self, concurrency: int | None = None):
+        self.settings = get_settings()
+        self.id = f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency or self.settings.max_concurrent
+        self.store = JobStore(self.settings.state_dir / "jobs.db")
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+
+    def stop(self):
+        logger.info(f"Worker {self.id} stopping")
+        self._stopping.set()
+        self._wakeup.set()
+
+    async def run(self):
+        self.store.open()
+        await browser_pool.initialize()
+        heartbeat = asyncio.create_task(self._heartbeat())
+        logger.info(f"Worker {self.id} started (concurrency {self.concurrency})")
+
+        try:
+            while not self._stopping.is_set():
+                self._drop_halted()
+                free = self.concurrency - len(self._inflight)
+                jobs = self.store.lease_jobs(self.id, free, self.settings.job_lease_seconds) if free else []
+
+                for job in jobs:
+                    task = asyncio.create_task(self._process(job))
+                    self._inflight[job["id"]] = task
+                    task.add_done_callback(lambda t, job_id=job["id"]: self._job_done(job_id))
+
+                if not jobs:
+                    # Idle or at capacity: wait for a slot to free up or the poll interval
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.settings.worker_poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            heartbeat.cancel()
+            for task in self._inflight.values():
+                task.cancel()
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+            # Hand unfinished jobs straight back instead of waiting for lease expiry
+            self.store.release_leases(self.id)
+            await self.store.close()
+            capture_index.close()
+            await webhook_dispatcher.close()
+            await browser_pool.shutdown()
+            logger.info(f"Worker {self.id} stopped")
+
+    def _drop_halted(self):
+        """Cancel captures whose batch was paused or cancelled through the API."""
+        for job_id in self.store.halted_jobs(list(self._inflight)):
+            logger.info(f"Job {job_id}: batch paused or cancelled, stopping capture")
+            self._inflight[job_id].cancel()
+
+    def _job_done(self, job_id: str):
+        self._inflight.pop(job_id, None)
+        self._wakeup.set()
+
+    async def _process(self, job: dict):
+        attempts = job["attempts"]
+        attempt = {"attempt": len(attempts) + 1, "started_at": datetime.utcnow().isoformat(), "worker": self.id}
+        attempts.append(attempt)
+        started = time.monotonic()
+        try:
+            with capture_flow(job["batch_id"], priority=job["priority"]), capture_deadline(self.settings.job_deadline):
+                result = await process_url(job["url"], job["options"], job["type"], job["job_options"])
+            status, error = "completed", None
+        except asyncio.CancelledError:
+            # Hand the job back (or mark it cancelled along with its batch)
+            self.store.release_leases(self.id, [job["id"]])
+            raise
+        except Exception as e:
+            result, status = None, "failed"
+            # A DeadlineExceeded names the deadline; other timeouts have no message of their own
+            error = str(e) or e.__class__.__name__
+            attempt["error"] = error
+            attempt["duration_ms"] = round((time.monotonic() - started) * 1000)
+            if self._retry(job, attempt, e):
+                return
+            logger.error(f"Job {job['id']} failed: {error}")
+        else:
+            attempt["duration_ms"] = round((time.monotonic() - started) * 1000)
+
+        completed_at = datetime.utcnow()
+        recorded, closed = self.store.complete_job(
+            self.id, job["id"], job["batch_id"], status, result, error, attempts, completed_at,
+        )
+        if not recorded:
+            logger.warning(f"Job {job['id']} lease expired before completion; result discarded")
+            return
+
+        if callback_url := job["options"].get("callback_url"):
+            # Pre-flight only runs in the API process, so there is never one to report
+            event = job_event(
+                job["id"], job["url"], job["type"], status, result, error, None, attempts, completed_at,
+            )
+            webhook_dispatcher.send(callback_url, "job", {"batch_id": job["batch_id"], **event})
+            if closed:
+                summary = summarize_batch(job["batch_id"], *self.store.count_jobs(job["batch_id"]))
+                webhook_dispatcher.send(callback_url, "batch", summary, flush=True)
+
+    def _retry(self, job: dict, attempt: dict, error: Exception) -> bool:
+        """Put a failed job back in the queue after a backoff, if it deserves another attempt.
+
+        The attempt is recorded in the store and `not_before` keeps every
+        worker from leasing the job until the backoff is over.
+        """
+        attempts = job["attempts"]
+        if isinstance(error, ThrottledError):
+            attempt["throttled"] = True
+            tries = sum(1 for a in attempts if a.get("throttled"))
+            if tries > self.settings.host_throttle_retries:
+                return False
+        else:
+            attempt["retryable"] = is_retryable(error)
+            tries = failed_attempts(attempts)
+            if not attempt["retryable"] or tries >= self.settings.job_max_attempts:
+                return False
+
+        delay = retry_delay(tries)
+        attempt["retry_in"] = round(delay, 2)
+        if self.store.retry_job(self.id, job["id"], attempts, time.time() + delay):
+            logger.warning(f"Job {job['id']} attempt {attempt['attempt']} failed ({attempt['error']}); "
+                           f"retrying in {delay:.1f}s")
+        else:
+            logger.warning(f"Job {job['id']} lease expired before it could be retried")
+        return True
+
+    async def _heartbeat(self):
+        """Extend leases on in-flight jobs well before they expire."""
+        interval = self.settings.job_lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.store.extend_leases(self.id, list(self._inflight), self.settings.job_lease_seconds)
+            except Exception as e:
+                logger.error(f"Lease heartbeat failed: {e}")
+
+
+async def main():
+    worker = Worker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    await worker.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
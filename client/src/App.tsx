@@ -4,9 +4,10 @@ import {
   captureVideo,
   createBatch,
   getBatchStatus,
+  getBatchJobs,
   getDownloadUrl,
 } from './api';
-import type { ScreenshotResponse, VideoResponse, BatchStatus } from './api';
+import type { ScreenshotResponse, VideoResponse, BatchStatus, BatchJob } from './api';
 
 type Tab = 'screenshot' | 'video' | 'batch';
 
@@ -359,11 +360,15 @@ function VideoPanel() {
   );
 }
 
+// Jobs listed in the progress panel; the counts above cover the whole batch
+const JOB_LIST_LIMIT = 100;
+
 function BatchPanel() {
   const [urls, setUrls] = useState('https://example.com\nhttps://google.com');
   const [fullPage, setFullPage] = useState(true);
   const [loading, setLoading] = useState(false);
   const [status, setStatus] = useState<BatchStatus | null>(null);
+  const [jobs, setJobs] = useState<BatchJob[]>([]);
   const [error, setError] = useState<string | null>(null);
 
   const handleSubmit = async () => {
@@ -373,6 +378,7 @@ function BatchPanel() {
     setLoading(true);
     setError(null);
     setStatus(null);
+    setJobs([]);
 
     try {
       const response = await createBatch(urlList, { full_page: fullPage });
@@ -385,8 +391,12 @@ function BatchPanel() {
 
   const pollStatus = async (id: string) => {
     try {
-      const statusData = await getBatchStatus(id);
+      const [statusData, jobPage] = await Promise.all([
+        getBatchStatus(id),
+        getBatchJobs(id, { limit: JOB_LIST_LIMIT }),
+      ]);
       setStatus(statusData);
+      setJobs(jobPage.jobs);
 
       if (statusData.status === 'processing' || statusData.status === 'pending') {
         setTimeout(() => pollStatus(id), 2000);
@@ -487,13 +497,26 @@ function BatchPanel() {
             </div>
 
             <div className="max-h-64 overflow-y-auto space-y-2">
-              {status.jobs.map((job) => (
+              {jobs.map((job) => (
                 <div
                   key={job.id}
                   className="flex items-center justify-between bg-gray-700 rounded p-2 text-sm"
                 >
                   <span className="truncate flex-1 mr-2">{job.url}</span>
-                  {job.status === 'completed' && job.result ? (
+                  {job.status === 'completed' && job.result?.viewports ? (
+                    <span className="space-x-2">
+                      {job.result.viewports.map((capture) => (
+                        <a
+                          key={`${capture.width}x${capture.height}`}
+                          href={getDownloadUrl(capture.download_url)}
+                          download
+                          className="text-blue-400 hover:text-blue-300"
+                        >
+                          {capture.width}×{capture.height}
+                        </a>
+                      ))}
+                    </span>
+                  ) : job.status === 'completed' && job.result?.download_url ? (
                     <a
                       href={getDownloadUrl(job.result.download_url)}
                       download
@@ -60,13 +60,23 @@ export interface BatchStatus {
   pending: number;
   status: string;
   progress: number;
-  jobs: Array<{
-    id: string;
-    url: string;
-    status: string;
-    result?: { download_url: string };
-    error?: string;
-  }>;
+}
+
+export interface BatchJob {
+  id: string;
+  url: string;
+  type: 'screenshot' | 'video' | 'viewports';
+  status: string;
+  result?: {
+    download_url?: string;
+    viewports?: { width: number; height: number; download_url: string }[];
+  };
+  error?: string;
+}
+
+export interface BatchJobPage {
+  jobs: BatchJob[];
+  next_cursor: number | null;
 }
 
 export async function captureScreenshot(request: ScreenshotRequest): Promise<ScreenshotResponse> {
@@ -127,6 +137,26 @@ export async function getBatchStatus(batchId: string): Promise<BatchStatus> {
   return data.batch;
 }
 
+export async function getBatchJobs(
+  batchId: string,
+  params: { status?: string; cursor?: number; limit?: number } = {},
+): Promise<BatchJobPage> {
+  const query = new URLSearchParams();
+  if (params.status) query.set('status', params.status);
+  if (params.cursor !== undefined) query.set('cursor', String(params.cursor));
+  if (params.limit !== undefined) query.set('limit', String(params.limit));
+
+  const response = await fetch(`${API_BASE}/api/batch/${batchId}/jobs?${query}`);
+
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error.detail || 'Failed to get batch jobs');
+  }
+
+  const data = await response.json();
+  return { jobs: data.jobs, next_cursor: data.next_cursor };
+}
+
 export function getDownloadUrl(path: string): string {
   return `${API_BASE}${path}`;
 }
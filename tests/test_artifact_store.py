@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from app.services import artifact_store as artifact_store_module
+from app.services.artifact_store import ArtifactStore
+from app.services.capture_index import CaptureIndex, CaptureRecord
+from app.services.storage import LocalStorage
+
+
+class SlowStorage(LocalStorage):
+    """Local storage whose deletes wait until released, or fail."""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.deleting = asyncio.Event()
+        self.release = asyncio.Event()
+        self.fail = False
+
+    async def delete(self, keys):
+        self.deleting.set()
+        await self.release.wait()
+        if self.fail:
+            raise OSError("storage unavailable")
+        await super().delete(keys)
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    index = CaptureIndex(tmp_path / "captures.db")
+    monkeypatch.setattr(artifact_store_module, "capture_index", index)
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def store(tmp_path, index):
+    store = ArtifactStore()
+    store.temp_dir = tmp_path / "tmp"
+    store.temp_dir.mkdir()
+    store.backend = SlowStorage(tmp_path / "out")
+    store.backend.release.set()
+    return store
+
+
+def staged(store, capture_id: str, content: bytes = b"same bytes"):
+    temp = store.temp_path(f"{capture_id}.png")
+    temp.write_bytes(content)
+    record = CaptureRecord(id=capture_id, kind="screenshot", format="png", path="", size=0, url="", request_hash="")
+    return temp, record
+
+
+def blob(index, path: str):
+    return index._db().execute("SELECT refs, deleting_since FROM blobs WHERE path = ?", (path,)).fetchone()
+
+
+def test_shared_file_is_deleted_with_last_capture(store, index):
+    async def run():
+        await store.commit([staged(store, "a")])
+        await store.commit([staged(store, "b")])
+        path = index.get("a", "screenshot").path
+        assert index.get("b", "screenshot").path == path
+
+        assert await store.delete("a", "screenshot")
+        assert store.backend.local_path(path).exists()
+        assert await store.delete("b", "screenshot")
+        assert not store.backend.local_path(path).exists()
+        assert blob(index, path) is None
+
+    asyncio.run(run())
+
+
+def test_commit_waits_for_delete_of_same_content(store, index):
+    async def run():
+        await store.commit([staged(store, "a")])
+        path = index.get("a", "screenshot").path
+        store.backend.release.clear()
+
+        # The delete is stuck in storage with the index unlocked
+        deleting = asyncio.create_task(store.delete("a", "screenshot"))
+        await store.backend.deleting.wait()
+        committing = asyncio.create_task(store.commit([staged(store, "b")]))
+        await asyncio.sleep(0.1)
+        assert not committing.done()
+
+        store.backend.release.set()
+        await asyncio.gather(deleting, committing)
+        assert store.backend.local_path(path).read_bytes() == b"same bytes"
+        assert tuple(blob(index, path)) == (1, None)
+
+    asyncio.run(run())
+
+
+def test_failed_storage_delete_is_retried(store, index):
+    async def run():
+        await store.commit([staged(store, "a")])
+        path = index.get("a", "screenshot").path
+        store.backend.fail = True
+
+        with pytest.raises(OSError):
+            await store.delete("a", "screenshot")
+        assert store.backend.local_path(path).exists()
+        assert tuple(blob(index, path)) == (0, None)
+
+        store.backend.fail = False
+        assert await store.delete_outputs([]) == 1
+        assert not store.backend.local_path(path).exists()
+
+    asyncio.run(run())
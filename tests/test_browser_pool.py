@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from app.services.browser_pool import BrowserPool
+from app.services.errors import DeadlineExceeded
+from app.services.scheduler import capture_deadline
+
+
+class FakeDriver:
+    def execute_cdp_cmd(self, command, params):
+        pass
+
+    def delete_all_cookies(self):
+        pass
+
+
+def make_pool(monkeypatch, drivers: int = 1) -> tuple[BrowserPool, list]:
+    pool = BrowserPool()
+    replaced = []
+
+    async def replace(driver):
+        replaced.append(driver)
+
+    monkeypatch.setattr(pool, "_replace_driver", replace)
+    pool._drivers = [FakeDriver() for _ in range(drivers)]
+    for driver in pool._drivers:
+        pool._available.put_nowait(driver)
+    pool._initialized = True
+    return pool, replaced
+
+
+def test_deadline_starts_when_driver_is_granted(monkeypatch):
+    pool, replaced = make_pool(monkeypatch)
+
+    async def scenario():
+        async def hold(seconds):
+            async with pool.get_driver():
+                await asyncio.sleep(seconds)
+
+        holder = asyncio.create_task(hold(0.2))
+        await asyncio.sleep(0)
+        with capture_deadline(0.1):
+            # Queued for longer than the deadline, but quick once it has the driver
+            await hold(0.01)
+        await holder
+
+    asyncio.run(scenario())
+    assert replaced == []
+
+
+def test_expired_checkout_times_out_and_replaces_driver(monkeypatch):
+    pool, replaced = make_pool(monkeypatch)
+
+    async def scenario():
+        with capture_deadline(0.05):
+            async with pool.get_driver():
+                await asyncio.sleep(1)
+
+    with pytest.raises(DeadlineExceeded, match="Timed out after 0.05s"):
+        asyncio.run(scenario())
+    assert len(replaced) == 1
+    assert pool.scheduler.status["in_use"] == 0
+
+
+def test_capture_timeout_is_not_reported_as_deadline(monkeypatch):
+    pool, _ = make_pool(monkeypatch)
+
+    async def scenario():
+        with capture_deadline(10):
+            async with pool.get_driver():
+                raise asyncio.TimeoutError()
+
+    with pytest.raises(asyncio.TimeoutError) as error:
+        asyncio.run(scenario())
+    assert not isinstance(error.value, DeadlineExceeded)
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from app.services.ffmpeg import EncodeProgress, FFmpegError, FFmpegRunner
+
+# Stands in for ffmpeg: the first argument after `-progress pipe:1` picks a behaviour
+STUB = f"""#!{sys.executable}
+import os, sys, time
+
+mode = sys.argv[5]
+if mode == "encode":
+    for frame in (1, 2):
+        print(f"frame={{frame}}\\nfps=N/A\\nspeed=N/A\\nprogress=continue", flush=True)
+    print("frame=3\\nspeed=2.5x\\nprogress=end", flush=True)
+elif mode == "fail":
+    sys.stderr.write("x" * 10000 + "real error")
+    sys.exit(3)
+elif mode == "hang":
+    with open(sys.argv[6], "w") as f:
+        f.write(str(os.getpid()))
+    time.sleep(30)
+elif mode == "exit":
+    sys.stderr.write("no input wanted")
+    sys.exit(1)
+"""
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    stub = tmp_path / "ffmpeg"
+    stub.write_text(STUB)
+    stub.chmod(0o755)
+    runner = FFmpegRunner()
+    monkeypatch.setattr(runner.settings, "ffmpeg_path", str(stub))
+    return runner
+
+
+def test_progress_lines_are_parsed(runner):
+    progress = EncodeProgress(job_id="job")
+    for line in ("frame=12", "fps=N/A", "speed=N/A", "out_time_ms=N/A", "fps=29.97", "speed=1.5x"):
+        runner._parse_progress_line(progress, line)
+
+    assert (progress.frame, progress.fps, progress.speed, progress.out_time_ms) == (12, 29.97, 1.5, 0)
+    runner._parse_progress_line(progress, "progress=continue")
+    assert progress.status == "encoding"
+    runner._parse_progress_line(progress, "progress=end")
+    assert progress.status == "finished"
+
+
+def test_run_reports_progress(runner):
+    seen = []
+    result = asyncio.run(runner.run(["encode"], "job", total_frames=3, on_progress=lambda p: seen.append(p.frame)))
+
+    assert seen == [1, 2, 3]
+    assert (result.frames, result.speed) == (3, 2.5)
+    assert runner.active == []
+
+
+def test_failure_keeps_stderr_tail(runner):
+    with pytest.raises(FFmpegError) as error:
+        asyncio.run(runner.run(["fail"], "job"))
+
+    assert error.value.returncode == 3
+    assert len(error.value.stderr) == runner.STDERR_TAIL
+    assert error.value.stderr.endswith("real error")
+
+
+def is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+async def wait_for_pid(path) -> int:
+    while not path.exists() or not path.read_text():
+        await asyncio.sleep(0.01)
+    return int(path.read_text())
+
+
+def test_timeout_kills_ffmpeg(runner, tmp_path):
+    pid_file = tmp_path / "pid"
+    with pytest.raises(FFmpegError, match="timed out"):
+        asyncio.run(runner.run(["hang", str(pid_file)], "job", timeout=0.5))
+
+    assert not is_running(int(pid_file.read_text()))
+
+
+def test_cancel_kills_ffmpeg(runner, tmp_path):
+    pid_file = tmp_path / "pid"
+
+    async def run():
+        task = asyncio.create_task(runner.run(["hang", str(pid_file)], "job"))
+        pid = await wait_for_pid(pid_file)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return pid
+
+    assert not is_running(asyncio.run(run()))
+    assert runner.active == []
+
+
+def test_early_exit_while_piping_stdin(runner):
+    async def source():
+        for _ in range(200):
+            yield b"\0" * 65536
+
+    with pytest.raises(FFmpegError) as error:
+        asyncio.run(runner.run(["exit"], "job", stdin=source()))
+
+    # The broken pipe is swallowed; FFmpeg's own exit is what gets reported
+    assert error.value.returncode == 1
+    assert error.value.stderr == "no input wanted"
+
+
+def test_run_inside_held_slot_does_not_wait_for_another(runner):
+    runner._slots = asyncio.Semaphore(1)
+
+    async def run():
+        async with runner.slot():
+            return await asyncio.wait_for(runner.run(["encode"], "job"), 5)
+
+    assert asyncio.run(run()).frames == 3
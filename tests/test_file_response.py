@@ -0,0 +1,106 @@
+import asyncio
+from email.utils import formatdate
+
+import pytest
+from starlette.requests import Request
+
+from app.utils.file_response import _not_modified, _parse_range, file_response, growing_file_response
+
+
+def make_request(headers: dict | None = None) -> Request:
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+async def body(response) -> bytes:
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("items=0-10", None),
+    ("bytes=0-10,20-30", None),
+    ("bytes=abc-", None),
+])
+def test_parse_range(header, expected):
+    assert _parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=500-100", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        _parse_range(header, 1000)
+
+
+@pytest.mark.parametrize("header", ["bytes=0-", "bytes=-10", "bytes=0-0"])
+def test_parse_range_empty_file_serves_whole(header):
+    assert _parse_range(header, 0) is None
+
+
+def test_not_modified_etag():
+    assert _not_modified(make_request({"If-None-Match": '"a", "b"'}), '"b"', 0)
+    assert _not_modified(make_request({"If-None-Match": 'W/"b"'}), '"b"', 0)
+    assert _not_modified(make_request({"If-None-Match": "*"}), '"b"', 0)
+    assert not _not_modified(make_request({"If-None-Match": '"a"'}), '"b"', 0)
+
+
+def test_not_modified_since():
+    mtime = 1_700_000_000.5
+    assert _not_modified(make_request({"If-Modified-Since": formatdate(mtime, usegmt=True)}), '"x"', mtime)
+    assert not _not_modified(make_request({"If-Modified-Since": formatdate(mtime - 60, usegmt=True)}), '"x"', mtime)
+    assert not _not_modified(make_request({"If-Modified-Since": "garbage"}), '"x"', mtime)
+    # If-None-Match wins over If-Modified-Since
+    headers = {"If-None-Match": '"other"', "If-Modified-Since": formatdate(mtime, usegmt=True)}
+    assert not _not_modified(make_request(headers), '"x"', mtime)
+
+
+def test_file_response_range_and_conditional(tmp_path):
+    path = tmp_path / "out.bin"
+    path.write_bytes(bytes(range(256)))
+
+    full = file_response(make_request(), path, "application/octet-stream")
+    assert full.status_code == 200
+    assert asyncio.run(body(full)) == bytes(range(256))
+
+    partial = file_response(make_request({"Range": "bytes=10-19"}), path, "application/octet-stream")
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == "bytes 10-19/256"
+    assert asyncio.run(body(partial)) == bytes(range(10, 20))
+
+    etag = full.headers["etag"]
+    assert file_response(make_request({"If-None-Match": etag}), path, "application/octet-stream").status_code == 304
+    assert file_response(make_request({"Range": "bytes=300-"}), path, "application/octet-stream").status_code == 416
+
+
+def test_file_response_empty_file_range(tmp_path):
+    path = tmp_path / "empty.bin"
+    path.write_bytes(b"")
+    response = file_response(make_request({"Range": "bytes=0-"}), path, "application/octet-stream")
+    assert response.status_code == 200
+    assert response.headers["content-length"] == "0"
+
+
+def test_growing_file_survives_being_moved(tmp_path):
+    path = tmp_path / "video.mp4"
+    path.write_bytes(b"first")
+    growing = [True]
+
+    async def run():
+        response = await growing_file_response(path, "video/mp4", lambda: growing[0], poll_interval=0.01)
+        # The finished file is committed into storage before the body is read
+        with open(path, "ab") as f:
+            f.write(b" second")
+        path.replace(tmp_path / "stored.mp4")
+        growing[0] = False
+        return await body(response)
+
+    assert asyncio.run(run()) == b"first second"
+
+
+def test_growing_file_already_gone(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(growing_file_response(tmp_path / "missing.mp4", "video/mp4", lambda: False))
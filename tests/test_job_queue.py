@@ -0,0 +1,189 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.routes import batch as batch_routes
+from app.services.errors import BatchStateError
+from app.services.job_queue import JobQueue
+from app.services.job_store import JobStore
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    queue = JobQueue()
+    queue._store = JobStore(tmp_path / "jobs.db")
+    monkeypatch.setattr(queue.settings, "batch_workers", "inline")
+    monkeypatch.setattr(queue.settings, "bulk_chunk_size", 5)
+    monkeypatch.setattr(queue.settings, "host_min_interval", 0.0)
+    return queue
+
+
+async def upload(count: int):
+    for i in range(count):
+        yield f"https://site{i}.example/"
+
+
+def test_inline_bulk_batch_keeps_jobs_in_the_store(queue):
+    window_sizes = []
+
+    async def processor(url, options, job_type, overrides):
+        window_sizes.append(len(batch.jobs))
+        await asyncio.sleep(0)
+        return {"url": url}
+
+    async def scenario():
+        nonlocal batch
+        await queue.start(processor)
+        batch = await queue.create_bulk_batch({"preflight": False})
+        counts = await queue.ingest(batch, upload(23), processor)
+        await asyncio.gather(*queue._runners.values())
+        page = queue.list_jobs(batch.id, status="completed", limit=100)
+        await queue.shutdown()
+        return counts, page
+
+    batch = None
+    counts, page = asyncio.run(scenario())
+    assert counts == {"accepted": 23, "duplicates": 0}
+    assert batch.status == "completed"
+    assert batch.counts["completed"] == 23
+    assert batch.jobs == []
+    # Never more than two chunks of jobs in memory
+    assert len(window_sizes) == 23 and max(window_sizes) < 10
+    assert len(page["jobs"]) == 23
+
+
+def test_cancelling_bulk_batch_cancels_stored_jobs(queue):
+    release = asyncio.Event()
+
+    async def processor(url, options, job_type, overrides):
+        await release.wait()
+        return {"url": url}
+
+    async def scenario():
+        await queue.start(processor)
+        batch = await queue.create_bulk_batch({"preflight": False})
+        await queue.ingest(batch, upload(12), processor)
+        await asyncio.sleep(0.05)
+        summary = await queue.cancel_batch(batch.id)
+        await queue.shutdown()
+        return summary
+
+    summary = asyncio.run(scenario())
+    assert summary["status"] == "cancelled"
+    assert summary["cancelled"] == 12
+    assert summary["pending"] == summary["processing"] == 0
+
+
+async def wait_until(condition):
+    while not condition():
+        await asyncio.sleep(0.01)
+
+
+def test_pause_resume_runs_interrupted_jobs_again(queue):
+    started, gate = [], asyncio.Event()
+
+    async def processor(url, options, job_type, overrides):
+        started.append(url)
+        await gate.wait()
+        return {"url": url}
+
+    async def scenario():
+        await queue.start(processor)
+        batch = await queue.create_batch([{"url": "https://a.example/"}, {"url": "https://b.example/"}], {})
+        queue.run_batch(batch.id)
+        await wait_until(lambda: len(started) == 2)
+
+        paused = await queue.pause_batch(batch.id)
+        assert paused["status"] == "paused"
+        assert paused["pending"] == 2 and paused["processing"] == 0
+        with pytest.raises(BatchStateError):
+            await queue.pause_batch(batch.id)
+
+        gate.set()
+        assert (await queue.resume_batch(batch.id))["status"] == "processing"
+        await asyncio.gather(*queue._runners.values())
+        await queue.shutdown()
+        return batch
+
+    batch = asyncio.run(scenario())
+    assert batch.status == "completed"
+    assert [job.status for job in batch.jobs] == ["completed", "completed"]
+    # Each job was interrupted once by the pause, which doesn't count as a failure
+    assert [[a.get("interrupted", False) for a in job.attempts] for job in batch.jobs] == [[True, False]] * 2
+
+
+def test_cancel_keeps_results_and_skips_pending_jobs(queue, monkeypatch):
+    # One request per host at a time, so the second job on b.example stays pending
+    monkeypatch.setattr(queue.settings, "host_min_interval", 60.0)
+    started = []
+
+    async def processor(url, options, job_type, overrides):
+        started.append(url)
+        if "b.example" in url:
+            await asyncio.Event().wait()
+        return {"url": url}
+
+    async def scenario():
+        await queue.start(processor)
+        urls = ["https://a.example/", "https://b.example/1", "https://b.example/2"]
+        batch = await queue.create_batch([{"url": url} for url in urls], {})
+        queue.run_batch(batch.id)
+        await wait_until(lambda: len(started) == 2 and batch.jobs[0].status == "completed")
+
+        summary = await queue.cancel_batch(batch.id)
+        with pytest.raises(BatchStateError):
+            await queue.resume_batch(batch.id)
+        await queue.shutdown()
+        return batch, summary
+
+    batch, summary = asyncio.run(scenario())
+    assert summary["status"] == "cancelled"
+    assert (summary["completed"], summary["cancelled"]) == (1, 2)
+    assert batch.jobs[0].result == {"url": "https://a.example/"}
+    assert [job.status for job in batch.jobs[1:]] == ["cancelled", "cancelled"]
+    assert "https://b.example/2" not in started
+
+
+def test_external_workers_skip_paused_batches(queue, monkeypatch):
+    monkeypatch.setattr(queue.settings, "batch_workers", "external")
+
+    async def scenario():
+        await queue.start(None)
+        batch = await queue.create_batch([{"url": "https://a.example/"}], {})
+        await queue.pause_batch(batch.id)
+        leased_while_paused = queue._store.lease_jobs("worker", 5, 60)
+        await queue.resume_batch(batch.id)
+        leased = queue._store.lease_jobs("worker", 5, 60)
+        with pytest.raises(BatchStateError):
+            await queue.resume_batch(batch.id)
+        await queue.shutdown()
+        return leased_while_paused, leased
+
+    leased_while_paused, leased = asyncio.run(scenario())
+    assert leased_while_paused == []
+    assert [job["url"] for job in leased] == ["https://a.example/"]
+
+
+def test_invalid_transitions_answer_409(queue, monkeypatch):
+    monkeypatch.setattr(queue.settings, "batch_workers", "external")
+    monkeypatch.setattr(batch_routes, "job_queue", queue)
+    app = FastAPI()
+    app.include_router(batch_routes.router)
+
+    async def scenario():
+        await queue.start(None)
+        batch = await queue.create_batch([{"url": "https://a.example/"}], {})
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            assert (await client.post(f"/api/batch/{batch.id}/resume")).status_code == 409
+            assert (await client.delete(f"/api/batch/{batch.id}")).status_code == 200
+            for method, path in (("POST", "/pause"), ("POST", "/resume"), ("DELETE", "")):
+                response = await client.request(method, f"/api/batch/{batch.id}{path}")
+                assert response.status_code == 409
+                assert response.json()["detail"] == "Batch is cancelled"
+            assert (await client.post("/api/batch/missing/pause")).status_code == 404
+        await queue.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+
+from app.services.job_queue import Batch, Job
+from app.services.job_store import JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(tmp_path / "jobs.db")
+    store.open()
+    yield store
+    asyncio.run(store.close())
+
+
+def make_batch(*urls: str, status: str = "pending") -> Batch:
+    jobs = [Job(id=f"job-{i}", url=url) for i, url in enumerate(urls)]
+    return Batch(id="batch", jobs=jobs, options={"format": "png"}, status=status)
+
+
+def test_batch_round_trip(store):
+    batch = make_batch("https://a.example", "https://b.example")
+    batch.jobs[1].type = "video"
+    batch.jobs[1].options = {"duration": 5}
+    store.insert_batch(batch)
+
+    data = store.load_batch("batch")
+    assert data["options"] == {"format": "png"}
+    assert data["status"] == "pending"
+    assert [(j["id"], j["url"], j["type"], j["options"]) for j in data["jobs"]] == [
+        ("job-0", "https://a.example", "screenshot", {}),
+        ("job-1", "https://b.example", "video", {"duration": 5}),
+    ]
+    assert store.load_batch("missing") is None
+
+
+def test_updates_are_buffered_until_flush(store):
+    batch = make_batch("https://a.example")
+    store.insert_batch(batch)
+
+    job = batch.jobs[0]
+    job.status = "completed"
+    job.result = {"screenshot_id": "abc"}
+    job.attempts = [{"attempt": 1}]
+    store.save_job(job)
+    batch.status = "completed"
+    store.save_batch(batch)
+    assert store.count_jobs("batch") == ("pending", {"pending": 1})
+
+    store.flush()
+    data = store.load_batch("batch")
+    assert data["status"] == "completed"
+    assert data["jobs"][0]["result"] == {"screenshot_id": "abc"}
+    assert data["jobs"][0]["attempts"] == [{"attempt": 1}]
+
+
+def test_unfinished_batches_survive_reopen(store, tmp_path):
+    store.insert_batch(make_batch("https://a.example"))
+    finished = make_batch("https://b.example", status="completed")
+    finished.id = "done"
+    finished.jobs[0].id = "job-done"
+    store.insert_batch(finished)
+    asyncio.run(store.close())
+
+    reopened = JobStore(tmp_path / "jobs.db")
+    reopened.open()
+    try:
+        assert [data["id"] for data in reopened.load_unfinished()] == ["batch"]
+    finally:
+        asyncio.run(reopened.close())
+
+
+def test_insert_jobs_skips_duplicate_urls(store):
+    store.insert_batch(make_batch(status="ingesting"))
+    first = [Job(id="a", url="https://a.example"), Job(id="b", url="https://b.example")]
+    again = [Job(id="c", url="https://a.example"), Job(id="d", url="https://c.example")]
+
+    assert [job.id for job in store.insert_jobs("batch", first, first_seq=0)] == ["a", "b"]
+    assert [job.id for job in store.insert_jobs("batch", again, first_seq=2)] == ["d"]
+    assert [row["seq"] for row in store.list_jobs("batch", None, 0, 10)] == [0, 1, 2]
+
+
+def test_lease_claims_pending_jobs(store):
+    store.insert_batch(make_batch("https://a.example", "https://b.example", "https://c.example"))
+
+    leased = store.lease_jobs("w1", 2, lease_seconds=60)
+    assert [job["id"] for job in leased] == ["job-0", "job-1"]
+    assert leased[0]["options"] == {"format": "png"}
+    assert leased[0]["priority"] == "batch"
+    assert store.count_jobs("batch") == ("processing", {"processing": 2, "pending": 1})
+
+    # Leased jobs are invisible to other workers
+    assert [job["id"] for job in store.lease_jobs("w2", 5, lease_seconds=60)] == ["job-2"]
+    assert store.lease_jobs("w2", 5, lease_seconds=60) == []
+
+
+def test_expired_lease_is_claimable_again(store):
+    store.insert_batch(make_batch("https://a.example"))
+    store.lease_jobs("w1", 1, lease_seconds=-1)
+
+    assert [job["id"] for job in store.lease_jobs("w2", 1, lease_seconds=60)] == ["job-0"]
+    # The first worker lost the lease, so its late result is discarded
+    assert store.complete_job("w1", "job-0", "batch", "completed") == (False, None)
+    assert store.complete_job("w2", "job-0", "batch", "completed") == (True, "completed")
+
+
+def test_extend_keeps_lease(store):
+    store.insert_batch(make_batch("https://a.example"))
+    store.lease_jobs("w1", 1, lease_seconds=-1)
+    store.extend_leases("w1", ["job-0"], lease_seconds=60)
+
+    assert store.lease_jobs("w2", 1, lease_seconds=60) == []
+
+
+def test_release_returns_jobs_to_queue(store):
+    store.insert_batch(make_batch("https://a.example", "https://b.example"))
+    store.lease_jobs("w1", 2, lease_seconds=60)
+    store.release_leases("w1", ["job-1"])
+
+    assert store.count_jobs("batch")[1] == {"processing": 1, "pending": 1}
+    assert [job["id"] for job in store.lease_jobs("w2", 5, lease_seconds=60)] == ["job-1"]
+
+
+def test_batch_closes_with_last_job(store):
+    store.insert_batch(make_batch("https://a.example", "https://b.example"))
+    store.lease_jobs("w1", 2, lease_seconds=60)
+
+    assert store.complete_job("w1", "job-0", "batch", "failed", error="boom") == (True, None)
+    assert store.complete_job("w1", "job-1", "batch", "completed", {"id": "x"}) == (True, "completed")
+    assert store.count_jobs("batch") == ("completed", {"failed": 1, "completed": 1})
+
+
+def test_batch_fails_when_every_job_failed(store):
+    store.insert_batch(make_batch("https://a.example"))
+    store.lease_jobs("w1", 1, lease_seconds=60)
+
+    assert store.complete_job("w1", "job-0", "batch", "failed", error="boom") == (True, "failed")
+
+
+def test_ingesting_batch_stays_open_until_upload_finishes(store):
+    store.insert_batch(make_batch(status="ingesting"))
+    store.insert_jobs("batch", [Job(id="a", url="https://a.example")], first_seq=0)
+    store.lease_jobs("w1", 1, lease_seconds=60)
+
+    assert store.complete_job("w1", "a", "batch", "completed") == (True, None)
+    assert store.finish_ingest("batch") == "completed"
+
+
+def test_paused_and_cancelled_batches_are_not_leased(store):
+    store.insert_batch(make_batch("https://a.example", "https://b.example"))
+    store.lease_jobs("w1", 1, lease_seconds=60)
+
+    assert store.set_batch_status("batch", "paused", ("pending", "processing"))
+    assert store.lease_jobs("w2", 5, lease_seconds=60) == []
+    assert store.halted_jobs(["job-0"]) == ["job-0"]
+
+    assert store.set_batch_status("batch", "cancelled", ("paused",))
+    assert not store.set_batch_status("batch", "processing", ("paused",))
+    # Pending jobs are cancelled at once; the leased one when its worker lets go
+    assert store.count_jobs("batch")[1] == {"processing": 1, "cancelled": 1}
+    store.release_leases("w1")
+    assert store.count_jobs("batch")[1] == {"cancelled": 2}
@@ -0,0 +1,94 @@
+import pytest
+
+from app.services import politeness
+from app.services.politeness import HostScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(politeness.time, "monotonic", clock)
+    return clock
+
+
+def test_hosts_are_interleaved_round_robin(clock):
+    hosts = HostScheduler(max_per_host=5, min_interval=0, max_backoff=60)
+    for item in ("a1", "a2", "a3"):
+        hosts.add("a.com", item)
+    hosts.add("b.com", "b1")
+
+    order = [hosts.next_ready()[1] for _ in range(4)]
+    assert order == ["a1", "b1", "a2", "a3"]
+    assert hosts.pending == 0
+    assert hosts.next_ready() is None
+
+
+def test_starts_on_one_host_are_spaced(clock):
+    hosts = HostScheduler(max_per_host=5, min_interval=2.0, max_backoff=60)
+    hosts.add("a.com", "a1")
+    hosts.add("a.com", "a2")
+
+    assert hosts.next_ready() == ("a.com", "a1")
+    assert hosts.next_ready() is None
+    assert hosts.time_until_ready() == pytest.approx(2.0)
+
+    clock.now += 2.0
+    assert hosts.next_ready() == ("a.com", "a2")
+
+
+def test_concurrency_cap_per_host(clock):
+    hosts = HostScheduler(max_per_host=1, min_interval=0, max_backoff=60)
+    hosts.add("a.com", "a1")
+    hosts.add("a.com", "a2")
+
+    assert hosts.next_ready() == ("a.com", "a1")
+    assert hosts.next_ready() is None
+    # At its cap, the host has no start time to wait for
+    assert hosts.time_until_ready() is None
+
+    hosts.finished("a.com")
+    assert hosts.next_ready() == ("a.com", "a2")
+
+
+def test_throttling_backs_off_and_success_recovers(clock):
+    hosts = HostScheduler(max_per_host=5, min_interval=1.0, max_backoff=5.0)
+    hosts.add("a.com", "a1")
+    hosts.add("a.com", "a2")
+
+    hosts.next_ready()
+    hosts.finished("a.com", throttled=True)
+    assert hosts.interval("a.com") == 2.0
+    # The throttled job goes back to the front of its host's queue
+    hosts.add("a.com", "a1", front=True)
+    assert hosts.time_until_ready() == pytest.approx(2.0)
+
+    for expected in (4.0, 5.0, 5.0):
+        clock.now += hosts.interval("a.com")
+        host, item = hosts.next_ready()
+        assert item == "a1"
+        hosts.finished(host, throttled=True)
+        hosts.add(host, item, front=True)
+        assert hosts.interval("a.com") == expected
+
+    clock.now += 5.0
+    hosts.next_ready()
+    hosts.finished("a.com")
+    assert hosts.interval("a.com") == 2.5
+
+
+def test_idle_hosts_at_baseline_are_forgotten(clock):
+    hosts = HostScheduler(max_per_host=5, min_interval=0, max_backoff=60)
+    hosts.add("a.com", "a1")
+    hosts.next_ready()
+    hosts.finished("a.com")
+
+    with pytest.raises(KeyError):
+        hosts.interval("a.com")
@@ -0,0 +1,46 @@
+import asyncio
+
+import httpx
+
+from app.services.preflight import PreflightChecker
+
+
+def check(statuses: dict[str, int]) -> tuple[dict, list[str]]:
+    """Preflight a localhost URL against a server answering each method with the given status."""
+    methods = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        methods.append(request.method)
+        return httpx.Response(statuses[request.method])
+
+    async def run():
+        checker = PreflightChecker()
+        checker._client = httpx.AsyncClient(transport=httpx.MockTransport(handler), follow_redirects=True)
+        try:
+            return await checker.check("http://localhost/page")
+        finally:
+            await checker.close()
+
+    return asyncio.run(run()).to_dict(), methods
+
+
+def test_head_ok_skips_get():
+    result, methods = check({"HEAD": 200})
+    assert result["ok"] and methods == ["HEAD"]
+
+
+def test_dead_head_is_confirmed_with_get():
+    result, methods = check({"HEAD": 404, "GET": 200})
+    assert result["ok"] and result["status_code"] == 200
+    assert methods == ["HEAD", "GET"]
+
+
+def test_dead_page_fails():
+    result, _ = check({"HEAD": 410, "GET": 410})
+    assert not result["ok"]
+    assert result["error"] == "HTTP 410"
+
+
+def test_head_not_allowed_falls_back_to_get():
+    result, methods = check({"HEAD": 405, "GET": 404})
+    assert not result["ok"] and methods == ["HEAD", "GET"]
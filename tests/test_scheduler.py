@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+from app.services.errors import AdmissionRejected
+from app.services.scheduler import CaptureScheduler, capture_cost, capture_flow
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def run_in_order(scheduler: CaptureScheduler, requests: list[tuple[str, str, str, float]]) -> list[str]:
+    """Queue (name, flow, priority, cost) requests behind a held slot and return the grant order."""
+    granted = []
+
+    async def request(name, flow, priority, cost):
+        with capture_flow(flow, priority=priority), capture_cost(cost):
+            async with scheduler.slot():
+                granted.append(name)
+
+    blocker = asyncio.Event()
+
+    async def hold():
+        async with scheduler.slot():
+            await blocker.wait()
+
+    with capture_flow("holder", priority="background"):
+        holder = asyncio.create_task(hold())
+    await settle()
+    tasks = []
+    for args in requests:
+        tasks.append(asyncio.create_task(request(*args)))
+        await settle()
+    blocker.set()
+    await asyncio.gather(holder, *tasks)
+    return granted
+
+
+def test_interactive_outranks_batch_and_background():
+    scheduler = CaptureScheduler(lambda: 1)
+    order = asyncio.run(run_in_order(scheduler, [
+        ("bg", "maintenance", "background", 1),
+        ("batch", "b1", "batch", 1),
+        ("api", "interactive", "interactive", 1),
+    ]))
+    assert order == ["api", "batch", "bg"]
+
+
+def test_batches_share_fairly_within_a_class():
+    scheduler = CaptureScheduler(lambda: 1)
+    order = asyncio.run(run_in_order(scheduler, [
+        *[(f"big{i}", "big", "batch", 1) for i in range(4)],
+        *[(f"small{i}", "small", "batch", 1) for i in range(2)],
+    ]))
+    # The later, smaller batch is interleaved rather than waiting for the big one
+    assert order == ["big0", "small0", "big1", "small1", "big2", "big3"]
+
+
+def test_costly_captures_get_proportionally_fewer_turns():
+    scheduler = CaptureScheduler(lambda: 1)
+    order = asyncio.run(run_in_order(scheduler, [
+        ("video0", "videos", "batch", 3),
+        ("video1", "videos", "batch", 3),
+        *[(f"shot{i}", "shots", "batch", 1) for i in range(4)],
+    ]))
+    assert order == ["video0", "shot0", "shot1", "shot2", "video1", "shot3"]
+
+
+def test_finished_flows_are_forgotten():
+    scheduler = CaptureScheduler(lambda: 2)
+
+    async def job(flow):
+        with capture_flow(flow, priority="batch"):
+            async with scheduler.slot():
+                await asyncio.sleep(0)
+
+    async def run():
+        for i in range(0, 100, 4):
+            await asyncio.gather(*(job(f"batch-{n}") for n in range(i, i + 4)))
+
+    asyncio.run(run())
+    assert scheduler._finish_tags == {}
+    assert scheduler._running == {} and scheduler._queued == {}
+
+
+def test_queue_full_rejects_interactive_requests():
+    scheduler = CaptureScheduler(lambda: 1, max_queue=1)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await settle()
+        waiter = asyncio.create_task(hold())
+        await settle()
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with scheduler.slot():
+                pass
+        release.set()
+        await asyncio.gather(holder, waiter)
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.retry_after >= 1
+    assert scheduler.status["rejected"] == 1
+
+
+def test_batch_requests_are_never_turned_away():
+    scheduler = CaptureScheduler(lambda: 1, max_queue=0)
+    order = asyncio.run(run_in_order(scheduler, [("batch", "b1", "batch", 1)]))
+    assert order == ["batch"]
+
+
+def test_interactive_wait_is_bounded():
+    scheduler = CaptureScheduler(lambda: 1, max_wait=0.05)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await settle()
+        with pytest.raises(AdmissionRejected, match="Timed out"):
+            async with scheduler.slot():
+                pass
+        assert scheduler.status["queued"] == 0
+        release.set()
+        await holder
+
+    asyncio.run(scenario())
+    assert scheduler.status["in_use"] == 0
+
+
+def test_capacity_is_read_live():
+    capacity = [1]
+    scheduler = CaptureScheduler(lambda: capacity[0])
+
+    async def scenario():
+        release = asyncio.Event()
+        active = []
+
+        async def hold(name):
+            async with scheduler.slot():
+                active.append(name)
+                await release.wait()
+
+        tasks = [asyncio.create_task(hold(name)) for name in ("a", "b", "c")]
+        await settle()
+        assert active == ["a"]
+        # A pool that grows is used from the next dispatch on
+        capacity[0] = 3
+        tasks.append(asyncio.create_task(hold("d")))
+        await settle()
+        assert active == ["a", "b", "c"]
+        release.set()
+        await asyncio.gather(*tasks)
+        return active
+
+    assert asyncio.run(scenario()) == ["a", "b", "c", "d"]
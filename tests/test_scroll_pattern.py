@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from app.services.video import SCROLL_PATTERN_DTYPE, VideoService
+
+
+@pytest.fixture
+def service():
+    return VideoService()
+
+
+@pytest.mark.parametrize("total_scroll", [500, 1500, 6000])
+def test_same_seed_same_timeline(service, total_scroll):
+    first = service._generate_realistic_scroll_pattern(total_scroll, 1.0, seed=42)
+    second = service._generate_realistic_scroll_pattern(total_scroll, 1.0, seed=42)
+    assert first.dtype == SCROLL_PATTERN_DTYPE
+    assert first.tobytes() == second.tobytes()
+
+
+def test_different_seeds_differ(service):
+    first = service._generate_realistic_scroll_pattern(3000, 1.0, seed=1)
+    second = service._generate_realistic_scroll_pattern(3000, 1.0, seed=2)
+    assert first.tobytes() != second.tobytes()
+
+
+def test_positions_stay_on_page(service):
+    pattern = service._generate_realistic_scroll_pattern(3000, 1.0, seed=7)
+    assert pattern["pos"].min() >= 0
+    assert pattern["pos"].max() <= 3000
+    assert pattern["pause"].any() and (~pattern["pause"]).any()
+
+
+def test_pause_multiplier_lengthens_pauses(service):
+    short = service._generate_realistic_scroll_pattern(3000, 0.5, seed=3)
+    long = service._generate_realistic_scroll_pattern(3000, 2.0, seed=3)
+    assert np.count_nonzero(long["pause"]) > np.count_nonzero(short["pause"])
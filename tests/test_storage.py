@@ -0,0 +1,173 @@
+import asyncio
+import os
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.config import Settings
+from app.services import artifact_store as artifact_store_module
+from app.services.artifact_store import ArtifactStore
+from app.services.capture_index import CaptureIndex, CaptureRecord
+from app.services.errors import RemoteCaptureError
+from app.services.storage import IMMUTABLE, S3Storage, StorageBackend, node_id
+
+
+def test_node_id_is_generated_once(tmp_path):
+    settings = Settings(state_dir=tmp_path / "state")
+
+    generated = node_id(settings)
+    assert generated
+    assert node_id(settings) == generated
+    assert [path.name for path in settings.state_dir.iterdir()] == ["node_id"]
+
+
+def test_node_id_setting_wins(tmp_path):
+    settings = Settings(state_dir=tmp_path, s3_node_id="node-a")
+
+    assert node_id(settings) == "node-a"
+    assert not (tmp_path / "node_id").exists()
+
+
+def test_incomplete_backend_fails_on_creation():
+    class NoDelete(StorageBackend):
+        async def put(self, key, source):
+            return True
+
+        async def read(self, key):
+            yield b""
+
+    with pytest.raises(TypeError):
+        NoDelete()
+
+
+@pytest.fixture
+def s3_settings(tmp_path, monkeypatch):
+    """Settings for a node of a moto-backed bucket; call with a node id."""
+    moto = pytest.importorskip("moto")
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+        monkeypatch.setenv(name, "testing")
+    with moto.mock_aws():
+        import boto3
+
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="captures")
+
+        def settings(node: str = "node-a") -> Settings:
+            return Settings(
+                storage_backend="s3",
+                s3_bucket="captures",
+                s3_region="us-east-1",
+                s3_prefix="snapsht/",
+                s3_node_id=node,
+                state_dir=tmp_path / node,
+                storage_multipart_threshold=5 * 1024 * 1024,
+            )
+
+        yield settings
+
+
+def staged_file(tmp_path, content: bytes, name: str = "staged.png"):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return path
+
+
+async def read_all(backend, key: str) -> bytes:
+    return b"".join([chunk async for chunk in backend.read(key)])
+
+
+def test_s3_put_dedup_read_delete(s3_settings, tmp_path):
+    from botocore.exceptions import ClientError
+
+    storage = S3Storage(s3_settings())
+    key = f"{storage.namespace}objects/ab/cd/abcd.png"
+
+    async def scenario():
+        first = staged_file(tmp_path, b"png bytes")
+        assert await storage.put(key, first)
+        assert not first.exists()
+        # Same content again: nothing is uploaded, but the staged file is still consumed
+        again = staged_file(tmp_path, b"png bytes")
+        assert not await storage.put(key, again)
+        assert not again.exists()
+        assert await read_all(storage, key) == b"png bytes"
+
+        await storage.delete([key, "node-a/objects/missing.png"])
+        with pytest.raises(ClientError):
+            await read_all(storage, key)
+
+    asyncio.run(scenario())
+    assert key.startswith("node-a/")
+
+
+def test_s3_large_files_upload_in_parts(s3_settings, tmp_path):
+    storage = S3Storage(s3_settings())
+    content = os.urandom(11 * 1024 * 1024)
+
+    async def scenario():
+        assert await storage.put("objects/big.mp4", staged_file(tmp_path, content, "big.mp4"))
+        return await read_all(storage, "objects/big.mp4")
+
+    assert asyncio.run(scenario()) == content
+    head = storage._client.head_object(Bucket="captures", Key="snapsht/objects/big.mp4")
+    # Multipart ETags end in the part count
+    assert head["ETag"].strip('"').endswith("-3")
+    assert head["ContentType"] == "video/mp4"
+    assert head["CacheControl"] == IMMUTABLE
+
+
+def test_s3_presigned_url(s3_settings):
+    storage = S3Storage(s3_settings())
+    url = urlsplit(storage.presigned_url("node-a/objects/x.png", "shot.png"))
+    query = parse_qs(url.query)
+
+    assert url.path.endswith("/snapsht/node-a/objects/x.png")
+    assert query["response-content-disposition"] == ['attachment; filename="shot.png"']
+    assert "Signature" in query or "X-Amz-Signature" in query
+
+
+def test_s3_manifests_name_their_node(s3_settings):
+    storage = S3Storage(s3_settings())
+
+    async def scenario():
+        assert await storage.get_manifest("capture") is None
+        await storage.put_manifest("capture", {"outputs": []})
+        manifest = await storage.get_manifest("capture")
+        await storage.delete_manifest("capture")
+        return manifest, await storage.get_manifest("capture")
+
+    assert asyncio.run(scenario()) == ({"node": "node-a", "outputs": []}, None)
+
+
+def test_nodes_serve_each_others_captures(s3_settings, tmp_path, monkeypatch):
+    """Node B resolves and reads node A's capture, but only node A deletes it."""
+    indexes = {node: CaptureIndex(tmp_path / f"{node}.db") for node in ("a", "b")}
+    stores = {}
+    for node in indexes:
+        stores[node] = ArtifactStore()
+        stores[node].backend = S3Storage(s3_settings(f"node-{node}"))
+
+    def on(node: str) -> ArtifactStore:
+        monkeypatch.setattr(artifact_store_module, "capture_index", indexes[node])
+        return stores[node]
+
+    async def scenario():
+        record = CaptureRecord(id="shot", kind="screenshot", format="png", path="", size=0, url="", request_hash="")
+        await on("a").commit([(staged_file(tmp_path, b"from node a"), record)])
+        assert record.path.startswith("node-a/objects/")
+
+        found = await on("b").get("shot", "screenshot")
+        assert found == indexes["a"].get("shot", "screenshot")
+        assert await read_all(stores["b"].backend, found.path) == b"from node a"
+        assert await on("b").get("shot", "video") is None
+        assert [output.format for output in await on("b").outputs("shot")] == ["png"]
+        with pytest.raises(RemoteCaptureError, match="node-a"):
+            await on("b").delete("shot", "screenshot")
+
+        assert await on("a").delete("shot", "screenshot")
+        assert await on("b").get("shot", "screenshot") is None
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        for index in indexes.values():
+            index.close()
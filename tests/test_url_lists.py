@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from app.utils.url_lists import UrlListReader
+
+
+def read(fmt: str, *chunks: bytes) -> tuple[list[str], UrlListReader]:
+    reader = UrlListReader(fmt)
+
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    async def collect():
+        return [url async for url in reader.urls(stream())]
+
+    return asyncio.run(collect()), reader
+
+
+def test_ndjson_strings_and_objects():
+    urls, reader = read(
+        "ndjson",
+        b'"https://a.example/page"\n{"url": "b.example"}\n\n{"href": "c.example"}\nnot json\n',
+    )
+    assert urls == ["https://a.example/page", "https://b.example/"]
+    assert reader.lines == 5
+    assert reader.invalid == 2
+    assert reader.errors == [
+        {"line": 4, "error": 'Expected a string or an object with a "url" key'},
+        {"line": 5, "error": "Invalid JSON"},
+    ]
+
+
+def test_lines_split_across_chunks():
+    urls, _ = read("ndjson", b'"https://a.exa', b'mple"\r\n"https://b.', b'example"')
+    assert urls == ["https://a.example/", "https://b.example/"]
+
+
+@pytest.mark.parametrize("body, expected", [
+    (b"name,url\nA,https://a.example\nB,b.example\n", ["https://a.example/", "https://b.example/"]),
+    (b"Domain\na.example\n", ["https://a.example/"]),
+    (b"a.example,ignored\nb.example\n", ["https://a.example/", "https://b.example/"]),
+])
+def test_csv_columns(body, expected):
+    urls, reader = read("csv", body)
+    assert urls == expected
+    assert reader.invalid == 0
+
+
+def test_csv_missing_column_and_bad_urls():
+    urls, reader = read("csv", b"id,url\n1\n2,http://exa mple\n3,https://ok.example\n")
+    assert urls == ["https://ok.example/"]
+    assert [e["line"] for e in reader.errors] == [2, 3]
+    assert reader.errors[0]["error"] == "Missing URL column"
+
+
+def test_overlong_line_is_skipped_to_the_next_newline():
+    long_line = b'"https://a.example/' + b"x" * (UrlListReader.MAX_LINE + 100) + b'"\n'
+    chunks = [long_line[i:i + 1000] for i in range(0, len(long_line), 1000)]
+    urls, reader = read("ndjson", *chunks, b'"https://b.example"\n')
+    # The rest of the long line must not come back as a record of its own
+    assert urls == ["https://b.example/"]
+    assert reader.lines == 2
+    assert reader.errors == [{"line": 1, "error": "Line too long"}]
+
+
+def test_error_list_is_capped():
+    urls, reader = read("ndjson", b"bad\n" * (UrlListReader.MAX_ERRORS + 5))
+    assert urls == []
+    assert reader.invalid == UrlListReader.MAX_ERRORS + 5
+    assert len(reader.errors) == UrlListReader.MAX_ERRORS
+
+
+def test_overlong_line_within_one_chunk():
+    body = b'"https://a.example/' + b"x" * UrlListReader.MAX_LINE + b'"\n"https://b.example"\n'
+    urls, reader = read("ndjson", body)
+    assert urls == ["https://b.example/"]
+    assert reader.errors == [{"line": 1, "error": "Line too long"}]
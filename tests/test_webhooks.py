@@ -0,0 +1,28 @@
+import asyncio
+
+from app.services.webhooks import WebhookDispatcher
+
+
+def test_pending_events_per_url_are_capped(monkeypatch):
+    dispatcher = WebhookDispatcher()
+    monkeypatch.setattr(dispatcher.settings, "webhook_max_pending", 3)
+    monkeypatch.setattr(dispatcher.settings, "webhook_batch_size", 100)
+    delivered = []
+
+    async def deliver(url, events):
+        delivered.append((url, [e["data"]["n"] for e in events]))
+
+    monkeypatch.setattr(dispatcher, "_deliver", deliver)
+
+    async def scenario():
+        for n in range(5):
+            dispatcher.send("https://slow.example/hook", "job", {"n": n})
+        dispatcher.send("https://other.example/hook", "job", {"n": 0})
+        await dispatcher.close()
+
+    asyncio.run(scenario())
+    assert sorted(delivered) == [
+        ("https://other.example/hook", [0]),
+        ("https://slow.example/hook", [2, 3, 4]),
+    ]
+    assert dispatcher._pending == {} and dispatcher._dropped == {}
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from app import worker as worker_module
+from app.services.errors import ServerError
+from app.services.job_queue import Batch, Job, job_event
+from app.services.job_store import JobStore
+from app.worker import Worker
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    worker = Worker(concurrency=1)
+    worker.store = JobStore(tmp_path / "jobs.db")
+    worker.store.open()
+    worker.store.insert_batch(Batch(id="batch", jobs=[Job(id="job", url="https://a.example")], options={}))
+    monkeypatch.setattr(worker.settings, "job_max_attempts", 2)
+    yield worker
+    asyncio.run(worker.store.close())
+
+
+def fail_with(monkeypatch, *outcomes):
+    """Make process_url raise (or return) each outcome in turn."""
+    results = list(outcomes)
+
+    async def process_url(url, options, job_type, overrides):
+        outcome = results.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(worker_module, "process_url", process_url)
+
+
+def run_once(worker: Worker) -> bool:
+    jobs = worker.store.lease_jobs(worker.id, 1, 60)
+    for job in jobs:
+        asyncio.run(worker._process(job))
+    return bool(jobs)
+
+
+def stored_job(worker: Worker) -> dict:
+    return worker.store.list_jobs("batch", None, 0, 1)[0]
+
+
+def test_transient_failure_is_retried_after_backoff(worker, monkeypatch):
+    fail_with(monkeypatch, ServerError("https://a.example", 503), {"id": "shot"})
+
+    assert run_once(worker)
+    job = stored_job(worker)
+    assert job["status"] == "pending"
+    assert job["attempts"][0]["retryable"] is True
+    assert job["attempts"][0]["retry_in"] > 0
+    # Backing off: no worker may lease it yet
+    assert not run_once(worker)
+
+    worker.store._conn.execute("UPDATE jobs SET not_before = NULL")
+    assert run_once(worker)
+    job = stored_job(worker)
+    assert job["status"] == "completed"
+    assert job["result"] == {"id": "shot"}
+    assert [a["attempt"] for a in job["attempts"]] == [1, 2]
+    assert worker.store.count_jobs("batch")[0] == "completed"
+
+
+def test_gives_up_after_max_attempts(worker, monkeypatch):
+    monkeypatch.setattr(worker.settings, "job_retry_base_delay", 0)
+    fail_with(monkeypatch, ServerError("https://a.example", 502), ServerError("https://a.example", 502))
+
+    assert run_once(worker)
+    assert run_once(worker)
+    job = stored_job(worker)
+    assert job["status"] == "failed"
+    assert len(job["attempts"]) == 2
+    assert "retry_in" not in job["attempts"][-1]
+    assert worker.store.count_jobs("batch")[0] == "failed"
+
+
+def test_permanent_failure_is_not_retried(worker, monkeypatch):
+    fail_with(monkeypatch, ValueError("Invalid selector"))
+
+    assert run_once(worker)
+    job = stored_job(worker)
+    assert job["status"] == "failed"
+    assert job["error"] == "Invalid selector"
+    assert job["attempts"][0]["retryable"] is False
+
+
+def test_callback_payload_matches_inline_events(worker, monkeypatch):
+    worker.store._conn.execute("UPDATE batches SET options = ?", ('{"callback_url": "https://hook.example"}',))
+    sent = []
+
+    def send(url, event, data, flush=False):
+        sent.append((event, data))
+
+    monkeypatch.setattr(worker_module.webhook_dispatcher, "send", send)
+    monkeypatch.setattr(worker.settings, "job_max_attempts", 1)
+    # A timeout raised by the capture itself, not the job deadline
+    fail_with(monkeypatch, asyncio.TimeoutError())
+
+    assert run_once(worker)
+    (_, job), (batch_event, _) = sent
+    assert job["error"] == "TimeoutError"
+    assert job["completed_at"] and len(job["attempts"]) == 1
+    expected = job_event("job", "https://a.example", "screenshot", "failed")
+    assert set(job) == {"batch_id", *expected}
+    assert batch_event == "batch"
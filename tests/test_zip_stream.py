@@ -0,0 +1,76 @@
+import asyncio
+import io
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from app.utils.zip_stream import ZipEntryError, ZipStream
+
+MODIFIED = datetime(2024, 5, 1, 12, 30)
+
+
+async def source(*chunks: bytes, error: Exception | None = None):
+    for chunk in chunks:
+        yield chunk
+    if error:
+        raise error
+
+
+async def build(entries: list[tuple[str, tuple[bytes, ...], int]], manifest: bytes = b"{}") -> bytes:
+    zip_stream = ZipStream()
+    out = []
+    for name, chunks, size in entries:
+        async for data in zip_stream.add_stream(name, source(*chunks), size, MODIFIED):
+            out.append(data)
+    out.append(zip_stream.add_bytes("manifest.json", manifest))
+    out.append(zip_stream.close())
+    return b"".join(out)
+
+
+def test_streamed_archive_reads_back():
+    video = [bytes([i]) * 100_000 for i in range(5)]
+    data = asyncio.run(build([
+        ("00001_a.png", (b"\x89PNG", b"rest"), 8),
+        ("00002_b.mp4", tuple(video), 500_000),
+        ("00003_empty.png", (), 0),
+    ], manifest=b'{"complete": true}'))
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ["00001_a.png", "00002_b.mp4", "00003_empty.png", "manifest.json"]
+        assert archive.read("00001_a.png") == b"\x89PNGrest"
+        assert archive.read("00002_b.mp4") == b"".join(video)
+        assert archive.read("00003_empty.png") == b""
+        assert archive.read("manifest.json") == b'{"complete": true}'
+        info = archive.getinfo("00002_b.mp4")
+        assert info.compress_type == zipfile.ZIP_STORED
+        assert info.date_time == (2024, 5, 1, 12, 30, 0)
+        assert archive.getinfo("manifest.json").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_source_failing_before_first_chunk_leaves_archive_intact():
+    async def scenario():
+        zip_stream = ZipStream()
+        out = []
+        with pytest.raises(FileNotFoundError):
+            async for data in zip_stream.add_stream("gone.png", source(error=FileNotFoundError()), 10, MODIFIED):
+                out.append(data)
+        out.append(zip_stream.add_bytes("manifest.json", b"{}"))
+        out.append(zip_stream.close())
+        return b"".join(out)
+
+    with zipfile.ZipFile(io.BytesIO(asyncio.run(scenario()))) as archive:
+        assert archive.namelist() == ["manifest.json"]
+
+
+@pytest.mark.parametrize("error", [OSError("connection reset"), None])
+def test_partial_entry_is_never_completed(error):
+    async def scenario():
+        zip_stream = ZipStream()
+        chunks = source(b"a" * 10, b"b" * 10, error=error)
+        async for _ in zip_stream.add_stream("short.mp4", chunks, 100, MODIFIED):
+            pass
+
+    with pytest.raises(ZipEntryError, match="after 20 of 100 bytes"):
+        asyncio.run(scenario())